@@ -0,0 +1,115 @@
+"""Single-flight coalescing of identical read-only Telegram requests.
+
+Several MCP clients sharing one token, and agents firing parallel tool calls,
+often send the same request at once (resolving the same username, fetching the
+same chat's full info). For each session's client, allowlisted idempotent
+requests whose serialized TL bytes are equal share one in-flight call: the
+first caller sends it, later callers await its result (or its exception)
+until it completes. Coalescing never crosses sessions, since every client has
+its own in-flight map.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections import Counter
+from collections.abc import Awaitable, Callable, Iterable
+from typing import Any
+
+from telethon import utils
+from telethon.tl.tlobject import TLRequest
+
+
+class CoalescingStats:
+    """Counters shared by every client's coalescer, by request type."""
+
+    def __init__(self) -> None:
+        self.sent: Counter[str] = Counter()
+        self.coalesced: Counter[str] = Counter()
+
+    def describe(self) -> dict[str, Any]:
+        sent = sum(self.sent.values())
+        coalesced = sum(self.coalesced.values())
+        calls = sent + coalesced
+        return {
+            "sent": sent,
+            "coalesced": coalesced,
+            "coalesced_rate": round(coalesced / calls, 3) if calls else None,
+            "coalesced_by_type": dict(self.coalesced.most_common()),
+        }
+
+
+class RequestCoalescer:
+    """One client's in-flight allowlisted requests, keyed by sender and TL bytes."""
+
+    def __init__(self, request_types: Iterable[str], stats: CoalescingStats) -> None:
+        self.request_types = frozenset(request_types)
+        self.stats = stats
+        self._inflight: dict[tuple[int, bytes], asyncio.Task] = {}
+
+    def _key(self, sender: Any, request: Any) -> tuple[int, bytes] | None:
+        if type(request).__name__ not in self.request_types:
+            return None
+        try:
+            return id(sender), bytes(request)
+        except Exception:
+            return None  # Not serializable as given (e.g. an unresolved entity)
+
+    def _done(self, key: tuple[int, bytes], task: asyncio.Task) -> None:
+        self._inflight.pop(key, None)
+        # Every caller may have been cancelled; avoid "exception never retrieved"
+        if not task.cancelled():
+            task.exception()
+
+    async def call(
+        self,
+        client: Any,
+        invoke: Callable[..., Awaitable[Any]],
+        sender: Any,
+        request: Any,
+        ordered: bool = False,
+        flood_sleep_threshold: float | None = None,
+    ) -> Any:
+        """Send request through invoke, sharing an identical in-flight call if any."""
+        if ordered or not isinstance(request, TLRequest):
+            return await invoke(sender, request, ordered, flood_sleep_threshold)
+        if type(request).__name__ in self.request_types:
+            # What Telethon does first anyway; makes equal requests equal bytes
+            await request.resolve(client, utils)
+        key = self._key(sender, request)
+        if key is None:
+            return await invoke(sender, request, ordered, flood_sleep_threshold)
+
+        name = type(request).__name__
+        task = self._inflight.get(key)
+        if task is None:
+            self.stats.sent[name] += 1
+            task = asyncio.create_task(
+                invoke(sender, request, ordered, flood_sleep_threshold)
+            )
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        else:
+            self.stats.coalesced[name] += 1
+        # Shielded: a cancelled caller must not cancel the call for the others
+        return await asyncio.shield(task)
+
+
+def install_coalescing(
+    client: Any, request_types: Iterable[str], stats: CoalescingStats
+) -> RequestCoalescer | None:
+    """Route the client's requests through a RequestCoalescer; None if disabled."""
+    request_types = frozenset(request_types)
+    if not request_types:
+        return None
+    coalescer = RequestCoalescer(request_types, stats)
+    invoke = client._call
+
+    async def _call(sender, request, ordered=False, flood_sleep_threshold=None):
+        return await coalescer.call(
+            client, invoke, sender, request, ordered, flood_sleep_threshold
+        )
+
+    # TelegramClient.__call__ and the client's own lookups all go through _call
+    client._call = _call
+    return coalescer
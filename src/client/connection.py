@@ -1,11 +1,14 @@
 import asyncio
 import base64
+import heapq
 import logging
 import secrets
 import time
 import traceback
+from collections.abc import Awaitable, Callable, Iterable
 from contextvars import ContextVar
 from pathlib import Path
+from typing import Any
 
 from telethon import TelegramClient
 from telethon import errors as tg_errors
@@ -14,7 +17,24 @@ from telethon.tl import functions
 from ..config.logging import format_diagnostic_info
 from ..config.server_config import get_config
 from ..config.settings import API_HASH, API_ID, SESSION_DIR
+from ..server_components.attachment_tickets import revoke_attachment_tickets
+from ..utils.entity_index import INDEX_SUFFIX, entity_indexes
 from ..utils.proxy import build_mtproto_client_args
+from .coalescing import CoalescingStats, install_coalescing
+from .keepalive import KeepaliveTracker
+from .session_backend import (
+    BufferedMemorySession,
+    load_buffered_session,
+    write_entity_row_batches,
+)
+from .session_pool import SessionPool
+from .warm_sessions import (
+    WarmSessionStore,
+    WarmSnapshot,
+    capture_snapshot,
+    session_from_snapshot,
+    spill_snapshot_to_file,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +47,17 @@ class TelegramTransportError(ConnectionError):
     """Session has credentials but Telegram (or MTProto proxy) cannot be reached."""
 
 
+class SessionTemporarilyUnavailableError(TelegramTransportError):
+    """Token is backing off between reconnect attempts; retry after ``retry_after`` s."""
+
+    def __init__(self, message: str, retry_after: float) -> None:
+        self.retry_after = max(0.0, retry_after)
+        super().__init__(
+            f"{message}; session temporarily unavailable, retry after "
+            f"{self.retry_after:.1f}s"
+        )
+
+
 async def verify_authorized_connection(client: TelegramClient) -> None:
     """
     Confirm the session has an auth key and Telegram accepts it.
@@ -70,25 +101,105 @@ async def verify_authorized_connection(client: TelegramClient) -> None:
         client._authorized = True  # type: ignore[attr-defined]
 
 
+def session_error_from_rpc(exc: BaseException) -> SessionNotAuthorizedError | None:
+    """Map Telegram rejecting the session on any RPC to SessionNotAuthorizedError.
+
+    Reconnects within the verification TTL skip GetState, so a revoked session
+    surfaces on the first real RPC instead; its cached verification is dropped so
+    the next connect verifies again.
+    """
+    if not isinstance(exc, (tg_errors.UnauthorizedError, tg_errors.AuthKeyError)):
+        return None
+    token = _current_token.get(None) or get_config().session_name
+    _verified_sessions.pop(token, None)
+    error = SessionNotAuthorizedError(
+        f"Telegram rejected the session ({type(exc).__name__})."
+    )
+    error.__cause__ = exc
+    return error
+
+
 # Token-based session management (use unified server config)
 MAX_ACTIVE_SESSIONS = get_config().max_active_sessions
 
 _current_token: ContextVar[str | None] = ContextVar("_current_token", default=None)
-_session_cache: dict[str, tuple[TelegramClient, float]] = {}
+# How long the current request may wait for a reconnect (X-Reconnect-Wait)
+_reconnect_wait: ContextVar[float | None] = ContextVar("_reconnect_wait", default=None)
+_session_cache = SessionPool(
+    capacity=MAX_ACTIVE_SESSIONS,
+    policy=get_config().session_eviction_policy,
+    pinned=get_config().pinned_session_tokens,
+)
 _cache_lock = asyncio.Lock()
 
+# Warm tier: idle tokens kept as in-memory auth/entity snapshots (no socket)
+_warm_sessions = WarmSessionStore(
+    capacity=get_config().warm_session_limit,
+    ttl_seconds=get_config().warm_session_ttl_seconds,
+)
+
+# Disconnects of evicted clients run in the background, off the cache lock
+_background_disconnects: set[asyncio.Task[None]] = set()
+
+# In-flight connect tasks (single-flight session creation per token)
+_pending_connects: dict[str, asyncio.Task[TelegramClient]] = {}
+
 # Connection failure tracking for circuit breaker and backoff
 _connection_failures: dict[
     str, tuple[int, float]
 ] = {}  # token -> (failure_count, last_failure_time)
 _failure_lock = asyncio.Lock()
 
+# Circuit breaker: this many failures within the window stops reconnects
+CIRCUIT_BREAKER_FAILURES = 5
+CIRCUIT_BREAKER_WINDOW_SECONDS = 300
+MAX_BACKOFF_SECONDS = 60
+
+# One background reconnect loop per token (see _ReconnectSupervisor)
+_reconnect_supervisors: dict[str, "_ReconnectSupervisor"] = {}
+
+# Verification cache: token -> (verified_at, auth key id). Connects within the
+# TTL for the same auth key skip the GetState round trip.
+_verified_sessions: dict[str, tuple[float, int | None]] = {}
+VERIFICATION_TTL_SECONDS = get_config().verification_ttl_seconds
+_verification_stats = {"performed": 0, "skipped": 0}
+
 # Idle session cleanup
 MAX_IDLE_TIME = 1800  # 30 minutes in seconds
 
+# Parallel disconnects when cleanup retires many sessions at once
+CLEANUP_CONCURRENCY = 16
+
+# Identical in-flight read-only requests per client share one RPC
+_coalescing_stats = CoalescingStats()
+
+# Keepalive: ping idle resident clients, reconnect dead or half-open ones
+_keepalive = KeepaliveTracker(interval_seconds=get_config().keepalive_interval_seconds)
+KEEPALIVE_TIMEOUT_SECONDS = get_config().keepalive_timeout_seconds
+KEEPALIVE_CONCURRENCY = 8
+
+
+async def _gather_bounded(jobs: Iterable[Awaitable[None]], limit: int) -> None:
+    """Await jobs concurrently, at most ``limit`` at a time."""
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(job: Awaitable[None]) -> None:
+        async with semaphore:
+            try:
+                await job
+            except Exception as e:
+                logger.warning(f"Session cleanup step failed: {e}")
+
+    await asyncio.gather(*(run(job) for job in jobs))
+
 
 async def cleanup_idle_sessions():
-    """Disconnect sessions that haven't been used for MAX_IDLE_TIME."""
+    """Disconnect sessions that haven't been used for MAX_IDLE_TIME.
+
+    Idle entries are removed from the cache under the lock; demotion and the
+    disconnects run after it is released, CLEANUP_CONCURRENCY at a time, so a
+    mass expiry never stalls requests for other tokens.
+    """
     async with _cache_lock:
         current_time = time.time()
         idle_tokens = []
@@ -96,28 +207,129 @@ async def cleanup_idle_sessions():
 
         for token, (_client, last_access) in _session_cache.items():
             # Skip cleanup for default session to preserve legacy behavior
-            if token == default_token:
+            if token == default_token or _session_cache.is_pinned(token):
                 continue
 
             if current_time - last_access > MAX_IDLE_TIME:
                 idle_tokens.append(token)
 
-        for token in idle_tokens:
-            client, last_access = _session_cache[token]
+        idle = [(token, *_session_cache.pop(token)) for token in idle_tokens]
+        _prune_verifications(current_time)
+
+    if idle:
+        await _gather_bounded(
+            (
+                _disconnect_idle_client(token, client, current_time - last_access)
+                for token, client, last_access in idle
+            ),
+            CLEANUP_CONCURRENCY,
+        )
+        logger.info(
+            f"Cleaned up {len(idle)} idle sessions. Cache now has {len(_session_cache)} sessions"
+        )
+
+    await _spill_to_cold(_warm_sessions.expire())
+
+
+async def _disconnect_idle_client(
+    token: str, client: TelegramClient, idle_seconds: float
+) -> None:
+    await _demote_to_warm(token, client)
+    try:
+        await client.disconnect()
+        logger.info(
+            f"Disconnected idle session for token {token[:8]}... (idle for {idle_seconds / 60:.1f}m)"
+        )
+    except Exception as e:
+        logger.warning(f"Error disconnecting idle session {token[:8]}...: {e}")
+
+
+async def _spill_to_cold(entries: list[tuple[str, WarmSnapshot]]) -> None:
+    """Drop warm snapshots to the cold tier, persisting in-memory entity rows."""
+    if not entries:
+        return
+
+    def spill_all() -> None:
+        for token, snapshot in entries:
+            session_path = SESSION_DIR / f"{token}.session"
             try:
-                await client.disconnect()
-                logger.info(
-                    f"Disconnected idle session for token {token[:8]}... (idle for {(current_time - last_access) / 60:.1f}m)"
-                )
+                spill_snapshot_to_file(snapshot, session_path)
             except Exception as e:
-                logger.warning(f"Error disconnecting idle session {token[:8]}...: {e}")
-            # Remove from cache
-            del _session_cache[token]
+                logger.warning(
+                    f"Error spilling warm session {token[:8]}... to disk: {e}"
+                )
 
-        if idle_tokens:
-            logger.info(
-                f"Cleaned up {len(idle_tokens)} idle sessions. Cache now has {len(_session_cache)} sessions"
-            )
+    await asyncio.to_thread(spill_all)
+
+
+async def flush_session_buffers() -> int:
+    """Write entity rows buffered by in-memory sessions back to their session files.
+
+    Collects the rows under the cache lock, then writes every session's batch in
+    a single worker-thread hop. Returns the number of rows written.
+    """
+    batches = []
+    async with _cache_lock:
+        for token, (client, _) in _session_cache.items():
+            session = getattr(client, "session", None)
+            if isinstance(session, BufferedMemorySession) and session.dirty_row_count:
+                batches.append(
+                    (SESSION_DIR / f"{token}.session", session.take_dirty_rows())
+                )
+    if not batches:
+        return 0
+    return await asyncio.to_thread(write_entity_row_batches, batches)
+
+
+async def _demote_to_warm(token: str, client: TelegramClient) -> None:
+    """Keep a leaving hot client's auth and entity rows in the warm tier."""
+    session = getattr(client, "session", None)
+    if isinstance(session, BufferedMemorySession) and session.dirty_row_count:
+        batch = [(SESSION_DIR / f"{token}.session", session.take_dirty_rows())]
+        await asyncio.to_thread(write_entity_row_batches, batch)
+    try:
+        snapshot = await capture_snapshot(client.session)
+    except Exception as e:
+        logger.debug(f"Could not snapshot session {token[:8]}... for warm tier: {e}")
+        return
+    # The token may have been reconnected while the snapshot was being read.
+    if snapshot is None or token in _session_cache:
+        return
+    await _spill_to_cold(_warm_sessions.put(token, snapshot))
+
+
+def discard_warm_session(token: str) -> None:
+    """Forget a token's warm snapshot (session deleted, replaced or revoked)."""
+    _warm_sessions.pop(token)
+
+
+async def release_sessions(owns: Callable[[str], bool]) -> list[str]:
+    """Disconnect resident sessions whose token owns() rejects; returns their tokens.
+
+    Used when the multi-worker router moves tokens to another worker: buffered
+    entity rows are written, the clients disconnected and warm snapshots dropped
+    without spilling, so the new owner is the only process using the session
+    files from then on.
+    """
+    async with _cache_lock:
+        moved = [token for token in _session_cache if not owns(token)]
+        released = [(token, _session_cache.pop(token)[0]) for token in moved]
+        for token in _warm_sessions.tokens():
+            if not owns(token):
+                discard_warm_session(token)
+
+    async def release(token: str, client: TelegramClient) -> None:
+        session = getattr(client, "session", None)
+        if isinstance(session, BufferedMemorySession) and session.dirty_row_count:
+            batch = [(SESSION_DIR / f"{token}.session", session.take_dirty_rows())]
+            await asyncio.to_thread(write_entity_row_batches, batch)
+        await client.disconnect()
+        logger.info(f"Released session for token {token[:8]}... to another worker")
+
+    await _gather_bounded(
+        (release(token, client) for token, client in released), CLEANUP_CONCURRENCY
+    )
+    return moved
 
 
 def generate_bearer_token() -> str:
@@ -133,6 +345,11 @@ def set_request_token(token: str | None) -> None:
     _current_token.set(token)
 
 
+def set_request_reconnect_wait(seconds: float | None) -> None:
+    """Let the current request wait up to seconds for a reconnect (None: fail fast)."""
+    _reconnect_wait.set(seconds)
+
+
 def get_request_token() -> str | None:
     """Return the bearer token for the current context, or None if unset (default session applies)."""
     return _current_token.get(None)
@@ -165,12 +382,52 @@ async def _safe_disconnect_after_verify_failure(client: TelegramClient) -> None:
         logger.debug("Disconnect after failed session verification: %s", disc_e)
 
 
+def _auth_key_id(client: TelegramClient) -> int | None:
+    auth_key = getattr(client.session, "auth_key", None)
+    return getattr(auth_key, "key_id", None) if auth_key else None
+
+
+def _remember_verification(client: TelegramClient, token: str) -> None:
+    _verified_sessions[token] = (time.time(), _auth_key_id(client))
+
+
+async def _verify_unless_recent(client: TelegramClient, token: str) -> None:
+    """verify_authorized_connection(), unless this token's auth key passed it recently.
+
+    Within VERIFICATION_TTL_SECONDS the GetState round trip is skipped; auth
+    errors then surface on the first real RPC (see session_error_from_rpc).
+    """
+    cached = _verified_sessions.get(token)
+    if (
+        cached is not None
+        and time.time() - cached[0] < VERIFICATION_TTL_SECONDS
+        and cached[1] is not None
+        and cached[1] == _auth_key_id(client)
+    ):
+        _verification_stats["skipped"] += 1
+        client._authorized = True  # type: ignore[attr-defined]
+        return
+    _verified_sessions.pop(token, None)
+    await verify_authorized_connection(client)
+    _verification_stats["performed"] += 1
+    _remember_verification(client, token)
+
+
+def _prune_verifications(now: float) -> None:
+    for token in [
+        t
+        for t, (verified_at, _) in _verified_sessions.items()
+        if now - verified_at >= VERIFICATION_TTL_SECONDS
+    ]:
+        del _verified_sessions[token]
+
+
 async def _connect_client_and_verify_or_cleanup(
     client: TelegramClient, token: str
 ) -> None:
     try:
         await client.connect()
-        await verify_authorized_connection(client)
+        await _verify_unless_recent(client, token)
     except SessionNotAuthorizedError as e:
         await _safe_disconnect_after_verify_failure(client)
         logger.error(
@@ -184,46 +441,98 @@ async def _connect_client_and_verify_or_cleanup(
         raise
 
 
-async def _evict_lru_if_session_cache_full() -> None:
-    """Evict least-recently-used session if cache is at capacity. Caller must hold _cache_lock."""
-    if len(_session_cache) < MAX_ACTIVE_SESSIONS:
-        return
-    logger.warning(
-        f"Session cache full ({len(_session_cache)}/{MAX_ACTIVE_SESSIONS}), performing LRU eviction"
-    )
-    oldest_token = min(_session_cache.keys(), key=lambda k: _session_cache[k][1])
-    oldest_client, last_access = _session_cache[oldest_token]
+async def _disconnect_evicted_client(
+    token: str, client: TelegramClient, last_access: float
+) -> None:
+    await _demote_to_warm(token, client)
     try:
-        await oldest_client.disconnect()
+        await client.disconnect()
         logger.info(
-            f"Disconnected LRU client for token {oldest_token[:8]}... (last accessed {time.ctime(last_access)})"
+            f"Disconnected evicted client for token {token[:8]}... (last accessed {time.ctime(last_access)})"
         )
     except Exception as e:
         logger.warning(
-            f"Error disconnecting LRU client for token {oldest_token[:8]}...: {e}"
+            f"Error disconnecting evicted client for token {token[:8]}...: {e}"
         )
-    del _session_cache[oldest_token]
-    logger.info(
-        f"Evicted LRU session for token {oldest_token[:8]}... Cache now has {len(_session_cache)} sessions"
+
+
+def _evict_sessions_for_insert() -> None:
+    """Make room for one more session per the pool policy. Caller must hold _cache_lock.
+
+    Evicted clients are disconnected in background tasks so the lock is never held
+    across network I/O.
+    """
+    if len(_session_cache) < _session_cache.capacity:
+        return
+    logger.warning(
+        f"Session cache full ({len(_session_cache)}/{_session_cache.capacity}), "
+        f"evicting by {_session_cache.policy_name} policy"
     )
+    evicted = _session_cache.evict_for_insert()
+    if not evicted:
+        logger.warning(
+            "All cached sessions are pinned; exceeding session cache capacity"
+        )
+    for token, client, last_access in evicted:
+        task = asyncio.create_task(
+            _disconnect_evicted_client(token, client, last_access)
+        )
+        _background_disconnects.add(task)
+        task.add_done_callback(_background_disconnects.discard)
+    if evicted:
+        logger.info(
+            f"Evicted {len(evicted)} session(s). Cache now has {len(_session_cache)} sessions"
+        )
 
 
-async def _build_telegram_client_for_token(
-    session_path: Path, token: str
-) -> TelegramClient:
-    api_id_int = int(API_ID)
+def pin_session(token: str) -> None:
+    """Exempt a token (e.g. a hot tenant) from session cache eviction."""
+    _session_cache.pin(token)
+
+
+def unpin_session(token: str) -> None:
+    """Make a previously pinned token eligible for eviction again."""
+    _session_cache.unpin(token)
+
+
+def _new_telegram_client(session) -> TelegramClient:
     client_kwargs = {
-        "session": session_path,
-        "api_id": api_id_int,
+        "session": session,
+        "api_id": int(API_ID),
         "api_hash": API_HASH,
         "entity_cache_limit": get_config().entity_cache_limit,
     }
     client_kwargs |= build_mtproto_client_args(get_config().mtproto_proxy, logger.info)
     client = TelegramClient(**client_kwargs)
+    install_coalescing(client, get_config().coalesced_request_types, _coalescing_stats)
+    return client
+
+
+async def _build_telegram_client_for_token(
+    session_path: Path, token: str
+) -> TelegramClient:
+    session = session_path
+    if get_config().session_backend == "memory":
+        session = await asyncio.to_thread(load_buffered_session, session_path)
+    client = _new_telegram_client(session)
     await _connect_client_and_verify_or_cleanup(client, token)
     return client
 
 
+async def _rehydrate_warm_client(snapshot: WarmSnapshot, token: str) -> TelegramClient:
+    """Reconnect a warm token from its in-memory snapshot.
+
+    Verification follows the same VERIFICATION_TTL_SECONDS window as cold
+    connects and reconnects: a snapshot can stay warm far longer than that, and
+    its auth key may have been revoked from another device meanwhile.
+    """
+    session = session_from_snapshot(snapshot, SESSION_DIR / f"{token}.session")
+    client = _new_telegram_client(session)
+    await _connect_client_and_verify_or_cleanup(client, token)
+    logger.info(f"Rehydrated warm session for token {token[:8]}...")
+    return client
+
+
 def _try_unlink_session_on_auth_error(session_path: Path, token: str) -> None:
     if not session_path.exists():
         return
@@ -259,34 +568,131 @@ def _log_client_creation_failed(
     )
 
 
+async def _create_and_cache_client(token: str) -> TelegramClient:
+    """Connect a new client for token and publish it in the session cache.
+
+    Runs as the single in-flight connect task for the token; the slow connect and
+    verification happen without holding _cache_lock so other tokens keep flowing.
+    """
+    session_path = SESSION_DIR / f"{token}.session"
+    started = time.perf_counter()
+    snapshot = _warm_sessions.take_for_rehydration(token)
+    try:
+        if snapshot is not None:
+            client = await _rehydrate_warm_client(snapshot, token)
+        else:
+            client = await _build_telegram_client_for_token(session_path, token)
+    except Exception as e:
+        async with _cache_lock:
+            _pending_connects.pop(token, None)
+        if _error_message_suggests_auth_issue(e):
+            await asyncio.to_thread(
+                _try_unlink_session_on_auth_error, session_path, token
+            )
+        _log_client_creation_failed(session_path, token, e)
+        raise
+
+    async with _cache_lock:
+        _pending_connects.pop(token, None)
+        _session_cache.stats.record_connect(time.perf_counter() - started)
+        _evict_sessions_for_insert()
+        _session_cache[token] = (client, time.time())
+    logger.info(f"Created new session for token {token[:8]}...")
+    return client
+
+
 async def _get_client_by_token(token: str) -> TelegramClient:
-    """Get or create a TelegramClient instance for the given token."""
+    """Get or create a TelegramClient instance for the given token.
+
+    Session creation is single-flight per token: concurrent callers for the same
+    token share one connect task, while cache hits for other tokens never wait on it.
+    """
     async with _cache_lock:
-        current_time = time.time()
-        if token in _session_cache:
-            client, _ = _session_cache[token]
-            _session_cache[token] = (client, current_time)
+        client = _session_cache.touch(token)
+        if client is not None:
             return client
 
-        session_path = SESSION_DIR / f"{token}.session"
+        connect_task = _pending_connects.get(token)
+        if connect_task is None:
+            connect_task = asyncio.create_task(_create_and_cache_client(token))
+            _pending_connects[token] = connect_task
+
+    # Shield so a cancelled caller does not abort the connect other callers await.
+    return await asyncio.shield(connect_task)
+
+
+# Temporary files written by the web setup flow (setup-/reauth- prefixes)
+_TEMP_SESSION_PREFIXES = ("setup-", "reauth-")
+
+
+def recent_session_tokens(
+    limit: int, owns: Callable[[str], bool] | None = None
+) -> list[str]:
+    """Tokens of the most recently modified session files, newest first (blocking).
+
+    owns restricts the result to tokens this process serves (multi-worker mode).
+    """
+    candidates: list[tuple[float, str]] = []
+    for path in SESSION_DIR.glob("*.session"):
+        if path.stem.startswith(_TEMP_SESSION_PREFIXES):
+            continue
+        if owns is not None and not owns(path.stem):
+            continue
         try:
-            client = await _build_telegram_client_for_token(session_path, token)
-            await _evict_lru_if_session_cache_full()
-            _session_cache[token] = (client, current_time)
-            logger.info(f"Created new session for token {token[:8]}...")
-            return client
-        except Exception as e:
-            if _error_message_suggests_auth_issue(e):
-                _try_unlink_session_on_auth_error(session_path, token)
-            _log_client_creation_failed(session_path, token, e)
-            raise
+            candidates.append((path.stat().st_mtime, path.stem))
+        except OSError:
+            continue
+    return [token for _, token in heapq.nlargest(limit, candidates)]
+
+
+async def prewarm_sessions(
+    tokens: list[str],
+    concurrency: int,
+    after_connect: Callable[[TelegramClient], Awaitable[Any]] | None = None,
+) -> dict[str, int]:
+    """Connect tokens ahead of their first request, at most concurrency at a time.
+
+    after_connect(client) then fills per-session caches the first request would
+    otherwise wait for (the server passes get_dialog_filters). Failures are
+    logged and counted, never raised: a session that cannot connect now is
+    retried on its first real request as before.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def warm(token: str) -> None:
+        async with semaphore:
+            client = await _get_client_by_token(token)
+            if after_connect is not None:
+                await after_connect(client)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(warm(t) for t in tokens), return_exceptions=True)
+    failed = 0
+    for token, result in zip(tokens, results, strict=True):
+        if isinstance(result, Exception):
+            failed += 1
+            logger.warning(f"Pre-warm failed for token {token[:8]}...: {result}")
+    logger.info(
+        f"Pre-warmed {len(tokens) - failed}/{len(tokens)} sessions "
+        f"in {time.perf_counter() - started:.2f}s"
+    )
+    return {
+        "requested": len(tokens),
+        "connected": len(tokens) - failed,
+        "failed": failed,
+    }
 
 
-async def get_connected_client() -> TelegramClient:
+async def get_connected_client(wait_seconds: float | None = None) -> TelegramClient:
     """
     Get a connected Telegram client, ensuring the connection is established.
     Supports both legacy singleton mode and token-based sessions via unified cache.
 
+    Args:
+        wait_seconds: How long to wait for a reconnect while the token is backing
+            off; None uses the request's set_request_reconnect_wait() deadline,
+            and without one fails fast with SessionTemporarilyUnavailableError
+
     Returns:
         Connected TelegramClient instance
 
@@ -303,95 +709,203 @@ async def get_connected_client() -> TelegramClient:
     # Get client for token (default or specific)
     client = await _get_client_by_token(token)
 
-    if not await ensure_connection(client, token):
+    if wait_seconds is None:
+        wait_seconds = _reconnect_wait.get()
+    if not await ensure_connection(client, token, wait_seconds):
         raise ConnectionError("Failed to establish connection to Telegram")
     return client
 
 
-async def ensure_connection(client: TelegramClient, token: str) -> bool:
-    """Ensure client connection with exponential backoff and circuit breaker."""
-    async with _failure_lock:
-        current_time = time.time()
-        failure_count, last_failure_time = _connection_failures.get(token, (0, 0))
+def _is_fatal_session_error(exc: BaseException) -> bool:
+    error_msg = str(exc).lower()
+    return any(
+        pattern in error_msg
+        for pattern in [
+            "wrong session id",
+            "server replied with a wrong session id",
+            "auth_key_unregistered",
+            "session_revoked",
+            "user_deactivated",
+        ]
+    )
 
-        # Circuit breaker: if too many recent failures, don't attempt connection
-        if (
-            failure_count >= 5 and (current_time - last_failure_time) < 300
-        ):  # 5 failures in 5 minutes
-            logger.warning(
-                f"Circuit breaker open for token {token[:8]}... - too many recent failures"
-            )
-            return False
 
-        # Exponential backoff: wait before retrying
-        if failure_count > 0:
-            backoff_time = min(2**failure_count, 60)
-            wait_time = backoff_time - (current_time - last_failure_time)
+async def _drop_fatal_session(token: str, exc: BaseException) -> None:
+    logger.critical(
+        f"Fatal session error for token {token[:8]}...: {exc}. Removing session and stopping retries."
+    )
+    # Remove session file immediately to prevent loop
+    await forget_session(token, "fatal")
 
-            if wait_time > 0:
-                logger.info(
-                    f"Exponential backoff: waiting {wait_time:.1f}s before retry for token {token[:8]}..."
-                )
-                await asyncio.sleep(wait_time)
+    # Remove from cache to force re-initialization (which will fail auth check)
+    async with _cache_lock:
+        _session_cache.pop(token, None)
+        _verified_sessions.pop(token, None)
 
-    try:
-        if not client.is_connected():
-            logger.warning(
-                f"Client disconnected for token {token[:8]}..., attempting to reconnect..."
-            )
-            await client.connect()
-            await verify_authorized_connection(client)
-            logger.info(f"Successfully reconnected client for token {token[:8]}...")
 
-            # Reset failure count on successful connection
-            async with _failure_lock:
-                _connection_failures.pop(token, None)
+async def forget_session(
+    token: str, reason: str, *, remove_session_file: bool = True
+) -> None:
+    """Forget what is kept about a token's session besides its hot client.
 
-        return client.is_connected()
-    except SessionNotAuthorizedError:
-        logger.error(f"Client reconnected but not authorized for token {token[:8]}...")
-        await _record_connection_failure(token)
-        raise
-    except TelegramTransportError:
-        await _record_connection_failure(token)
-        raise
-    except Exception as e:
-        # Check for fatal session errors that shouldn't be retried
-        error_msg = str(e).lower()
-        is_fatal = any(
-            pattern in error_msg
-            for pattern in [
-                "wrong session id",
-                "server replied with a wrong session id",
-                "auth_key_unregistered",
-                "session_revoked",
-                "user_deactivated",
-            ]
-        )
+    Drops its warm snapshot, entity index (unwritten rows and file) and
+    attachment tickets, and deletes its session file unless remove_session_file
+    is False (the file was just replaced by a reauthorized one). Used on logout,
+    reauthorization and for fatal or failed sessions.
+    """
+    discard_warm_session(token)
+    entity_indexes.discard(token)
+    await revoke_attachment_tickets(token)
+    await asyncio.to_thread(_remove_session_file, token, reason, remove_session_file)
 
-        if is_fatal:
-            logger.critical(
-                f"Fatal session error for token {token[:8]}...: {e}. Removing session and stopping retries."
+
+def _remove_session_file(
+    token: str, reason: str, remove_session_file: bool = True
+) -> None:
+    """Delete a token's session file and entity index (blocking; run it via
+    asyncio.to_thread). The session file goes first: index writes skip tokens
+    without one."""
+    session_path = SESSION_DIR / f"{token}.session"
+    if remove_session_file and session_path.exists():
+        try:
+            session_path.unlink()
+            logger.info(f"Removed {reason} session file for token {token[:8]}...")
+        except Exception as e:
+            logger.warning(f"Error removing {reason} session file {token[:8]}...: {e}")
+    (SESSION_DIR / f"{token}{INDEX_SUFFIX}").unlink(missing_ok=True)
+
+
+def _backoff_state(token: str, now: float) -> tuple[bool, float]:
+    """(circuit_open, seconds_until_next_attempt) for token; caller holds _failure_lock."""
+    failure_count, last_failure_time = _connection_failures.get(token, (0, 0))
+    elapsed = now - last_failure_time
+    if (
+        failure_count >= CIRCUIT_BREAKER_FAILURES
+        and elapsed < CIRCUIT_BREAKER_WINDOW_SECONDS
+    ):
+        return True, CIRCUIT_BREAKER_WINDOW_SECONDS - elapsed
+    if failure_count > 0:
+        return False, max(0.0, min(2**failure_count, MAX_BACKOFF_SECONDS) - elapsed)
+    return False, 0.0
+
+
+def _mark_exception_retrieved(future: asyncio.Future) -> None:
+    # Attempts may finish with nobody waiting; avoid "exception never retrieved".
+    if not future.cancelled():
+        future.exception()
+
+
+class _ReconnectSupervisor:
+    """Background reconnect loop for one token: the only place that reconnects it.
+
+    Owns exponential backoff between attempts, sharing the circuit-breaker state
+    in _connection_failures. ``attempt`` is a future for the current or next
+    attempt: True on success, False on a fatal session error, or an exception
+    (SessionNotAuthorizedError, or SessionTemporarilyUnavailableError carrying
+    the time until the next attempt).
+    """
+
+    def __init__(
+        self, client: TelegramClient, token: str, initial_wait: float = 0.0
+    ) -> None:
+        self.client = client
+        self.token = token
+        # Set before the task first runs so early callers already see the backoff.
+        self.next_attempt_at = time.time() + initial_wait if initial_wait else 0.0
+        self.attempt: asyncio.Future[bool] = self._new_attempt()
+        self.task = asyncio.create_task(self._run())
+
+    @staticmethod
+    def _new_attempt() -> asyncio.Future[bool]:
+        attempt = asyncio.get_running_loop().create_future()
+        attempt.add_done_callback(_mark_exception_retrieved)
+        return attempt
+
+    def retry_after(self) -> float:
+        """Seconds until the next attempt starts; 0 while an attempt is running."""
+        return max(0.0, self.next_attempt_at - time.time())
+
+    def cancel(self) -> None:
+        """Stop supervising; callers waiting on the attempt are told to retry."""
+        self.task.cancel()
+        if not self.attempt.done():
+            self.attempt.set_exception(
+                SessionTemporarilyUnavailableError(
+                    "Session was replaced", retry_after=0
+                )
             )
-            # Remove session file immediately to prevent loop
-            session_path = SESSION_DIR / f"{token}.session"
-            if session_path.exists():
-                try:
-                    session_path.unlink()
-                    logger.info(f"Removed fatal session file for token {token[:8]}...")
-                except Exception as del_e:
-                    logger.warning(f"Failed to remove fatal session file: {del_e}")
 
-            # Remove from cache to force re-initialization (which will fail auth check)
-            async with _cache_lock:
-                _session_cache.pop(token, None)
+    async def _run(self) -> None:
+        token = self.token
+        while True:
+            async with _failure_lock:
+                circuit_open, wait = _backoff_state(token, time.time())
+            if circuit_open:
+                logger.warning(
+                    f"Circuit breaker open for token {token[:8]}... - too many recent failures"
+                )
+                self.attempt.set_exception(
+                    SessionTemporarilyUnavailableError(
+                        "Too many recent connection failures", retry_after=wait
+                    )
+                )
+                return
+            if wait > 0:
+                logger.info(
+                    f"Exponential backoff: next reconnect for token {token[:8]}... in {wait:.1f}s"
+                )
+                self.next_attempt_at = time.time() + wait
+                await asyncio.sleep(wait)
+                self.next_attempt_at = 0.0
+
+            attempt = self.attempt
+            if _session_cache.get(token, (None,))[0] is not self.client:
+                # Evicted or replaced meanwhile; never revive a dropped client.
+                attempt.set_exception(
+                    SessionTemporarilyUnavailableError(
+                        "Session was replaced", retry_after=0
+                    )
+                )
+                return
+            try:
+                logger.warning(
+                    f"Client disconnected for token {token[:8]}..., attempting to reconnect..."
+                )
+                await self.client.connect()
+                await _verify_unless_recent(self.client, token)
+            except SessionNotAuthorizedError as e:
+                logger.error(
+                    f"Client reconnected but not authorized for token {token[:8]}..."
+                )
+                await _record_connection_failure(token)
+                attempt.set_exception(e)
+                return
+            except Exception as e:
+                if _is_fatal_session_error(e):
+                    await _drop_fatal_session(token, e)
+                    attempt.set_result(False)
+                    return
+                await _record_connection_failure(token)
+                self._log_attempt_failure(e)
+                async with _failure_lock:
+                    _, wait = _backoff_state(token, time.time())
+                self.attempt = self._new_attempt()
+                unavailable = SessionTemporarilyUnavailableError(
+                    f"Reconnect failed ({type(e).__name__}: {e})", retry_after=wait
+                )
+                unavailable.__cause__ = e
+                attempt.set_exception(unavailable)
+                continue
 
-            # Don't record as a connection failure, just fail immediately
-            return False
+            logger.info(f"Successfully reconnected client for token {token[:8]}...")
+            async with _failure_lock:
+                _connection_failures.pop(token, None)
+            attempt.set_result(True)
+            return
 
-        await _record_connection_failure(token)
+    def _log_attempt_failure(self, e: Exception) -> None:
         logger.error(
-            f"Error ensuring connection for token {token[:8]}...: {e}",
+            f"Error ensuring connection for token {self.token[:8]}...: {e}",
             extra={
                 "diagnostic_info": format_diagnostic_info(
                     {
@@ -404,7 +918,161 @@ async def ensure_connection(client: TelegramClient, token: str) -> bool:
                 )
             },
         )
-        return False
+
+
+def _reconnect_supervisor_for(
+    client: TelegramClient, token: str, initial_wait: float
+) -> _ReconnectSupervisor:
+    """Return the token's running supervisor, starting one if needed (caller holds _failure_lock).
+
+    A supervisor still reconnecting an older client of the token (one replaced
+    in the session cache) is cancelled and replaced by one for ``client``.
+    """
+    supervisor = _reconnect_supervisors.get(token)
+    if supervisor is not None and supervisor.client is not client:
+        supervisor.cancel()
+        supervisor = None
+    if supervisor is None or supervisor.task.done():
+        supervisor = _ReconnectSupervisor(client, token, initial_wait)
+        _reconnect_supervisors[token] = supervisor
+
+        def _forget(_task: asyncio.Task, supervisor=supervisor) -> None:
+            if _reconnect_supervisors.get(token) is supervisor:
+                del _reconnect_supervisors[token]
+
+        supervisor.task.add_done_callback(_forget)
+    return supervisor
+
+
+async def ensure_connection(
+    client: TelegramClient, token: str, wait_seconds: float | None = None
+) -> bool:
+    """Ensure the client is connected, without sleeping through reconnect backoff.
+
+    A disconnected client is reconnected by the token's background supervisor.
+    The first attempt after a healthy period is awaited as before; while the
+    token is backing off (or its circuit breaker is open) the call raises
+    SessionTemporarilyUnavailableError with ``retry_after`` immediately, unless
+    ``wait_seconds`` allows waiting for an attempt to finish.
+    """
+    if client.is_connected():
+        return True
+
+    async with _failure_lock:
+        circuit_open, wait = _backoff_state(token, time.time())
+        if circuit_open and token not in _reconnect_supervisors:
+            logger.warning(
+                f"Circuit breaker open for token {token[:8]}... - too many recent failures"
+            )
+            raise SessionTemporarilyUnavailableError(
+                "Too many recent connection failures", retry_after=wait
+            )
+        supervisor = _reconnect_supervisor_for(client, token, wait)
+
+    deadline = None if wait_seconds is None else time.time() + wait_seconds
+    while True:
+        remaining = None if deadline is None else deadline - time.time()
+        retry_after = supervisor.retry_after()
+        if retry_after > 0 and (remaining is None or retry_after >= remaining):
+            raise SessionTemporarilyUnavailableError(
+                "Reconnect is backing off", retry_after=retry_after
+            )
+        attempt = supervisor.attempt
+        try:
+            return await asyncio.wait_for(asyncio.shield(attempt), timeout=remaining)
+        except TimeoutError:
+            raise SessionTemporarilyUnavailableError(
+                "Reconnect still in progress",
+                retry_after=supervisor.retry_after() or 1.0,
+            ) from None
+        except SessionTemporarilyUnavailableError:
+            if deadline is None or supervisor.task.done():
+                raise
+
+
+async def keepalive_sessions() -> dict[str, int]:
+    """Ping idle resident clients and reconnect dead ones before a request does.
+
+    Clients are pinged with GetState once they have been idle for about the
+    keepalive interval (jittered per client). A connected client that does not
+    answer within KEEPALIVE_TIMEOUT_SECONDS has a half-open socket: it is
+    disconnected and, like a client found disconnected, handed to the token's
+    reconnect supervisor. Tokens already reconnecting are left alone. Pings do
+    not count as use, so idle cleanup still expires the session.
+    """
+    async with _cache_lock:
+        resident = list(_session_cache.items())
+    _keepalive.prune(token for token, _ in resident)
+
+    now = time.time()
+    due = [
+        (token, client)
+        for token, (client, last_used) in resident
+        if token not in _reconnect_supervisors
+        and _keepalive.is_due(token, last_used, now)
+    ]
+    semaphore = asyncio.Semaphore(KEEPALIVE_CONCURRENCY)
+
+    async def check(token: str, client: TelegramClient) -> str:
+        async with semaphore:
+            return await _keepalive_client(token, client)
+
+    outcomes = await asyncio.gather(*(check(t, c) for t, c in due))
+    return {
+        "checked": len(due),
+        "ok": outcomes.count("ok"),
+        "reconnected": outcomes.count("reconnected"),
+        "failed": outcomes.count("failed"),
+    }
+
+
+async def _keepalive_client(token: str, client: TelegramClient) -> str:
+    """Ping one client; returns "ok", "reconnected" or "failed"."""
+    if client.is_connected():
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(
+                verify_authorized_connection(client), KEEPALIVE_TIMEOUT_SECONDS
+            )
+        except TimeoutError:
+            logger.warning(
+                f"Keepalive ping timed out for token {token[:8]}...; "
+                "treating the connection as half-open"
+            )
+            _keepalive.record_failure(
+                token, "ping timed out", time.time(), half_open=True
+            )
+        except SessionNotAuthorizedError as e:
+            # Reconnecting cannot fix this; the next request reports it.
+            _verified_sessions.pop(token, None)
+            _keepalive.record_failure(token, str(e), time.time())
+            return "failed"
+        except Exception as e:
+            logger.warning(f"Keepalive ping failed for token {token[:8]}...: {e}")
+            _keepalive.record_failure(token, f"{type(e).__name__}: {e}", time.time())
+        else:
+            _keepalive.record_ping(token, time.perf_counter() - started, time.time())
+            _remember_verification(client, token)
+            return "ok"
+
+        if _session_cache.get(token, (None,))[0] is not client:
+            return "failed"  # Evicted while pinging
+        try:
+            await client.disconnect()
+        except Exception as e:
+            logger.debug(f"Error disconnecting stale client {token[:8]}...: {e}")
+    else:
+        _keepalive.record_failure(token, "disconnected", time.time())
+
+    try:
+        connected = await ensure_connection(client, token)
+    except Exception as e:
+        logger.warning(f"Keepalive reconnect failed for token {token[:8]}...: {e}")
+        return "failed"
+    if not connected:
+        return "failed"
+    _keepalive.record_reconnect(token)
+    return "reconnected"
 
 
 async def _record_connection_failure(token: str) -> None:
@@ -420,60 +1088,97 @@ async def _record_connection_failure(token: str) -> None:
 
 async def cleanup_session_cache():
     """Clean up all cached client sessions."""
+    for supervisor in list(_reconnect_supervisors.values()):
+        supervisor.task.cancel()
+    # In-memory sessions hold unflushed entity rows; persist them first.
+    await flush_session_buffers()
     async with _cache_lock:
-        for token, (client, _) in _session_cache.items():
-            try:
-                await client.disconnect()
-                logger.info(f"Disconnected cached client for token {token[:8]}...")
-            except Exception as e:
-                logger.warning(
-                    f"Error disconnecting cached client for token {token[:8]}...: {e}"
-                )
+        resident = [(token, client) for token, (client, _) in _session_cache.items()]
+
+    async def disconnect(token: str, client: TelegramClient) -> None:
+        try:
+            await client.disconnect()
+            logger.info(f"Disconnected cached client for token {token[:8]}...")
+        except Exception as e:
+            logger.warning(
+                f"Error disconnecting cached client for token {token[:8]}...: {e}"
+            )
 
+    await _gather_bounded(
+        (disconnect(token, client) for token, client in resident),
+        CLEANUP_CONCURRENCY,
+    )
+
+    if _background_disconnects:
+        await asyncio.gather(*_background_disconnects, return_exceptions=True)
+    await _spill_to_cold(_warm_sessions.drain())
     _session_cache.clear()
     logger.info("Cleaned up all session cache entries")
 
 
 async def cleanup_failed_sessions():
-    """Clean up sessions that have too many connection failures."""
+    """Clean up sessions that have too many connection failures.
+
+    Failed tokens are taken out of failure tracking and the session cache under
+    the locks; disconnects and session file deletion run after they are
+    released, concurrently and (for the files) off the event loop.
+    """
     async with _failure_lock:
         current_time = time.time()
-        failed_tokens = []
+        failed = []
 
         for token, (failure_count, last_failure_time) in _connection_failures.items():
             # If more than 10 failures and last failure was more than 1 hour ago, clean up
             if failure_count >= 10 and (current_time - last_failure_time) > 3600:
-                failed_tokens.append(token)
+                failed.append((token, failure_count))
 
-        for token in failed_tokens:
-            # Remove from failure tracking
+        for token, _ in failed:
             _connection_failures.pop(token, None)
 
-            # Remove from session cache and disconnect
+    if not failed:
+        return
+
+    async with _cache_lock:
+        clients = {}
+        for token, _ in failed:
             if token in _session_cache:
-                client, _ = _session_cache.pop(token)
-                try:
-                    await client.disconnect()
-                    logger.info(f"Disconnected failed session for token {token[:8]}...")
-                except Exception as e:
-                    logger.warning(
-                        f"Error disconnecting failed session {token[:8]}...: {e}"
-                    )
+                clients[token] = _session_cache.pop(token)[0]
 
-            # Remove session file
-            session_path = SESSION_DIR / f"{token}.session"
-            if session_path.exists():
-                try:
-                    session_path.unlink()
-                    logger.info(f"Removed failed session file for token {token[:8]}...")
-                except Exception as e:
-                    logger.warning(
-                        f"Error removing failed session file {token[:8]}...: {e}"
-                    )
+    async def retire(token: str, failure_count: int) -> None:
+        client = clients.get(token)
+        if client is not None:
+            try:
+                await client.disconnect()
+                logger.info(f"Disconnected failed session for token {token[:8]}...")
+            except Exception as e:
+                logger.warning(
+                    f"Error disconnecting failed session {token[:8]}...: {e}"
+                )
+        await forget_session(token, "failed")
+        logger.info(
+            f"Cleaned up failed session for token {token[:8]}... (had {failure_count} failures)"
+        )
+
+    await _gather_bounded(
+        (retire(token, failure_count) for token, failure_count in failed),
+        CLEANUP_CONCURRENCY,
+    )
 
-            logger.info(
-                f"Cleaned up failed session for token {token[:8]}... (had {failure_count} failures)"
-            )
+
+def _hot_tier_stats() -> dict:
+    """Hot tier size; entity rows count only those held in memory (rehydrated clients)."""
+    in_memory_rows = 0
+    unflushed_rows = 0
+    for client, _ in _session_cache.values():
+        session = getattr(client, "session", None)
+        if isinstance(session, BufferedMemorySession):
+            in_memory_rows += len(session._entities)
+            unflushed_rows += session.dirty_row_count
+    return {
+        "sessions": len(_session_cache),
+        "in_memory_entity_rows": in_memory_rows,
+        "unflushed_entity_rows": unflushed_rows,
+    }
 
 
 async def get_session_health_stats() -> dict:
@@ -483,15 +1188,30 @@ async def get_session_health_stats() -> dict:
         stats = {
             "total_sessions": len(_session_cache),
             "failed_sessions": len(_connection_failures),
+            "pool": _session_cache.describe(),
+            "tiers": {
+                "hot": _hot_tier_stats(),
+                "warm": _warm_sessions.describe(),
+            },
+            "keepalive": _keepalive.describe(),
+            "coalescing": _coalescing_stats.describe(),
+            "verification": {
+                "ttl_seconds": VERIFICATION_TTL_SECONDS,
+                "cached_tokens": len(_verified_sessions),
+                **_verification_stats,
+            },
             "failure_details": {},
         }
 
         for token, (failure_count, last_failure_time) in _connection_failures.items():
+            circuit_open, retry_after = _backoff_state(token, current_time)
+            supervisor = _reconnect_supervisors.get(token)
             stats["failure_details"][f"{token[:8]}..."] = {
                 "failure_count": failure_count,
                 "hours_since_last_failure": (current_time - last_failure_time) / 3600,
-                "circuit_breaker_open": failure_count >= 5
-                and (current_time - last_failure_time) < 300,
+                "circuit_breaker_open": circuit_open,
+                "reconnecting": supervisor is not None,
+                "retry_after_seconds": round(retry_after, 1),
             }
 
         return stats
@@ -0,0 +1,138 @@
+"""Keepalive bookkeeping for resident (hot) clients.
+
+The keepalive loop pings clients that have been idle for about
+``interval_seconds`` so dead or half-open connections are found and reconnected
+before a tool call needs them. This module only decides which tokens are due and
+records what the pings observed; connection.py does the pinging.
+"""
+
+from __future__ import annotations
+
+import random
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from typing import Any
+
+# Each token's interval is scaled by a random factor in [1 - JITTER, 1 + JITTER],
+# re-rolled after every ping, so clients connected together do not ping together.
+KEEPALIVE_JITTER = 0.2
+
+# Weight of the newest sample in the smoothed round-trip time
+RTT_SMOOTHING = 0.3
+
+
+@dataclass
+class ClientHealth:
+    """Keepalive observations for one resident client."""
+
+    jitter: float
+    last_ping_at: float = 0.0
+    last_rtt_ms: float | None = None
+    avg_rtt_ms: float | None = None
+    pings: int = 0
+    failures: int = 0
+    half_open: int = 0
+    reconnects: int = 0
+    last_error: str | None = None
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "last_rtt_ms": _round(self.last_rtt_ms),
+            "avg_rtt_ms": _round(self.avg_rtt_ms),
+            "pings": self.pings,
+            "failures": self.failures,
+            "half_open": self.half_open,
+            "reconnects": self.reconnects,
+            "last_error": self.last_error,
+        }
+
+
+def _round(value: float | None) -> float | None:
+    return None if value is None else round(value, 1)
+
+
+class KeepaliveTracker:
+    """Jittered keepalive schedule plus per-client RTT and failure counters."""
+
+    def __init__(
+        self,
+        interval_seconds: float,
+        jitter: float = KEEPALIVE_JITTER,
+        rng: Callable[[], float] = random.random,
+    ) -> None:
+        self.interval_seconds = interval_seconds
+        self.jitter = jitter
+        self._rng = rng
+        self._clients: dict[str, ClientHealth] = {}
+        self.half_open_detected = 0
+        self.proactive_reconnects = 0
+
+    def _next_jitter(self) -> float:
+        return 1.0 + self.jitter * (2.0 * self._rng() - 1.0)
+
+    def _health(self, token: str) -> ClientHealth:
+        health = self._clients.get(token)
+        if health is None:
+            health = self._clients[token] = ClientHealth(jitter=self._next_jitter())
+        return health
+
+    def is_due(self, token: str, last_used: float, now: float) -> bool:
+        """True when the client has seen neither a request nor a ping for an interval."""
+        if self.interval_seconds <= 0:
+            return False
+        health = self._health(token)
+        quiet_since = max(last_used, health.last_ping_at)
+        return now - quiet_since >= self.interval_seconds * health.jitter
+
+    def record_ping(self, token: str, rtt_seconds: float, now: float) -> None:
+        health = self._health(token)
+        rtt_ms = rtt_seconds * 1000
+        health.last_rtt_ms = rtt_ms
+        health.avg_rtt_ms = (
+            rtt_ms
+            if health.avg_rtt_ms is None
+            else RTT_SMOOTHING * rtt_ms + (1 - RTT_SMOOTHING) * health.avg_rtt_ms
+        )
+        health.pings += 1
+        health.last_error = None
+        self._scheduled(health, now)
+
+    def record_failure(
+        self, token: str, error: str, now: float, half_open: bool = False
+    ) -> None:
+        health = self._health(token)
+        health.failures += 1
+        health.last_error = error
+        if half_open:
+            health.half_open += 1
+            self.half_open_detected += 1
+        self._scheduled(health, now)
+
+    def record_reconnect(self, token: str) -> None:
+        self._health(token).reconnects += 1
+        self.proactive_reconnects += 1
+
+    def _scheduled(self, health: ClientHealth, now: float) -> None:
+        health.last_ping_at = now
+        health.jitter = self._next_jitter()
+
+    def prune(self, resident_tokens: Iterable[str]) -> None:
+        """Forget clients that are no longer resident."""
+        resident = set(resident_tokens)
+        for token in [t for t in self._clients if t not in resident]:
+            del self._clients[token]
+
+    def describe(self) -> dict[str, Any]:
+        rtts = [h.avg_rtt_ms for h in self._clients.values() if h.avg_rtt_ms]
+        return {
+            "interval_seconds": self.interval_seconds,
+            "tracked_clients": len(self._clients),
+            "half_open_detected": self.half_open_detected,
+            "proactive_reconnects": self.proactive_reconnects,
+            "avg_rtt_ms": _round(sum(rtts) / len(rtts)) if rtts else None,
+            "max_rtt_ms": _round(max(rtts)) if rtts else None,
+            "clients": {
+                f"{token[:8]}...": health.as_dict()
+                for token, health in self._clients.items()
+            },
+        }
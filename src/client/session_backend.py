@@ -0,0 +1,179 @@
+"""Session storage backends for per-token Telegram clients.
+
+- ``sqlite`` (default): Telethon's SQLiteSession on ``{token}.session``. Every
+  RPC response's users/chats are written to the file on the event loop thread.
+- ``memory``: the session file is read once at connect into a
+  BufferedMemorySession. Entity rows live in memory and only new or changed rows
+  are written back to the same file in periodic batches, off the event loop.
+  DC and auth key changes (DC migration, a new auth key) are rare and written
+  through at once, as SQLiteSession does.
+
+Either way the ``{token}.session`` file stays the source of truth, so token
+verification, web setup and failed-session cleanup work unchanged.
+"""
+
+from __future__ import annotations
+
+import logging
+import sqlite3
+import time
+from pathlib import Path
+
+from telethon.sessions import SQLiteSession, StringSession
+
+logger = logging.getLogger(__name__)
+
+# (id, access_hash, username, phone, name) — Telethon's MemorySession row shape.
+EntityRow = tuple[int, int, str | None, str | None, str | None]
+# (dc_id, server_address, port, auth_key) of the sessions table
+SessionRow = tuple[int, str | None, int | None, bytes]
+
+
+class BufferedMemorySession(StringSession):
+    """In-memory session that remembers which entity rows are not yet on disk.
+
+    With a session_path, set_dc() and save() (which Telethon calls after changing
+    the auth key) write a changed DC or auth key straight to that file.
+    """
+
+    def __init__(
+        self, string: str | None = None, session_path: Path | None = None
+    ) -> None:
+        super().__init__(string)
+        self._dirty: dict[int, EntityRow] = {}
+        self.session_path = session_path
+        self._stored_auth = self._auth_row()
+
+    def _auth_row(self) -> SessionRow:
+        auth_key = self.auth_key.key if self.auth_key else b""
+        return self.dc_id, self.server_address, self.port, auth_key
+
+    def _write_auth(self) -> None:
+        row = self._auth_row()
+        if self.session_path is None or row == self._stored_auth:
+            return
+        try:
+            write_session_row(self.session_path, row)
+        except sqlite3.Error as e:
+            logger.warning(
+                f"Failed to store DC/auth key in {self.session_path.name}: {e}"
+            )
+            return
+        self._stored_auth = row
+
+    def set_dc(self, dc_id, server_address, port) -> None:
+        super().set_dc(dc_id, server_address, port)
+        self._write_auth()
+
+    def save(self) -> str:
+        self._write_auth()
+        return super().save()
+
+    def process_entities(self, tlo) -> None:
+        rows = self._entities_to_rows(tlo)
+        if not rows:
+            return
+        self._entities |= set(rows)
+        for row in rows:
+            self._dirty[row[0]] = row
+
+    @property
+    def dirty_row_count(self) -> int:
+        return len(self._dirty)
+
+    def mark_dirty(self, rows: list[EntityRow]) -> None:
+        for row in rows:
+            self._dirty[row[0]] = row
+
+    def take_dirty_rows(self) -> list[EntityRow]:
+        rows = list(self._dirty.values())
+        self._dirty.clear()
+        return rows
+
+
+def read_entity_rows(filename: str) -> list[EntityRow]:
+    """Read entity rows from a Telethon SQLite session file (blocking)."""
+    conn = sqlite3.connect(filename)
+    try:
+        return [
+            tuple(r)
+            for r in conn.execute(
+                "select id, hash, username, phone, name from entities"
+            ).fetchall()
+        ]
+    except sqlite3.Error:
+        return []
+    finally:
+        conn.close()
+
+
+def write_entity_rows(session_path: Path, rows: list[EntityRow]) -> int:
+    """Upsert entity rows into an existing session file (blocking).
+
+    Never creates the file: a session deleted meanwhile stays deleted.
+    """
+    if not rows:
+        return 0
+    now = int(time.time())
+    conn = sqlite3.connect(f"file:{session_path}?mode=rw", uri=True)
+    try:
+        with conn:
+            conn.executemany(
+                "insert or replace into entities values (?,?,?,?,?,?)",
+                [(*row, now) for row in rows],
+            )
+    finally:
+        conn.close()
+    return len(rows)
+
+
+def write_session_row(session_path: Path, row: SessionRow) -> None:
+    """Store a session's DC and auth key in its existing file (blocking).
+
+    Keeps the single-row sessions table Telethon expects; never creates the file.
+    """
+    conn = sqlite3.connect(f"file:{session_path}?mode=rw", uri=True)
+    try:
+        with conn:
+            updated = conn.execute(
+                "update sessions set dc_id = ?, server_address = ?, port = ?, auth_key = ?",
+                row,
+            ).rowcount
+            if not updated:
+                conn.execute(
+                    "insert into sessions (dc_id, server_address, port, auth_key)"
+                    " values (?,?,?,?)",
+                    row,
+                )
+    finally:
+        conn.close()
+
+
+def write_entity_row_batches(batches: list[tuple[Path, list[EntityRow]]]) -> int:
+    """Write several sessions' buffered rows in one worker-thread hop (blocking)."""
+    written = 0
+    for session_path, rows in batches:
+        try:
+            written += write_entity_rows(session_path, rows)
+        except sqlite3.Error as e:
+            logger.debug(f"Skipped flushing entities to {session_path.name}: {e}")
+    return written
+
+
+def load_buffered_session(session_path: Path) -> BufferedMemorySession:
+    """Read a session file's auth key and entities into memory (blocking).
+
+    A file without an auth key yields an empty session, which fails the usual
+    authorization check on connect.
+    """
+    sqlite_session = SQLiteSession(str(session_path))
+    try:
+        if not sqlite_session.auth_key:
+            return BufferedMemorySession()
+        session = BufferedMemorySession(
+            StringSession.save(sqlite_session), session_path
+        )
+    finally:
+        sqlite_session.close()
+    session._entities = set(read_entity_rows(str(session_path)))
+    return session
@@ -0,0 +1,311 @@
+"""Bounded pool of live Telegram clients keyed by bearer token.
+
+The pool keeps the ``token -> (client, last_access)`` mapping interface that the
+rest of the server already uses, and adds pluggable O(1) eviction ordering,
+pinned tokens that are never evicted, and hit/miss/eviction/connect statistics.
+"""
+
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass
+from typing import Any, Protocol
+
+# Cost policy inspects at most this many least-recently-used candidates.
+COST_SCAN_WINDOW = 8
+
+
+def live_rpc_count(client: Any) -> int:
+    """Number of RPCs the client's MTProto sender is still waiting on (0 if unknown)."""
+    sender = getattr(client, "_sender", None)
+    pending = getattr(sender, "_pending_state", None)
+    try:
+        return len(pending) if pending is not None else 0
+    except TypeError:
+        return 0
+
+
+class EvictionPolicy(Protocol):
+    """Ordering strategy for unpinned pool entries. All hooks must be O(1)."""
+
+    def on_insert(self, token: str) -> None: ...
+
+    def on_access(self, token: str) -> None: ...
+
+    def on_remove(self, token: str) -> None: ...
+
+    def victim(self, entries: dict[str, tuple[Any, float]]) -> str | None: ...
+
+
+class LRUPolicy:
+    """Evict the least recently used token."""
+
+    def __init__(self) -> None:
+        self._order: OrderedDict[str, None] = OrderedDict()
+
+    def on_insert(self, token: str) -> None:
+        self._order[token] = None
+
+    def on_access(self, token: str) -> None:
+        if token in self._order:
+            self._order.move_to_end(token)
+
+    def on_remove(self, token: str) -> None:
+        self._order.pop(token, None)
+
+    def victim(self, entries: dict[str, tuple[Any, float]]) -> str | None:
+        return next(iter(self._order), None)
+
+
+class LFUPolicy:
+    """Evict the least frequently used token; ties go to the least recently used."""
+
+    def __init__(self) -> None:
+        self._freq: dict[str, int] = {}
+        self._buckets: dict[int, OrderedDict[str, None]] = {}
+        self._min_freq = 0
+
+    def _unlink(self, token: str) -> int:
+        freq = self._freq.pop(token)
+        bucket = self._buckets[freq]
+        del bucket[token]
+        if not bucket:
+            del self._buckets[freq]
+        return freq
+
+    def on_insert(self, token: str) -> None:
+        if token in self._freq:
+            self.on_access(token)
+            return
+        self._freq[token] = 1
+        self._buckets.setdefault(1, OrderedDict())[token] = None
+        self._min_freq = 1
+
+    def on_access(self, token: str) -> None:
+        if token not in self._freq:
+            return
+        freq = self._unlink(token)
+        if freq == self._min_freq and freq not in self._buckets:
+            self._min_freq = freq + 1
+        self._freq[token] = freq + 1
+        self._buckets.setdefault(freq + 1, OrderedDict())[token] = None
+
+    def on_remove(self, token: str) -> None:
+        if token not in self._freq:
+            return
+        freq = self._unlink(token)
+        if freq == self._min_freq and freq not in self._buckets:
+            # Rare path (explicit removal, not eviction): rescan distinct counts.
+            self._min_freq = min(self._buckets, default=0)
+
+    def victim(self, entries: dict[str, tuple[Any, float]]) -> str | None:
+        bucket = self._buckets.get(self._min_freq)
+        return next(iter(bucket), None) if bucket else None
+
+
+class CostWeightedPolicy(LRUPolicy):
+    """Evict the idlest of the oldest entries, weighted by in-flight RPCs.
+
+    Looks at the COST_SCAN_WINDOW least recently used tokens and picks the one
+    with the fewest pending RPCs, so a tenant mid-request is not torn down.
+    """
+
+    def victim(self, entries: dict[str, tuple[Any, float]]) -> str | None:
+        best: str | None = None
+        best_cost = 0
+        for idx, token in enumerate(self._order):
+            if idx >= COST_SCAN_WINDOW:
+                break
+            cost = live_rpc_count(entries[token][0])
+            if best is None or cost < best_cost:
+                best, best_cost = token, cost
+                if cost == 0:
+                    break
+        return best
+
+
+_POLICIES: dict[str, Callable[[], EvictionPolicy]] = {
+    "lru": LRUPolicy,
+    "lfu": LFUPolicy,
+    "cost": CostWeightedPolicy,
+}
+
+
+def make_eviction_policy(name: str) -> EvictionPolicy:
+    """Build an eviction policy by name ('lru', 'lfu', or 'cost')."""
+    try:
+        return _POLICIES[name.lower()]()
+    except KeyError:
+        raise ValueError(
+            f"Unknown session eviction policy '{name}'. Use one of: {sorted(_POLICIES)}"
+        ) from None
+
+
+@dataclass
+class SessionPoolStats:
+    """Counters describing pool efficiency since process start."""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    connects: int = 0
+    connect_seconds_total: float = 0.0
+    connect_seconds_max: float = 0.0
+
+    def record_connect(self, seconds: float) -> None:
+        self.connects += 1
+        self.connect_seconds_total += seconds
+        self.connect_seconds_max = max(self.connect_seconds_max, seconds)
+
+    def as_dict(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "evictions": self.evictions,
+            "connects": self.connects,
+            "avg_connect_seconds": (
+                round(self.connect_seconds_total / self.connects, 4)
+                if self.connects
+                else None
+            ),
+            "max_connect_seconds": round(self.connect_seconds_max, 4),
+        }
+
+
+class SessionPool:
+    """Token-keyed client pool with a dict-like ``token -> (client, last_access)`` view.
+
+    Not thread-safe; callers serialize mutations with ``_cache_lock`` like the
+    plain dict this replaces.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        policy: str = "lru",
+        pinned: Iterable[str] = (),
+    ) -> None:
+        self.capacity = capacity
+        self.policy_name = policy.lower()
+        self._policy = make_eviction_policy(policy)
+        self._entries: dict[str, tuple[Any, float]] = {}
+        self._pinned: set[str] = set(pinned)
+        self.stats = SessionPoolStats()
+
+    # ---- mapping interface -------------------------------------------------
+
+    def __contains__(self, token: object) -> bool:
+        return token in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._entries)
+
+    def __getitem__(self, token: str) -> tuple[Any, float]:
+        return self._entries[token]
+
+    def __setitem__(self, token: str, value: tuple[Any, float]) -> None:
+        existed = token in self._entries
+        self._entries[token] = value
+        if token in self._pinned:
+            return
+        if existed:
+            self._policy.on_access(token)
+        else:
+            self._policy.on_insert(token)
+
+    def __delitem__(self, token: str) -> None:
+        del self._entries[token]
+        self._policy.on_remove(token)
+
+    def get(self, token: str, default: Any = None) -> Any:
+        return self._entries.get(token, default)
+
+    def pop(self, token: str, *default: Any) -> Any:
+        if token not in self._entries:
+            if default:
+                return default[0]
+            raise KeyError(token)
+        value = self._entries.pop(token)
+        self._policy.on_remove(token)
+        return value
+
+    def keys(self):
+        return self._entries.keys()
+
+    def values(self):
+        return self._entries.values()
+
+    def items(self):
+        return self._entries.items()
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._policy = make_eviction_policy(self.policy_name)
+
+    # ---- pool operations ---------------------------------------------------
+
+    def touch(self, token: str) -> Any | None:
+        """Return the cached client and mark it used, counting a hit or miss."""
+        entry = self._entries.get(token)
+        if entry is None:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        self[token] = (entry[0], time.time())
+        return entry[0]
+
+    def is_pinned(self, token: str) -> bool:
+        return token in self._pinned
+
+    def pin(self, token: str) -> None:
+        """Exempt token from eviction (default session, hot tenants)."""
+        if token in self._pinned:
+            return
+        self._pinned.add(token)
+        if token in self._entries:
+            self._policy.on_remove(token)
+
+    def unpin(self, token: str) -> None:
+        if token not in self._pinned:
+            return
+        self._pinned.discard(token)
+        if token in self._entries:
+            self._policy.on_insert(token)
+
+    @property
+    def pinned_tokens(self) -> frozenset[str]:
+        return frozenset(self._pinned)
+
+    def evict_for_insert(self) -> list[tuple[str, Any, float]]:
+        """Remove as many unpinned entries as needed to make room for one insert.
+
+        Returns the evicted ``(token, client, last_access)`` triples; the caller
+        owns disconnecting them. When only pinned entries remain, the pool is
+        allowed to exceed capacity rather than drop a pinned session.
+        """
+        evicted: list[tuple[str, Any, float]] = []
+        while len(self._entries) >= self.capacity:
+            token = self._policy.victim(self._entries)
+            if token is None:
+                break
+            client, last_access = self.pop(token)
+            evicted.append((token, client, last_access))
+        self.stats.evictions += len(evicted)
+        return evicted
+
+    def describe(self) -> dict[str, Any]:
+        """Pool configuration and counters for health reporting."""
+        return {
+            "policy": self.policy_name,
+            "capacity": self.capacity,
+            "size": len(self._entries),
+            "pinned": len(self._pinned),
+            **self.stats.as_dict(),
+        }
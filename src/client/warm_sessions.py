@@ -0,0 +1,197 @@
+"""Warm tier for idle sessions: in-memory auth snapshots without live connections.
+
+A token is in one of three residency tiers:
+
+- hot: a connected ``TelegramClient`` in the session pool;
+- warm: a ``WarmSnapshot`` here (StringSession auth key + DC, plus entity rows),
+  with no socket and no Telethon sender tasks;
+- cold: only the ``{token}.session`` SQLite file on disk.
+
+Rehydrating a warm token skips the SQLite open and the GetState verification
+that a cold connect performs, since the snapshot came from a verified client.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import sys
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from telethon.sessions import MemorySession, SQLiteSession, StringSession
+
+from .session_backend import (
+    BufferedMemorySession,
+    EntityRow,
+    read_entity_rows,
+    write_entity_rows,
+)
+
+
+def _row_nbytes(row: EntityRow) -> int:
+    return sys.getsizeof(row) + sum(sys.getsizeof(v) for v in row)
+
+
+@dataclass
+class WarmSnapshot:
+    """Compact, connection-free state needed to rebuild a client for one token."""
+
+    session_string: str
+    entity_rows: list[EntityRow]
+    # True when rows came from an in-memory session and may be missing on disk.
+    from_memory_session: bool
+    created_at: float = field(default_factory=time.time)
+    nbytes: int = 0
+
+    def __post_init__(self) -> None:
+        if not self.nbytes:
+            self.nbytes = sys.getsizeof(self.session_string) + sum(
+                _row_nbytes(r) for r in self.entity_rows
+            )
+
+
+def snapshot_session(session: Any) -> WarmSnapshot | None:
+    """Capture a client session as a WarmSnapshot; None if it has no auth key.
+
+    Blocking for SQLite-backed sessions (reads the entities table); run it in a
+    worker thread.
+    """
+    if not getattr(session, "auth_key", None):
+        return None
+    session_string = StringSession.save(session)
+    if isinstance(session, SQLiteSession):
+        rows = read_entity_rows(session.filename)
+        return WarmSnapshot(session_string, rows, from_memory_session=False)
+    if isinstance(session, BufferedMemorySession):
+        return WarmSnapshot(
+            session_string,
+            list(session._entities),
+            from_memory_session=session.dirty_row_count > 0,
+        )
+    if isinstance(session, MemorySession):
+        return WarmSnapshot(
+            session_string, list(session._entities), from_memory_session=True
+        )
+    return WarmSnapshot(session_string, [], from_memory_session=False)
+
+
+async def capture_snapshot(session: Any) -> WarmSnapshot | None:
+    """snapshot_session() with SQLite reads moved off the event loop.
+
+    In-memory sessions are captured on the loop thread so their entity set is
+    not iterated while Telethon mutates it.
+    """
+    if isinstance(session, SQLiteSession):
+        return await asyncio.to_thread(snapshot_session, session)
+    return snapshot_session(session)
+
+
+def session_from_snapshot(
+    snapshot: WarmSnapshot, session_path: Path | None = None
+) -> BufferedMemorySession:
+    """Build an in-memory Telethon session carrying the snapshot's auth and entities.
+
+    DC and auth key changes are written through to session_path, if given.
+    """
+    session = BufferedMemorySession(snapshot.session_string, session_path)
+    session._entities = set(snapshot.entity_rows)
+    if snapshot.from_memory_session:
+        # Some rows may never have reached disk; let the next flush write them.
+        session.mark_dirty(snapshot.entity_rows)
+    return session
+
+
+def spill_snapshot_to_file(snapshot: WarmSnapshot, session_path: Path) -> int:
+    """Persist in-memory-only entity rows into the token's SQLite file (blocking).
+
+    Returns the number of rows written. Snapshots whose rows are already on disk
+    are skipped, as are sessions whose file no longer exists.
+    """
+    if not snapshot.from_memory_session or not session_path.exists():
+        return 0
+    return write_entity_rows(session_path, snapshot.entity_rows)
+
+
+class WarmSessionStore:
+    """LRU-bounded, TTL-expiring map of token -> WarmSnapshot."""
+
+    def __init__(self, capacity: int, ttl_seconds: float) -> None:
+        self.capacity = capacity
+        self.ttl_seconds = ttl_seconds
+        self._snapshots: OrderedDict[str, WarmSnapshot] = OrderedDict()
+        self._nbytes = 0
+        self.demotions = 0
+        self.rehydrations = 0
+        self.spills = 0
+
+    def __contains__(self, token: object) -> bool:
+        return token in self._snapshots
+
+    def __len__(self) -> int:
+        return len(self._snapshots)
+
+    def put(self, token: str, snapshot: WarmSnapshot) -> list[tuple[str, WarmSnapshot]]:
+        """Store a snapshot; returns entries pushed out to the cold tier."""
+        if self.capacity <= 0:
+            return [(token, snapshot)]
+        self.pop(token)
+        self._snapshots[token] = snapshot
+        self._nbytes += snapshot.nbytes
+        self.demotions += 1
+        overflow: list[tuple[str, WarmSnapshot]] = []
+        while len(self._snapshots) > self.capacity:
+            old_token, old = self._snapshots.popitem(last=False)
+            self._nbytes -= old.nbytes
+            overflow.append((old_token, old))
+        self.spills += len(overflow)
+        return overflow
+
+    def tokens(self) -> list[str]:
+        return list(self._snapshots)
+
+    def pop(self, token: str) -> WarmSnapshot | None:
+        snapshot = self._snapshots.pop(token, None)
+        if snapshot is not None:
+            self._nbytes -= snapshot.nbytes
+        return snapshot
+
+    def take_for_rehydration(self, token: str) -> WarmSnapshot | None:
+        snapshot = self.pop(token)
+        if snapshot is not None:
+            self.rehydrations += 1
+        return snapshot
+
+    def expire(self, now: float | None = None) -> list[tuple[str, WarmSnapshot]]:
+        """Remove snapshots older than the TTL; returns them for spilling to cold."""
+        cutoff = (now if now is not None else time.time()) - self.ttl_seconds
+        expired: list[tuple[str, WarmSnapshot]] = []
+        # Insertion order is creation order, so stop at the first fresh snapshot.
+        while self._snapshots:
+            token, snapshot = next(iter(self._snapshots.items()))
+            if snapshot.created_at >= cutoff:
+                break
+            self.pop(token)
+            expired.append((token, snapshot))
+        self.spills += len(expired)
+        return expired
+
+    def drain(self) -> list[tuple[str, WarmSnapshot]]:
+        """Remove and return every snapshot (shutdown)."""
+        drained = list(self._snapshots.items())
+        self._snapshots.clear()
+        self._nbytes = 0
+        return drained
+
+    def describe(self) -> dict[str, Any]:
+        return {
+            "sessions": len(self._snapshots),
+            "capacity": self.capacity,
+            "entity_rows": sum(len(s.entity_rows) for s in self._snapshots.values()),
+            "approx_bytes": self._nbytes,
+            "demotions": self.demotions,
+            "rehydrations": self.rehydrations,
+            "spills_to_cold": self.spills,
+        }
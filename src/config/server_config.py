@@ -19,6 +19,23 @@ _DOMAIN_PLACEHOLDER_VALUES: frozenset[str] = frozenset(
     {"your-domain.com", "your-server.com"}
 )
 
+# Read-only requests without side effects whose identical in-flight calls on
+# one session share a single RPC (see src/client/coalescing.py)
+_DEFAULT_COALESCED_REQUESTS = (
+    "ResolveUsernameRequest",
+    "GetFullChannelRequest",
+    "GetFullChatRequest",
+    "GetFullUserRequest",
+    "GetDiscussionMessageRequest",
+    "GetChannelsRequest",
+    "GetChatsRequest",
+    "GetUsersRequest",
+    "GetDialogFiltersRequest",
+    "GetForumTopicsRequest",
+    "GetSearchCountersRequest",
+    "GetPeerDialogsRequest",
+)
+
 
 def _is_loopback_http_host(host_with_optional_port: str) -> bool:
     """True only for localhost / 127.0.0.1 with optional :port (not localhosting.com, etc.)."""
@@ -136,6 +153,183 @@ class ServerConfig(BaseSettings):
         default=10, ge=1, description="Maximum number of active sessions in LRU cache"
     )
 
+    session_eviction_policy: Literal["lru", "lfu", "cost"] = Field(
+        default="lru",
+        description=(
+            "Which active session to evict when the cache is full: lru (least recently "
+            "used), lfu (least frequently used), or cost (idlest of the oldest by in-flight RPCs)"
+        ),
+    )
+
+    pinned_sessions: str = Field(
+        default="",
+        description=(
+            "Comma-separated bearer tokens never evicted from the session cache "
+            "(the default session is always pinned)"
+        ),
+    )
+
+    warm_session_limit: int = Field(
+        default=1000,
+        ge=0,
+        description=(
+            "Maximum idle sessions kept as in-memory auth/entity snapshots (warm tier) "
+            "for fast reconnects; 0 disables the warm tier"
+        ),
+    )
+
+    warm_session_ttl_seconds: int = Field(
+        default=86400,
+        ge=60,
+        description="How long a warm session snapshot is kept before falling back to disk only",
+    )
+
+    session_backend: Literal["sqlite", "memory"] = Field(
+        default="sqlite",
+        description=(
+            "Session storage: sqlite (Telethon writes each response's entities to the "
+            "session file) or memory (entities kept in memory and flushed in batches)"
+        ),
+    )
+
+    session_flush_interval_seconds: int = Field(
+        default=30,
+        ge=1,
+        description="How often in-memory sessions write new entity rows to disk",
+    )
+
+    entity_cache_max_entries: int = Field(
+        default=5000,
+        ge=0,
+        description="Entities cached per session and field class (LRU bounded); 0 disables the cache",
+    )
+
+    entity_cache_ttl_seconds: float = Field(
+        default=600.0,
+        ge=0,
+        description="How long cached entity profiles (title, username, member counts) are reused",
+    )
+
+    entity_type_cache_ttl_seconds: float = Field(
+        default=86400.0,
+        ge=0,
+        description="How long a cached entity type (private/bot/group/channel) is reused",
+    )
+
+    chat_info_cache_ttl_seconds: float = Field(
+        default=300.0,
+        ge=0,
+        description=(
+            "How long get_chat_info results (full info such as about/bio and "
+            "member counts, forum topics) are reused per session; 0 disables"
+        ),
+    )
+
+    message_count_cache_ttl_seconds: float = Field(
+        default=30.0,
+        ge=0,
+        description=(
+            "How long a chat's total message count (include_total_count) is "
+            "reused per session; 0 disables"
+        ),
+    )
+
+    entity_index_enabled: bool = Field(
+        default=True,
+        description=(
+            "Keep a persistent per-session index ({session}.index next to the "
+            "session file) of resolved peers and their display fields"
+        ),
+    )
+
+    negative_cache_ttl_seconds: float = Field(
+        default=30.0,
+        ge=0,
+        description=(
+            "How long an id or username that failed to resolve is answered as "
+            "not found without asking Telegram; doubles with each repeated failure"
+        ),
+    )
+
+    negative_cache_max_ttl_seconds: float = Field(
+        default=900.0,
+        ge=0,
+        description="Upper bound for the doubling negative cache window",
+    )
+
+    verification_ttl_seconds: float = Field(
+        default=300.0,
+        ge=0,
+        description=(
+            "Skip the GetState authorization check when a session reconnects "
+            "within this many seconds of its last successful check; 0 always checks"
+        ),
+    )
+
+    keepalive_interval_seconds: float = Field(
+        default=120.0,
+        ge=0,
+        description=(
+            "Ping resident sessions idle for about this long (jittered) and "
+            "reconnect dead ones before a request needs them; 0 disables keepalive"
+        ),
+    )
+
+    keepalive_timeout_seconds: float = Field(
+        default=10.0,
+        gt=0,
+        description="Keepalive ping timeout; a connected client that does not answer is treated as half-open and reconnected",
+    )
+
+    coalesced_requests: str = Field(
+        default=",".join(_DEFAULT_COALESCED_REQUESTS),
+        description=(
+            "Comma-separated read-only request types (e.g. ResolveUsernameRequest) "
+            "whose identical in-flight calls on one session share a single RPC; "
+            "empty disables coalescing"
+        ),
+    )
+
+    prewarm_sessions: int = Field(
+        default=5,
+        ge=0,
+        description=(
+            "Most recently used sessions to connect at startup, before the HTTP "
+            "server starts accepting requests; 0 disables pre-warming"
+        ),
+    )
+
+    prewarm_concurrency: int = Field(
+        default=4, ge=1, description="Maximum parallel connects while pre-warming"
+    )
+
+    prewarm_timeout_seconds: float = Field(
+        default=30.0,
+        ge=0,
+        description="Startup time budget for pre-warming; slower connects finish in the background",
+    )
+
+    workers: int = Field(
+        default=1,
+        ge=1,
+        description=(
+            "HTTP worker processes; above 1, a front router consistent-hashes each "
+            "bearer token to the worker that owns its Telegram session"
+        ),
+    )
+
+    worker_base_port: int = Field(
+        default=8100,
+        ge=1,
+        le=65535,
+        description="First loopback port for worker processes in multi-worker mode",
+    )
+
+    worker_name: str = Field(
+        default="",
+        description="Set by the multi-worker router on the processes it spawns",
+    )
+
     setup_session_ttl_seconds: int = Field(
         default=900, ge=60, description="TTL for temporary setup sessions (seconds)"
     )
@@ -173,7 +367,18 @@ class ServerConfig(BaseSettings):
         validation_alias=AliasChoices(
             "attachment_ticket_ttl_seconds", "ATTACHMENT_TICKET_TTL_SECONDS"
         ),
-        description="TTL for in-memory attachment download tickets (seconds)",
+        description="TTL for signed attachment download tickets (seconds)",
+    )
+    attachment_ticket_keys: str = Field(
+        default="",
+        validation_alias=AliasChoices(
+            "attachment_ticket_keys", "ATTACHMENT_TICKET_KEYS"
+        ),
+        description=(
+            "Comma-separated secrets signing attachment tickets; the first signs, "
+            "all verify (prepend a new key to rotate). Empty: a random key per "
+            "start, shared by spawned workers"
+        ),
     )
 
     # Logging configuration
@@ -225,6 +430,19 @@ class ServerConfig(BaseSettings):
         """Whether authentication is required (no fallback)."""
         return self.server_mode == ServerMode.HTTP_AUTH
 
+    @property
+    def pinned_session_tokens(self) -> list[str]:
+        """Tokens exempt from session cache eviction, including the default session."""
+        tokens = [t.strip() for t in self.pinned_sessions.split(",") if t.strip()]
+        return [self.session_name, *tokens]
+
+    @property
+    def coalesced_request_types(self) -> frozenset[str]:
+        """Request type names whose identical in-flight calls are coalesced."""
+        return frozenset(
+            t.strip() for t in self.coalesced_requests.split(",") if t.strip()
+        )
+
     @property
     def session_directory(self) -> Path:
         """Get session directory with smart defaults."""
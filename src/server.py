@@ -15,6 +15,10 @@ from src.client.connection import (
     cleanup_failed_sessions,
     cleanup_idle_sessions,
     cleanup_session_cache,
+    flush_session_buffers,
+    keepalive_sessions,
+    prewarm_sessions,
+    recent_session_tokens,
 )
 from src.config.logging import setup_logging
 from src.config.server_config import get_config
@@ -24,6 +28,14 @@ from src.server_components.health import register_health_routes
 from src.server_components.mtproto_api import register_mtproto_api_routes
 from src.server_components.tools_register import register_tools
 from src.server_components.web_setup import register_web_setup_routes
+from src.server_components.worker_router import (
+    register_worker_routes,
+    run_multi_worker,
+    worker_names,
+)
+from src.utils.entity import get_dialog_filters
+from src.utils.entity_index import entity_indexes
+from src.utils.hash_ring import HashRing
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +45,15 @@ config = get_config()
 # Background cleanup task
 _cleanup_task = None
 
+# Background pre-warm of the default session (stdio mode)
+_prewarm_task = None
+
+# Background flush of in-memory session entities and entity indexes
+_flush_task = None
+
+# Background keepalive of resident sessions
+_keepalive_task = None
+
 
 async def cleanup_loop():
     """Background task to clean up failed and idle sessions."""
@@ -50,22 +71,109 @@ async def cleanup_loop():
             await asyncio.sleep(60)  # Wait before retrying
 
 
+async def prewarm_on_startup() -> None:
+    """Connect recently used sessions so first requests skip the cold connect.
+
+    HTTP startup waits (up to prewarm_timeout_seconds) so the server only accepts
+    requests once sessions are resident; connects still running at the deadline
+    keep going in the background. stdio must answer the MCP handshake at once, so
+    the default session connects in the background instead.
+    """
+    global _prewarm_task
+    if config.prewarm_sessions <= 0:
+        return
+
+    if config.transport == "stdio":
+        _prewarm_task = asyncio.create_task(
+            prewarm_sessions(
+                [config.session_name], concurrency=1, after_connect=get_dialog_filters
+            )
+        )
+        return
+
+    if config.require_auth:
+        limit = min(config.prewarm_sessions, config.max_active_sessions)
+        owns = None
+        if config.worker_name:
+            # Pre-warm only the tokens the router sends to this worker.
+            ring = HashRing(worker_names(config.workers))
+
+            def owns(token: str) -> bool:
+                return ring.node_for_token(token) == config.worker_name
+
+        tokens = await asyncio.to_thread(recent_session_tokens, limit, owns)
+    else:
+        tokens = [config.session_name]
+    if not tokens:
+        return
+
+    logger.info(f"Pre-warming {len(tokens)} sessions before accepting requests")
+    _prewarm_task = asyncio.create_task(
+        prewarm_sessions(
+            tokens, config.prewarm_concurrency, after_connect=get_dialog_filters
+        )
+    )
+    # Unlike wait_for, wait leaves the task running at the deadline
+    done, _ = await asyncio.wait(
+        {_prewarm_task}, timeout=config.prewarm_timeout_seconds
+    )
+    if not done:
+        logger.warning(
+            f"Pre-warm exceeded {config.prewarm_timeout_seconds}s; "
+            "remaining sessions keep connecting in the background"
+        )
+
+
+async def session_flush_loop():
+    """Background task writing buffered session entities and entity indexes to disk."""
+    while True:
+        try:
+            await asyncio.sleep(config.session_flush_interval_seconds)
+            await flush_session_buffers()
+            await entity_indexes.flush()
+        except asyncio.CancelledError:
+            break
+        except Exception as e:
+            logger.error(f"Error flushing session entities: {e}")
+
+
+async def keepalive_loop():
+    """Background task pinging idle sessions and reconnecting dead ones."""
+    # Per-client due times are jittered; checking a few times per interval keeps
+    # pings close to schedule.
+    tick = max(1.0, config.keepalive_interval_seconds / 4)
+    while True:
+        try:
+            await asyncio.sleep(tick)
+            await keepalive_sessions()
+        except asyncio.CancelledError:
+            break
+        except Exception as e:
+            logger.error(f"Error in keepalive task: {e}")
+
+
 @asynccontextmanager
 async def lifespan(app: FastMCP):
     """Lifecycle manager for the MCP server."""
     # Startup
-    global _cleanup_task
+    global _cleanup_task, _flush_task, _keepalive_task
     _cleanup_task = asyncio.create_task(cleanup_loop())
+    _flush_task = asyncio.create_task(session_flush_loop())
+    if config.keepalive_interval_seconds > 0:
+        _keepalive_task = asyncio.create_task(keepalive_loop())
+    await prewarm_on_startup()
 
     yield
 
     # Shutdown
-    if _cleanup_task:
-        _cleanup_task.cancel()
-        with contextlib.suppress(asyncio.CancelledError):
-            await _cleanup_task
+    for task in (_prewarm_task, _cleanup_task, _flush_task, _keepalive_task):
+        if task:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
 
     await cleanup_session_cache()
+    await entity_indexes.flush()
 
 
 setup_logging()
@@ -86,12 +194,16 @@ register_web_setup_routes(mcp)
 register_mtproto_api_routes(mcp)
 register_attachment_routes(mcp)
 register_tools(mcp)
+if config.worker_name:
+    register_worker_routes(mcp, config.worker_name)
 
 
 def main():
     """Entry point for console script; runs the MCP server."""
     transport: Literal["stdio", "http"] = config.transport
-    if transport == "http":
+    if transport == "http" and config.workers > 1 and not config.worker_name:
+        run_multi_worker(config)
+    elif transport == "http":
         # Use http_app() to get the Starlette application so we can add middleware
         app = mcp.http_app(
             path="/v1/mcp",
@@ -1,18 +1,41 @@
-"""In-memory attachment download tickets (UUID → session + message locator)."""
+"""Stateless attachment download tickets, signed with HMAC-SHA256.
+
+A ticket id is ``{token_routing_key}.{key_id}.{payload}.{signature}``. The
+payload holds the message locator, expiry and file metadata, and the signature
+under one of ATTACHMENT_TICKET_KEYS lets any worker or node verify it without
+shared state. The routing key prefix sends a download to the worker that owns
+the session (multi-worker router) and is the ticket's session reference: the
+bearer token never appears in a URL, the verifying process maps the key back
+to a session it serves.
+
+Keys rotate by prepending a new secret: the first key signs, every listed key
+verifies. Logging a session out (revoke_attachment_tickets) writes a
+"{routing_key}.tickets-revoked" marker with the revocation time next to the
+session files; every process refuses tickets issued before it, so revocation
+reaches all workers and nodes sharing the session directory. Markers are
+removed once the tickets they refuse would have expired anyway.
+"""
 
 from __future__ import annotations
 
 import asyncio
+import base64
+import contextlib
+import hashlib
+import hmac
+import json
+import secrets
 import time
-import uuid
 from dataclasses import dataclass
+from functools import lru_cache
 
 from src.config.server_config import get_config
+from src.utils.hash_ring import token_routing_key
 
 
 @dataclass(frozen=True)
 class AttachmentTicket:
-    """Server-side record for streaming one message's media without Bearer on GET."""
+    """Verified ticket contents for streaming one message's media without Bearer on GET."""
 
     session_token: str
     chat_id: int
@@ -22,15 +45,43 @@ class AttachmentTicket:
     mime_type: str | None
 
 
-_tickets: dict[str, AttachmentTicket] = {}
-_lock = asyncio.Lock()
+# Signs tickets when ATTACHMENT_TICKET_KEYS is empty; valid until restart
+_EPHEMERAL_KEY = secrets.token_hex(32)
 
+# Sessions by routing key: minted here, or found among the session files
+_session_refs: dict[str, str] = {}
+_found_refs: dict[str, str] = {}
+# Routing key -> when its session logged out (µs); older tickets are refused.
+# Revocations made here; the markers also carry other processes' revocations.
+_revoked: dict[str, int] = {}
 
-def _prune_expired_unlocked() -> None:
-    now = time.time()
-    dead = [k for k, v in _tickets.items() if v.expires_at <= now]
-    for k in dead:
-        del _tickets[k]
+REVOKED_SUFFIX = ".tickets-revoked"
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+@lru_cache(maxsize=4)
+def _keys(raw_keys: str) -> dict[str, bytes]:
+    """Secrets by key id, signing key first."""
+    keys = [k.strip() for k in raw_keys.split(",") if k.strip()] or [_EPHEMERAL_KEY]
+    return {hashlib.sha256(k.encode()).hexdigest()[:8]: k.encode() for k in keys}
+
+
+def signing_keys_env() -> dict[str, str]:
+    """Environment that makes spawned worker processes share this process's keys."""
+    return {
+        "ATTACHMENT_TICKET_KEYS": get_config().attachment_ticket_keys or _EPHEMERAL_KEY
+    }
+
+
+def _signature(key: bytes, signed: str) -> str:
+    return _b64encode(hmac.new(key, signed.encode(), hashlib.sha256).digest())
 
 
 async def mint_attachment_ticket(
@@ -41,11 +92,112 @@ async def mint_attachment_ticket(
     filename: str | None = None,
     mime_type: str | None = None,
 ) -> str:
-    """Create a ticket; returns UUID string. Multi-use until expiry."""
+    """Create a ticket; returns its id. Multi-use until expiry."""
+    tickets = await mint_attachment_tickets(
+        session_token, [(chat_id, message_id, filename, mime_type)]
+    )
+    return tickets[0]
+
+
+async def mint_attachment_tickets(
+    session_token: str,
+    locators: list[tuple[int, int, str | None, str | None]],
+) -> list[str]:
+    """Create one ticket per (chat_id, message_id, filename, mime_type) locator.
+
+    Returns the ticket ids in locator order. Signing needs no lock or store.
+    """
     cfg = get_config()
-    tid = str(uuid.uuid4())
-    expires_at = time.time() + float(cfg.attachment_ticket_ttl_seconds)
-    rec = AttachmentTicket(
+    key_id, key = next(iter(_keys(cfg.attachment_ticket_keys).items()))
+    prefix = token_routing_key(session_token)
+    _session_refs[prefix] = session_token
+    issued_us = time.time_ns() // 1000
+    expires_at = issued_us // 1_000_000 + cfg.attachment_ticket_ttl_seconds
+
+    ticket_ids = []
+    for chat_id, message_id, filename, mime_type in locators:
+        fields = [chat_id, message_id, expires_at, issued_us, filename, mime_type]
+        payload = _b64encode(json.dumps(fields, separators=(",", ":")).encode())
+        signed = f"{prefix}.{key_id}.{payload}"
+        ticket_ids.append(f"{signed}.{_signature(key, signed)}")
+    return ticket_ids
+
+
+def _verified_fields(ticket_id: str) -> tuple[str, list] | None:
+    """(routing key, payload fields) of a validly signed, unexpired ticket."""
+    parts = ticket_id.split(".")
+    if len(parts) != 4:
+        return None
+    prefix, key_id, payload, signature = parts
+    key = _keys(get_config().attachment_ticket_keys).get(key_id)
+    if key is None or not hmac.compare_digest(
+        signature, _signature(key, f"{prefix}.{key_id}.{payload}")
+    ):
+        return None
+    try:
+        fields = json.loads(_b64decode(payload))
+    except ValueError:
+        return None
+    if fields[2] <= time.time():
+        return None
+    return prefix, fields
+
+
+def _find_session_token(routing_key: str) -> str | None:
+    """Session token with this routing key among the session files (blocking)."""
+    session_dir = get_config().session_directory
+    token = _found_refs.get(routing_key)
+    if token is not None and (session_dir / f"{token}.session").exists():
+        return token
+    for path in session_dir.glob("*.session"):
+        if token_routing_key(path.stem) == routing_key:
+            _found_refs[routing_key] = path.stem
+            return path.stem
+    return None
+
+
+def _revoked_at(routing_key: str) -> int:
+    """When the session with this routing key last logged out (µs), or -1 (blocking)."""
+    marker = get_config().session_directory / f"{routing_key}{REVOKED_SUFFIX}"
+    try:
+        return int(marker.read_text())
+    except (OSError, ValueError):
+        return -1
+
+
+def _write_revocation(routing_key: str, revoked_us: int) -> None:
+    """Write a revocation marker and drop the expired ones (blocking)."""
+    session_dir = get_config().session_directory
+    expired_before = time.time() - get_config().attachment_ticket_ttl_seconds
+    for marker in session_dir.glob(f"*{REVOKED_SUFFIX}"):
+        with contextlib.suppress(OSError):
+            if marker.stat().st_mtime < expired_before:
+                marker.unlink()
+    marker = session_dir / f"{routing_key}{REVOKED_SUFFIX}"
+    marker.parent.mkdir(parents=True, exist_ok=True)
+    partial = marker.with_name(f"{marker.name}.{secrets.token_hex(4)}.tmp")
+    partial.write_text(str(revoked_us))
+    partial.replace(marker)
+
+
+async def get_attachment_ticket(ticket_id: str) -> AttachmentTicket | None:
+    """Return the ticket if validly signed, not expired and its session still serves."""
+    verified = _verified_fields(ticket_id)
+    if verified is None:
+        return None
+    prefix, fields = verified
+    chat_id, message_id, expires_at, issued_us, filename, mime_type = fields
+    if issued_us <= _revoked.get(prefix, -1):
+        return None
+    if issued_us <= await asyncio.to_thread(_revoked_at, prefix):
+        return None
+
+    session_token = _session_refs.get(prefix)
+    if session_token is None:
+        session_token = await asyncio.to_thread(_find_session_token, prefix)
+        if session_token is None:
+            return None
+    return AttachmentTicket(
         session_token=session_token,
         chat_id=chat_id,
         message_id=message_id,
@@ -53,26 +205,24 @@ async def mint_attachment_ticket(
         filename=filename,
         mime_type=mime_type,
     )
-    async with _lock:
-        _prune_expired_unlocked()
-        _tickets[tid] = rec
-    return tid
 
 
-async def get_attachment_ticket(ticket_id: str) -> AttachmentTicket | None:
-    """Return ticket if present and not expired."""
-    async with _lock:
-        _prune_expired_unlocked()
-        rec = _tickets.get(ticket_id)
-        if rec is None:
-            return None
-        if rec.expires_at <= time.time():
-            del _tickets[ticket_id]
-            return None
-        return rec
+async def revoke_attachment_tickets(session_token: str) -> None:
+    """Refuse every ticket minted so far for a logged-out session, in every process."""
+    now_us = time.time_ns() // 1000
+    prefix = token_routing_key(session_token)
+    _session_refs.pop(prefix, None)
+    _found_refs.pop(prefix, None)
+    _revoked[prefix] = now_us
+    # Tickets issued before a revocation this old have expired by now
+    ttl_us = get_config().attachment_ticket_ttl_seconds * 1_000_000
+    for key in [k for k, at in _revoked.items() if at + ttl_us < now_us]:
+        del _revoked[key]
+    await asyncio.to_thread(_write_revocation, prefix, now_us)
 
 
 async def clear_attachment_tickets_for_tests() -> None:
-    """Reset store (tests only)."""
-    async with _lock:
-        _tickets.clear()
+    """Reset session references and revocations (tests only)."""
+    _session_refs.clear()
+    _found_refs.clear()
+    _revoked.clear()
@@ -3,12 +3,31 @@ import logging
 from collections.abc import Callable
 from functools import wraps
 
-from src.client.connection import set_request_token
+from src.client.connection import set_request_reconnect_wait, set_request_token
 from src.config.server_config import get_config
 
 logger = logging.getLogger(__name__)
 
 
+# Per-request bound on waiting for a reconnect instead of failing fast
+RECONNECT_WAIT_HEADER = "x-reconnect-wait"
+MAX_RECONNECT_WAIT_SECONDS = 30.0
+
+
+def reconnect_wait_from_headers(headers) -> float | None:
+    """Seconds from the X-Reconnect-Wait header, capped; None when absent or invalid."""
+    raw = headers.get(RECONNECT_WAIT_HEADER)
+    if raw is None:
+        return None
+    try:
+        seconds = float(raw)
+    except ValueError:
+        return None
+    if not 0 < seconds < float("inf"):
+        return None
+    return min(seconds, MAX_RECONNECT_WAIT_SECONDS)
+
+
 class AuthenticationError(Exception):
     """Exception raised when authentication fails."""
 
@@ -91,7 +110,10 @@ def with_auth_context(func: Callable) -> Callable:
 
     @wraps(func)
     async def wrapper(*args, **kwargs):
+        from fastmcp.server.dependencies import get_http_headers
+
         config = get_config()
+        set_request_reconnect_wait(reconnect_wait_from_headers(get_http_headers()))
 
         if config.disable_auth:
             set_request_token(None)
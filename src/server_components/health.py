@@ -10,6 +10,7 @@ from src.client.connection import (
 )
 from src.config.settings import SESSION_DIR
 from src.server_components.web_setup import _setup_sessions
+from src.utils.entity import get_entity_cache_stats
 
 
 def register_health_routes(mcp_app):
@@ -43,5 +44,6 @@ def register_health_routes(mcp_app):
                 "setup_sessions": len(_setup_sessions),
                 "sessions": session_info,
                 "health_stats": health_stats,
+                "entity_cache": get_entity_cache_stats(),
             }
         )
@@ -97,6 +97,29 @@ IncludeTotalCount = Annotated[
     ),
 ]
 
+MessageFields = Annotated[
+    list[str],
+    Field(
+        description=(
+            "Message fields to return, e.g. ['id', 'date', 'text']: id, date, text, "
+            "link, sender, chat, reply_to_msg_id, topic_id, media, forwarded_from, "
+            "reply_markup, transcription. id is always included. Fields left out "
+            "are not fetched (fewer lookups, faster). Omit for all fields."
+        )
+    ),
+]
+
+NormalizeEntities = Annotated[
+    bool,
+    Field(
+        description=(
+            "If true, messages carry sender_id / chat_id (and forwarded_from ids) "
+            "instead of full entity objects, and the response has one entities map "
+            "keyed by those ids. Smaller responses when senders or chats repeat."
+        )
+    ),
+]
+
 MessageBody = Annotated[
     str,
     Field(description="Message text. When sending files, used as caption."),
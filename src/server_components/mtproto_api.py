@@ -3,9 +3,12 @@ import logging
 
 from starlette.responses import JSONResponse
 
-from src.client.connection import set_request_token
+from src.client.connection import set_request_reconnect_wait, set_request_token
 from src.config.server_config import get_config
-from src.server_components.auth import extract_bearer_token_from_request
+from src.server_components.auth import (
+    extract_bearer_token_from_request,
+    reconnect_wait_from_headers,
+)
 from src.tools.mtproto import DANGEROUS_METHODS, invoke_mtproto_impl
 from src.utils.error_handling import log_and_build_error
 from src.utils.helpers import normalize_method_name
@@ -29,6 +32,7 @@ def register_mtproto_api_routes(mcp_app) -> None:
     @mcp_app.custom_route("/mtproto-api/v1/{method}", methods=["POST"])
     async def mtproto_api(request):
         config = get_config()
+        set_request_reconnect_wait(reconnect_wait_from_headers(request.headers))
 
         # Auth handling per server mode
         if config.require_auth:
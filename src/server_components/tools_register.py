@@ -20,10 +20,12 @@ from src.server_components.mcp_tool_types import (
     LimitMessages,
     MaxDate,
     MessageBody,
+    MessageFields,
     MessageIdInChat,
     MessageIds,
     MethodFullName,
     MinDate,
+    NormalizeEntities,
     ParamsJson,
     ParseMode,
     PhoneE164,
@@ -142,6 +144,8 @@ def register_tools(mcp: FastMCP) -> None:
         public: PublicFilter = None,
         auto_expand_batches: AutoExpandBatches = 2,
         include_total_count: IncludeTotalCount = False,
+        fields: MessageFields = None,
+        normalize_entities: NormalizeEntities = False,
     ) -> dict[str, Any]:
         """Global Telegram message search (full doc URL is in the MCP tool description)."""
         return await search_messages_impl(
@@ -154,6 +158,8 @@ def register_tools(mcp: FastMCP) -> None:
             public=public,
             auto_expand_batches=auto_expand_batches,
             include_total_count=include_total_count,
+            fields=fields,
+            normalize_entities=normalize_entities,
         )
 
     @mcp.tool(
@@ -176,6 +182,8 @@ def register_tools(mcp: FastMCP) -> None:
         max_date: MaxDate = None,
         auto_expand_batches: AutoExpandBatches = 2,
         include_total_count: IncludeTotalCount = False,
+        fields: MessageFields = None,
+        normalize_entities: NormalizeEntities = False,
     ) -> dict[str, Any]:
         """Browse, search, fetch by ids, or load replies in one chat (full doc URL in tool description)."""
         return await search_messages_impl(
@@ -189,6 +197,8 @@ def register_tools(mcp: FastMCP) -> None:
             chat_type=None,
             auto_expand_batches=auto_expand_batches,
             include_total_count=include_total_count,
+            fields=fields,
+            normalize_entities=normalize_entities,
         )
 
     @mcp.tool(
@@ -15,11 +15,17 @@ from telethon.errors import PasswordHashInvalidError, SessionPasswordNeededError
 from telethon.errors.rpcerrorlist import PhoneNumberFloodError
 from telethon.tl.functions.account import GetPasswordRequest
 
-from src.client.connection import _cache_lock, _session_cache, generate_bearer_token
+from src.client.connection import (
+    _cache_lock,
+    _session_cache,
+    forget_session,
+    generate_bearer_token,
+)
 from src.config.server_config import ServerMode, get_config
 from src.config.settings import API_HASH, API_ID
 from src.server_components.auth import RESERVED_SESSION_NAMES
 from src.server_components.auth_middleware import generate_url_based_config
+from src.utils.hash_ring import token_routing_key
 from src.utils.mcp_config import generate_mcp_config_json
 from src.utils.proxy import build_mtproto_client_args
 
@@ -190,6 +196,21 @@ async def _cleanup_session_state(state: dict[str, Any]):
                 p.unlink(missing_ok=True)
 
 
+async def _disconnect_cached_client(token: str) -> None:
+    """Disconnect and drop the token's resident client, if this process has one."""
+    async with _cache_lock:
+        if token in _session_cache:
+            client, _ = _session_cache[token]
+            try:
+                await client.disconnect()
+            except Exception as e:
+                # Log but don't fail the caller
+                logger.warning(
+                    f"Error disconnecting client for token {token[:8]}...: {e}"
+                )
+            del _session_cache[token]
+
+
 async def setup_complete_reauth(request: Request):
     """Complete reauthorization by replacing the original session file with reauthorized version."""
     form = await request.form()
@@ -220,8 +241,13 @@ async def setup_complete_reauth(request: Request):
         with contextlib.suppress(Exception):
             await client.disconnect()
 
-        # Replace original session with reauthorized one
+        # Replace original session with reauthorized one; the resident client
+        # still holds the old auth key
+        await _disconnect_cached_client(str(existing_token))
         temp_path.replace(original_path)
+        await forget_session(
+            str(existing_token), "reauthorized", remove_session_file=False
+        )
 
         # Clean up
         state.clear()
@@ -527,8 +553,9 @@ def register_web_setup_routes(mcp_app):
                 {"error": REAUTH_SESSION_CHECK_FAILED_MESSAGE},
             )
 
-        # Session needs reauthorization - create temp session for reauth
-        setup_id = str(int(time.time() * 1000))
+        # Session needs reauthorization - create temp session for reauth. The
+        # routing key prefix keeps every step on the worker owning the token.
+        setup_id = f"{token_routing_key(existing_token)}-{int(time.time() * 1000)}"
         temp_session_path = (
             get_config().session_directory
             / f"{REAUTH_SESSION_PREFIX}{setup_id}.session"
@@ -661,21 +688,12 @@ def register_web_setup_routes(mcp_app):
 
         try:
             # Disconnect client from cache if it's active
-            async with _cache_lock:
-                if token in _session_cache:
-                    client, _ = _session_cache[token]
-                    try:
-                        await client.disconnect()
-                    except Exception as e:
-                        # Log but don't fail the deletion
-                        logger.warning(
-                            f"Error disconnecting client for token {token[:8]}...: {e}"
-                        )
-                    # Remove from cache
-                    del _session_cache[token]
-
-            # Delete the session file
-            session_path.unlink()
+            await _disconnect_cached_client(token)
+
+            # Delete the session file, its entity index and attachment tickets
+            await forget_session(token, "deleted")
+            if session_path.exists():
+                raise OSError(f"Session file {session_path.name} was not removed")
 
             return _fragment(
                 request,
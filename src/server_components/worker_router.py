@@ -0,0 +1,388 @@
+"""Token-affine front router for multi-worker HTTP deployments.
+
+With WORKERS > 1, main() runs WorkerRouter on HOST:PORT and WorkerSupervisor
+spawns WORKERS copies of the server on loopback ports starting at
+WORKER_BASE_PORT. Each bearer token is consistent-hashed to one worker, which
+owns that tenant's TelegramClient and per-session caches; requests without a
+token (web setup, health) go to the owner of CONTROL_ROUTING_KEY so the
+multi-step setup flow stays on one process. Setup steps that act on an
+existing session (delete, reauthorization) carry its token, or a setup id
+prefixed with its routing key, in the form body and go to the session's owner,
+which is the process holding its client and caches.
+
+Workers that exit, refuse connections or fail HEALTH_CHECK_FAILURES health
+checks in a row leave the ring and their tokens move to the remaining workers;
+a recovered worker rejoins and takes its share back. Before the ring changes,
+routing pauses while every worker that loses tokens is told to disconnect them
+(RELEASE_SESSIONS_PATH), so two processes never serve one session file at
+once. A worker that is unreachable when it leaves cannot be told; it keeps its
+clients until it rejoins, and its moved tokens may be opened twice meanwhile.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import os
+import re
+import subprocess
+import sys
+from collections import Counter
+from collections.abc import Mapping
+from typing import TYPE_CHECKING, Any
+from urllib.parse import parse_qs
+
+import httpx
+from starlette.background import BackgroundTask
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+
+from src.client.connection import release_sessions
+from src.server_components.attachment_tickets import signing_keys_env
+from src.server_components.auth_middleware import PATH_PATTERN
+from src.utils.hash_ring import HashRing, token_routing_key
+
+if TYPE_CHECKING:
+    from src.config.server_config import ServerConfig
+
+logger = logging.getLogger(__name__)
+
+CONTROL_ROUTING_KEY = "control"
+HEALTH_CHECK_INTERVAL = 2.0
+HEALTH_CHECK_TIMEOUT = 2.0
+# Consecutive failed probes before a live worker leaves the ring; a single miss
+# (a GC pause or event-loop stall) must not move its tokens
+HEALTH_CHECK_FAILURES = 3
+
+# Worker-only endpoints; the router never forwards client requests to them
+INTERNAL_PATH_PREFIX = "/internal/"
+RELEASE_SESSIONS_PATH = f"{INTERNAL_PATH_PREFIX}release-sessions"
+
+_ATTACHMENT_PATH = re.compile(r"^/v1/attachments/([0-9a-f]{16})\.")
+_SESSION_SETUP_ID = re.compile(r"^([0-9a-f]{16})-\d+$")
+_HOP_BY_HOP_HEADERS = frozenset(
+    {"connection", "keep-alive", "transfer-encoding", "upgrade", "te", "trailer"}
+)
+
+
+def worker_names(count: int) -> list[str]:
+    return [f"worker-{i}" for i in range(count)]
+
+
+def _setup_form_routing_key(headers: Mapping[str, str], body: bytes) -> str | None:
+    """Routing key of the session a web setup form acts on, if any."""
+    if not headers.get("content-type", "").startswith(
+        "application/x-www-form-urlencoded"
+    ):
+        return None
+    form = parse_qs(body.decode("latin-1"))
+    if token := form.get("token", [""])[0].strip():
+        return token_routing_key(token)
+    if match := _SESSION_SETUP_ID.match(form.get("setup_id", [""])[0].strip()):
+        return match.group(1)
+    return None
+
+
+def request_routing_key(
+    path: str, headers: Mapping[str, str], body: bytes = b""
+) -> str:
+    """Routing key for a request: its bearer token, ticket owner, or the control key."""
+    auth = headers.get("authorization", "")
+    if auth[:7].lower() == "bearer " and auth[7:].strip():
+        return token_routing_key(auth[7:].strip())
+    if match := PATH_PATTERN.match(path):
+        return token_routing_key(match.group(1))
+    if match := _ATTACHMENT_PATH.match(path):
+        return match.group(1)
+    if path.startswith("/setup/") and (key := _setup_form_routing_key(headers, body)):
+        return key
+    return CONTROL_ROUTING_KEY
+
+
+class WorkerRouter:
+    """ASGI app forwarding each request to the worker that owns its token."""
+
+    def __init__(
+        self,
+        workers: Mapping[str, str],
+        *,
+        transport: httpx.AsyncBaseTransport | None = None,
+        supervisor: WorkerSupervisor | None = None,
+        startup_timeout: float = 0.0,
+    ) -> None:
+        self._workers = dict(workers)  # name -> base URL
+        self.ring = HashRing(self._workers)
+        self._supervisor = supervisor
+        self._startup_timeout = startup_timeout
+        self._client = httpx.AsyncClient(
+            transport=transport, timeout=httpx.Timeout(None, connect=5.0)
+        )
+        self._health_task: asyncio.Task[None] | None = None
+        self._failed_probes: Counter[str] = Counter()
+        # Cleared while tokens move between workers
+        self._routable = asyncio.Event()
+        self._routable.set()
+        self.routed: Counter[str] = Counter()
+
+    # ---- membership ----------------------------------------------------------
+
+    def add_worker(self, name: str) -> None:
+        if name in self._workers and name not in self.ring:
+            self.ring.add(name)
+            logger.info(f"Worker {name} joined; ring has {len(self.ring)} workers")
+
+    def remove_worker(self, name: str) -> None:
+        if name in self.ring:
+            self.ring.remove(name)
+            logger.warning(f"Worker {name} left; ring has {len(self.ring)} workers")
+
+    async def _release_moved(self, name: str, members: set[str]) -> None:
+        """Have a worker disconnect the tokens it does not own in a ring of members."""
+        try:
+            response = await self._client.post(
+                self._workers[name] + RELEASE_SESSIONS_PATH,
+                json={"workers": sorted(members)},
+                timeout=HEALTH_CHECK_TIMEOUT,
+            )
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            logger.warning(f"Worker {name} did not release moved sessions: {e}")
+
+    async def rebalance(self, members: set[str]) -> None:
+        """Change the ring to members once its current workers released moved tokens.
+
+        Requests wait meanwhile, so no token is served by its new owner while
+        the previous one still holds a client on its session file.
+        """
+        if members == self.ring.nodes:
+            return
+        self._routable.clear()
+        try:
+            await asyncio.gather(
+                *(self._release_moved(name, members) for name in self.ring.nodes)
+            )
+            for name in self.ring.nodes - members:
+                self.remove_worker(name)
+            for name in members - self.ring.nodes:
+                self.add_worker(name)
+        finally:
+            self._routable.set()
+
+    async def check_workers(self) -> None:
+        """Probe every worker's /health and rebalance the ring on changes."""
+
+        async def probe(name: str, base_url: str) -> tuple[str, bool]:
+            try:
+                response = await self._client.get(
+                    f"{base_url}/health", timeout=HEALTH_CHECK_TIMEOUT
+                )
+                return name, response.status_code == 200
+            except httpx.HTTPError:
+                return name, False
+
+        results = await asyncio.gather(
+            *(probe(name, url) for name, url in self._workers.items())
+        )
+        members = set(self.ring.nodes)
+        for name, healthy in results:
+            if healthy:
+                self._failed_probes.pop(name, None)
+                members.add(name)
+            else:
+                self._failed_probes[name] += 1
+                if self._failed_probes[name] >= HEALTH_CHECK_FAILURES:
+                    members.discard(name)
+        await self.rebalance(members)
+
+    async def wait_for_workers(self, timeout: float) -> None:
+        """Admit workers as they pass health checks, until all are up or timeout.
+
+        Workers pre-warm sessions before binding, so they can take a while.
+        """
+        for name in list(self.ring.nodes):
+            self.ring.remove(name)
+        deadline = asyncio.get_running_loop().time() + timeout
+        while len(self.ring) < len(self._workers):
+            await self.check_workers()
+            if asyncio.get_running_loop().time() >= deadline:
+                break
+            await asyncio.sleep(0.5)
+        if len(self.ring) < len(self._workers):
+            logger.warning(
+                f"{len(self.ring)}/{len(self._workers)} workers healthy after "
+                f"{timeout:.0f}s; the rest join when ready"
+            )
+
+    async def _health_loop(self) -> None:
+        while True:
+            await asyncio.sleep(HEALTH_CHECK_INTERVAL)
+            try:
+                if self._supervisor:
+                    for name in self._supervisor.restart_exited():
+                        self.remove_worker(name)
+                await self.check_workers()
+            except Exception as e:
+                logger.error(f"Error in worker health check: {e}")
+
+    # ---- ASGI ----------------------------------------------------------------
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+        response = await self._forward(Request(scope, receive))
+        await response(scope, receive, send)
+
+    async def _lifespan(self, receive, send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                if self._startup_timeout > 0:
+                    await self.wait_for_workers(self._startup_timeout)
+                self._health_task = asyncio.create_task(self._health_loop())
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                if self._health_task:
+                    self._health_task.cancel()
+                    with contextlib.suppress(asyncio.CancelledError):
+                        await self._health_task
+                await self._client.aclose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _forward(self, request: Request):
+        if request.url.path.startswith(INTERNAL_PATH_PREFIX):
+            return JSONResponse({"error": "Not found"}, status_code=404)
+        await self._routable.wait()
+        body = await request.body()
+        key = request_routing_key(request.url.path, request.headers, body)
+        headers = [
+            (k, v)
+            for k, v in request.headers.items()
+            if k not in _HOP_BY_HOP_HEADERS and k != "content-length"
+        ]
+        # A worker that refuses the connection never saw the request, so it is
+        # safe to drop it from the ring and retry on the next owner.
+        while (worker := self.ring.node_for(key)) is not None:
+            upstream_request = self._client.build_request(
+                request.method,
+                self._workers[worker] + request.url.path,
+                params=request.url.query,
+                headers=headers,
+                content=body,
+            )
+            try:
+                upstream = await self._client.send(upstream_request, stream=True)
+            except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+                logger.warning(f"Worker {worker} unreachable: {e}")
+                self.remove_worker(worker)
+                continue
+            self.routed[worker] += 1
+            response = StreamingResponse(
+                upstream.aiter_raw(),
+                status_code=upstream.status_code,
+                background=BackgroundTask(upstream.aclose),
+            )
+            # Raw header list keeps repeated headers such as set-cookie.
+            response.raw_headers = [
+                (k, v)
+                for k, v in upstream.headers.raw
+                if k.decode("latin-1").lower() not in _HOP_BY_HOP_HEADERS
+            ]
+            return response
+        return JSONResponse({"error": "No healthy workers available"}, status_code=503)
+
+    def describe(self) -> dict[str, Any]:
+        return {
+            "workers": sorted(self._workers),
+            "in_ring": sorted(self.ring.nodes),
+            "routed": dict(self.routed),
+        }
+
+
+def register_worker_routes(mcp_app, worker_name: str) -> None:
+    """Endpoints the router calls on a worker process (loopback only)."""
+
+    @mcp_app.custom_route(RELEASE_SESSIONS_PATH, methods=["POST"])
+    async def release_moved_sessions(request: Request):
+        ring = HashRing((await request.json())["workers"])
+        released = await release_sessions(
+            lambda token: ring.node_for_token(token) == worker_name
+        )
+        return JSONResponse({"released": len(released)})
+
+
+class WorkerSupervisor:
+    """Spawns and restarts server worker processes on loopback ports."""
+
+    def __init__(self, count: int, base_port: int, argv: list[str]) -> None:
+        self._argv = argv
+        self._ports = {
+            name: base_port + i for i, name in enumerate(worker_names(count))
+        }
+        self._processes: dict[str, subprocess.Popen] = {}
+
+    @property
+    def urls(self) -> dict[str, str]:
+        return {name: f"http://127.0.0.1:{port}" for name, port in self._ports.items()}
+
+    def _spawn(self, name: str) -> None:
+        cmd = [
+            sys.executable,
+            "-m",
+            "src.server",
+            *self._argv,
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(self._ports[name]),
+            "--worker-name",
+            name,
+        ]
+        # Every worker verifies the tickets the others minted
+        env = {**os.environ, **signing_keys_env()}
+        self._processes[name] = subprocess.Popen(cmd, env=env)
+        logger.info(f"Started {name} (pid {self._processes[name].pid})")
+
+    def start(self) -> None:
+        for name in self._ports:
+            self._spawn(name)
+
+    def restart_exited(self) -> list[str]:
+        """Respawn workers whose process exited; returns their names."""
+        exited = [n for n, p in self._processes.items() if p.poll() is not None]
+        for name in exited:
+            logger.warning(
+                f"{name} exited with code {self._processes[name].returncode}; restarting"
+            )
+            self._spawn(name)
+        return exited
+
+    def stop(self) -> None:
+        for process in self._processes.values():
+            process.terminate()
+        for process in self._processes.values():
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+def run_multi_worker(config: ServerConfig) -> None:
+    """Run the token-affine router in front of config.workers server processes."""
+    import uvicorn
+
+    supervisor = WorkerSupervisor(config.workers, config.worker_base_port, sys.argv[1:])
+    supervisor.start()
+    router = WorkerRouter(
+        supervisor.urls,
+        supervisor=supervisor,
+        startup_timeout=config.prewarm_timeout_seconds + 30,
+    )
+    try:
+        uvicorn.run(router, host=config.host, port=config.port, log_level="info")
+    finally:
+        supervisor.stop()
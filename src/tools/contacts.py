@@ -25,11 +25,16 @@ from src.client.connection import (
 from src.utils.entity import (
     _matches_chat_type,
     _matches_public_filter,
+    _resolution_cache_key,
     build_dialog_entity_dict,
     build_entity_dict,
-    build_entity_dict_enriched,
+    cached_full_info,
+    enrich_entity_dict,
     get_dialog_filters,
     get_entity_by_id,
+    record_indexed_entities,
+    resolve_indexed,
+    resolve_many,
 )
 from src.utils.error_handling import log_and_build_error
 
@@ -98,8 +103,6 @@ logger = logging.getLogger(__name__)
 FLAG_MATCH_MAX_DIALOGS = 500
 # messages.getPeerDialogs: conservative batch size; raising requires checking current layer input limits.
 GET_PEER_DIALOGS_CHUNK_SIZE = 50
-# Parallel get_entity for include/exclude resolution (semaphore limit).
-GET_ENTITY_CONCURRENCY = 8
 AVAILABLE_FILTERS_MAX_SHOW = 10
 
 
@@ -222,12 +225,30 @@ async def search_contacts_native(
         chat_type: Optional filter for chat type ("private"|"group"|"channel")
         public: Optional filter for public discoverability (True=with username, False=without username)
 
+    Exact ``@username`` and ``+phone`` queries the session's entity index
+    already knows are answered without a search request.
+
     Yields:
         Contact dictionaries one by one
     """
     try:
+        if (entity := await resolve_indexed(query)) is not None:
+            if (
+                (not chat_type or _matches_chat_type(entity, chat_type))
+                and _matches_public_filter(entity, public)
+                and (info := build_entity_dict(entity))
+            ):
+                yield info
+            return
+
         client = await get_connected_client()
         result = await client(SearchRequest(q=query, limit=limit))
+        record_indexed_entities(
+            [
+                *(getattr(result, "users", None) or []),
+                *(getattr(result, "chats", None) or []),
+            ]
+        )
 
         count = 0
 
@@ -634,66 +655,42 @@ async def _find_chats_by_include_peers(
     include_peers = filter_dict.get("include_peers", []) or []
     exclude_peers = filter_dict.get("exclude_peers", []) or []
 
-    # Resolve include_peers InputPeers → actual entities
+    # Resolve include_peers/exclude_peers InputPeers → actual entities, batched
     ordered_peer_ids: list[int] = []
     peer_entity_map: dict[int, dict] = {}
     peer_objects: dict[int, Any] = {}
-    sem = asyncio.Semaphore(GET_ENTITY_CONCURRENCY)
-
-    async def _get_include(inp_peer) -> tuple[Any | None, dict | None]:
-        async with sem:
-            try:
-                ent = await client.get_entity(inp_peer)
-                eid = getattr(ent, "id", None)
-                if eid is None:
-                    return None, None
-                ed = build_entity_dict(ent)
-                if not ed:
-                    return None, None
-                return ent, ed
-            except Exception as e:
-                logger.debug("Failed to resolve include_peer %s: %s", inp_peer, e)
-                return None, None
 
     t_incl = time.monotonic()
-    include_results: list = []
+    resolved: dict = {}
     if include_peers:
-        include_results = list(
-            await asyncio.gather(*(_get_include(p) for p in include_peers))
-        )
+        resolved = await resolve_many([*include_peers, *exclude_peers], client=client)
     if include_peers and logger.isEnabledFor(logging.DEBUG):
         logger.debug(
-            "find_chats include_peers get_entity: n=%d duration_s=%.3f",
-            len(include_peers),
+            "find_chats include_peers resolve_many: n=%d resolved=%d duration_s=%.3f",
+            len(include_peers) + len(exclude_peers),
+            len(resolved),
             time.monotonic() - t_incl,
         )
 
-    for ent, ent_dict in include_results:
-        if not ent or not ent_dict:
+    for inp_peer in include_peers:
+        ent = resolved.get(_resolution_cache_key(inp_peer))
+        if not ent:
+            logger.debug("Failed to resolve include_peer %s", inp_peer)
             continue
         eid = getattr(ent, "id", None)
         if eid is None or eid in ordered_peer_ids:
             continue
+        if not (ent_dict := build_entity_dict(ent)):
+            continue
         ordered_peer_ids.append(eid)
         peer_entity_map[eid] = ent_dict
         peer_objects[eid] = ent
 
     # Apply exclude_peers
-    async def _get_exclude_id(inp_peer) -> int | None:
-        async with sem:
-            try:
-                e = await client.get_entity(inp_peer)
-                eid = getattr(e, "id", None)
-                if isinstance(eid, int):
-                    return eid
-                return None
-            except Exception as e:
-                logger.debug("Failed to resolve exclude_peer %s: %s", inp_peer, e)
-                return None
-
     if exclude_peers:
-        for eid in await asyncio.gather(*(_get_exclude_id(p) for p in exclude_peers)):
-            if eid and eid in ordered_peer_ids:
+        for inp_peer in exclude_peers:
+            eid = getattr(resolved.get(_resolution_cache_key(inp_peer)), "id", None)
+            if isinstance(eid, int) and eid in ordered_peer_ids:
                 ordered_peer_ids.remove(eid)
                 peer_entity_map.pop(eid, None)
                 peer_objects.pop(eid, None)
@@ -1178,26 +1175,74 @@ async def get_chat_info_impl(chat_id: str, topics_limit: int = 20) -> dict[str,
             exception=ValueError(not_found_msg),
         )
 
-    info = await build_entity_dict_enriched(entity)
+    # Full info and forum topics are fetched concurrently and cached per session
+    if getattr(entity, "forum", False):
+        (info, info_cached, info_age), topics = await asyncio.gather(
+            _cached_entity_info(entity), _cached_forum_topics(entity, topics_limit)
+        )
+    else:
+        info, info_cached, info_age = await _cached_entity_info(entity)
+        topics = None
+
     if info is None:
         return log_and_build_error(
             operation="get_chat_info",
             error_message="Failed to build entity info",
             params=params,
-            exception=ValueError("build_entity_dict_enriched returned None"),
+            exception=ValueError("enrich_entity_dict returned None"),
         )
 
+    info = dict(info)
+    from_cache, age = info_cached, info_age
     # Add topics list only for forum-enabled chats.
-    if info.get("is_forum"):
-        try:
-            topics_result = await _list_forum_topics(entity, topics_limit)
+    if topics is not None:
+        topics_result, topics_cached, topics_age = topics
+        if topics_result is not None:
             info["topics"] = topics_result["topics"]
             info["topics_has_more"] = topics_result["has_more"]
-        except Exception as e:
-            logger.debug(f"Failed to fetch forum topics for {chat_id}: {e}")
+            from_cache = from_cache and topics_cached
+            age = max(age, topics_age)
 
+    info["from_cache"] = from_cache
+    info["cache_age_seconds"] = round(age, 1)
     return info
 
 
+async def _cached_entity_info(entity) -> tuple[dict | None, bool, float]:
+    """enrich_entity_dict through cached_full_info (dict shared with the cache).
+
+    A partial result (a full-info request failed) is returned but not cached.
+    """
+    complete = True
+
+    async def fetch() -> dict | None:
+        nonlocal complete
+        info, complete = await enrich_entity_dict(entity)
+        return info
+
+    return await cached_full_info(
+        ("enriched", _resolution_cache_key(entity)),
+        fetch,
+        cacheable=lambda _info: complete,
+    )
+
+
+async def _cached_forum_topics(
+    entity, topics_limit: int
+) -> tuple[dict[str, Any] | None, bool, float]:
+    """_list_forum_topics through cached_full_info; None when the fetch failed."""
+
+    async def fetch() -> dict[str, Any] | None:
+        try:
+            return await _list_forum_topics(entity, topics_limit)
+        except Exception as e:
+            logger.debug(f"Failed to fetch forum topics for {entity.id}: {e}")
+            return None
+
+    return await cached_full_info(
+        ("topics", _resolution_cache_key(entity), topics_limit), fetch
+    )
+
+
 # Backwards-compatible alias
 get_chat_info = get_chat_info_impl
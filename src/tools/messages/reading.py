@@ -5,12 +5,19 @@ from __future__ import annotations
 import logging
 from typing import Any
 
+from telethon import utils
+
 from src.client.connection import get_connected_client
 from src.tools.links import generate_telegram_links
 from src.utils.entity import build_entity_dict, get_entity_by_id
 from src.utils.error_handling import log_and_build_error
 from src.utils.logging_utils import log_operation_start, log_operation_success
-from src.utils.message_format import build_message_result, transcribe_voice_messages
+from src.utils.message_format import (
+    build_message_results_batch,
+    project_message_result,
+    transcribe_voice_messages,
+    wants_field,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -66,34 +73,48 @@ async def _build_message_results(
     entity,
     id_to_link: dict,
     chat_dict: dict,
+    fields: frozenset[str] | None = None,
+    entity_table: dict[str, dict[str, Any]] | None = None,
 ) -> list[dict[str, Any]]:
     """Build result dictionaries for all requested messages."""
-    results: list[dict[str, Any]] = []
-
-    for idx, requested_id in enumerate(message_ids):
-        msg = _find_message_by_id(messages, requested_id, idx)
-
-        if not msg:
-            results.append(
-                {
-                    "id": requested_id,
-                    "chat": chat_dict,
-                    "error": "Message not found or inaccessible",
-                }
-            )
-            continue
-
-        link = id_to_link.get(getattr(msg, "id", requested_id))
-        built = await build_message_result(
-            client, msg, entity, link, include_chat_entity=False
+    chat_ref = {"chat": chat_dict}
+    if entity_table is not None:
+        chat_id = utils.get_peer_id(entity)
+        entity_table.setdefault(str(chat_id), chat_dict)
+        chat_ref = {"chat_id": chat_id}
+    matches = [
+        _find_message_by_id(messages, requested_id, idx)
+        for idx, requested_id in enumerate(message_ids)
+    ]
+    found = [msg for msg in matches if msg]
+    built = iter(
+        await build_message_results_batch(
+            client,
+            found,
+            entity,
+            [id_to_link.get(msg.id) for msg in found],
+            fields=fields,
+            entity_table=entity_table,
         )
-        results.append(built)
+    )
 
-    return results
+    return [
+        next(built)
+        if msg
+        else {
+            "id": requested_id,
+            **chat_ref,
+            "error": "Message not found or inaccessible",
+        }
+        for msg, requested_id in zip(matches, message_ids, strict=True)
+    ]
 
 
 async def read_messages_by_ids(
-    chat_id: str, message_ids: list[int]
+    chat_id: str,
+    message_ids: list[int],
+    fields: frozenset[str] | None = None,
+    entity_table: dict[str, dict[str, Any]] | None = None,
 ) -> list[dict[str, Any]]:
     """
     Read specific messages by their IDs from a given chat.
@@ -101,6 +122,8 @@ async def read_messages_by_ids(
     Args:
         chat_id: Target chat identifier (username like '@channel', numeric ID, or '-100...' form)
         message_ids: List of message IDs to fetch
+        fields: Optional projection of each result (see message_fields)
+        entity_table: Normalized output (see build_message_results_batch)
 
     Returns:
         List of message dictionaries consistent with search results format
@@ -143,18 +166,28 @@ async def read_messages_by_ids(
         if not isinstance(messages, list):
             messages = [messages]
 
-        id_to_link = await _build_message_link_mapping(
-            chat_id, message_ids, resolved_entity=entity
-        )
+        id_to_link = {}
+        if wants_field(fields, "link"):
+            id_to_link = await _build_message_link_mapping(
+                chat_id, message_ids, resolved_entity=entity
+            )
         chat_dict = build_entity_dict(entity) or {}
 
         results = await _build_message_results(
-            client, messages, message_ids, entity, id_to_link, chat_dict
+            client,
+            messages,
+            message_ids,
+            entity,
+            id_to_link,
+            chat_dict,
+            fields,
+            entity_table,
         )
 
         successful_results = [r for r in results if "error" not in r]
-        if successful_results:
+        if successful_results and wants_field(fields, "transcription"):
             await transcribe_voice_messages(successful_results, entity)
+        results = [project_message_result(r, fields) for r in results]
 
         successful_count = len(successful_results)
         log_operation_success(
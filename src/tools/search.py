@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from datetime import datetime, timezone
 from enum import Enum, auto
@@ -15,18 +16,28 @@ from src.utils.entity import (
     _matches_chat_type,
     _matches_public_filter,
     compute_entity_identifier,
+    entity_from_map,
     get_entity_by_id,
+    response_entities,
 )
 from src.utils.error_handling import log_and_build_error, log_connection_error_response
 from src.utils.helpers import _append_dedup_until_limit
 from src.utils.message_format import (
     _has_any_media,
-    build_message_result,
+    build_message_results_batch,
+    message_fields,
+    prefetch_message_entities,
+    project_message_result,
+    referenced_entities,
     transcribe_voice_messages,
+    wants_field,
 )
 
 logger = logging.getLogger(__name__)
 
+# Messages per build_message_results_batch call in per-chat search
+MESSAGE_PAGE_SIZE = 100
+
 
 class MessageRetrievalMode(Enum):
     """Enumeration of message retrieval modes for get_messages."""
@@ -76,50 +87,126 @@ async def _handle_message_ids_mode(
     chat_id: str,
     message_ids: list[int],
     params: dict[str, Any],
+    fields: frozenset[str] | None = None,
+    entity_table: dict[str, dict[str, Any]] | None = None,
 ) -> dict[str, Any]:
     """Handle reading specific messages by IDs with unified output format."""
-    messages_list = await read_messages_by_ids(chat_id, message_ids)
+    messages_list = await read_messages_by_ids(
+        chat_id, message_ids, fields, entity_table
+    )
 
     if len(messages_list) == 1 and "error" in messages_list[0]:
         return messages_list[0]
 
-    return {
+    response = {
         "messages": messages_list,
         "has_more": False,
     }
+    if entity_table is not None:
+        response["entities"] = referenced_entities(messages_list, entity_table)
+    return response
 
 
-async def _build_result_for_message(
+async def _build_results_for_messages(
     client,
-    message,
+    messages: list,
     chat_entity,
     include_chat_entity: bool = False,
-) -> dict[str, Any] | None:
-    """Build result dict for a single message with link generation.
-
-    Returns None if message is invalid or has no content.
+    entities: dict | None = None,
+    chats: list | None = None,
+    fields: frozenset[str] | None = None,
+    entity_table: dict[str, dict[str, Any]] | None = None,
+) -> list[dict[str, Any]]:
+    """Build result dicts with links for a page of messages in one batch.
+
+    chats: optional chat entity per message (global search); otherwise every
+    message is in chat_entity. entities, fields, entity_table: passed on to
+    build_message_results_batch.
+
+    Messages without content, or whose chat has no link identifier, are skipped;
+    links are not generated when fields leaves them out.
     """
-    if not message:
-        return None
+    if chats is None:
+        chats = [chat_entity] * len(messages)
+    pending = [
+        (message, chat)
+        for message, chat in zip(messages, chats, strict=True)
+        if message
+        and ((hasattr(message, "text") and message.text) or _has_any_media(message))
+    ]
+
+    if not wants_field(fields, "link"):
+        return await _build_results_batch(
+            client,
+            pending,
+            chat_entity,
+            None,
+            include_chat_entity,
+            entities,
+            fields,
+            entity_table,
+        )
+
+    # One generate_telegram_links call per chat; None when it has no identifier
+    message_ids: dict[int, tuple[Any, list[int]]] = {}
+    for message, chat in pending:
+        message_ids.setdefault(id(chat), (chat, []))[1].append(message.id)
+    chat_links: dict[int, dict[int, str] | None] = {}
+    for key, (chat, ids) in message_ids.items():
+        chat_links[key] = None
+        try:
+            identifier = compute_entity_identifier(chat)
+            if identifier is None:
+                continue
+            info = await generate_telegram_links(identifier, ids, resolved_entity=chat)
+            chat_links[key] = dict(
+                zip(ids, info.get("message_links") or [], strict=False)
+            )
+        except Exception as e:
+            logger.warning(f"Error processing message: {e}")
+
+    page = [(m, chat) for m, chat in pending if chat_links[id(chat)] is not None]
+    links = [chat_links[id(chat)].get(m.id) for m, chat in page]
+    return await _build_results_batch(
+        client,
+        page,
+        chat_entity,
+        links,
+        include_chat_entity,
+        entities,
+        fields,
+        entity_table,
+    )
 
-    has_content = (hasattr(message, "text") and message.text) or _has_any_media(message)
-    if not has_content:
-        return None
 
+async def _build_results_batch(
+    client,
+    page: list[tuple[Any, Any]],
+    chat_entity,
+    links: list[str | None] | None,
+    include_chat_entity: bool,
+    entities: dict | None,
+    fields: frozenset[str] | None,
+    entity_table: dict[str, dict[str, Any]] | None,
+) -> list[dict[str, Any]]:
+    """build_message_results_batch for (message, chat) pairs; [] on failure."""
+    if not page:
+        return []
     try:
-        identifier = compute_entity_identifier(chat_entity)
-        if identifier is None:
-            return None
-        links = await generate_telegram_links(
-            identifier, [message.id], resolved_entity=chat_entity
-        )
-        link = links.get("message_links", [None])[0]
-        return await build_message_result(
-            client, message, chat_entity, link, include_chat_entity
+        return await build_message_results_batch(
+            client,
+            [m for m, _ in page],
+            chat_entity,
+            links,
+            include_chat_entity=include_chat_entity,
+            entities=entities,
+            chats=[chat for _, chat in page],
+            fields=fields,
+            entity_table=entity_table,
         )
     except Exception as e:
-        logger.warning(f"Error processing message: {e}")
-        return None
+        logger.warning(f"Error processing messages: {e}")
+        return []
 
 
 async def _fetch_replies(
@@ -129,6 +216,8 @@ async def _fetch_replies(
     limit: int,
     query: str | None = None,
     include_chat_entity: bool = False,
+    fields: frozenset[str] | None = None,
+    entity_table: dict[str, dict[str, Any]] | None = None,
 ) -> tuple[list[dict[str, Any]], dict[str, Any] | None]:
     """
     Fetch replies/comments for a message.
@@ -162,24 +251,27 @@ async def _fetch_replies(
         except ValueError:
             logger.debug(f"Channel post {reply_to_id} has no discussion enabled")
 
-    collected = []
-    async for message in client.iter_messages(
-        effective_entity,
-        reply_to=effective_reply_to,
-        search=query or None,
-        limit=limit + 1,
-    ):
-        result = await _build_result_for_message(
-            client, message, effective_entity, include_chat_entity
+    messages = [
+        message
+        async for message in client.iter_messages(
+            effective_entity,
+            reply_to=effective_reply_to,
+            search=query or None,
+            limit=limit + 1,
         )
-        if not result:
-            continue
-
-        collected.append(result)
-        if len(collected) >= limit + 1:
-            break
+    ]
+    collected = await _build_results_for_messages(
+        client,
+        messages,
+        effective_entity,
+        include_chat_entity,
+        fields=fields,
+        entity_table=entity_table,
+    )
+    collected = collected[: limit + 1]
 
-    await transcribe_voice_messages(collected[:limit], effective_entity)
+    if wants_field(fields, "transcription"):
+        await transcribe_voice_messages(collected[:limit], effective_entity)
 
     return collected, discussion_metadata
 
@@ -190,6 +282,8 @@ async def _handle_replies_mode(
     limit: int,
     query: str | None,
     params: dict[str, Any],
+    fields: frozenset[str] | None = None,
+    entity_table: dict[str, dict[str, Any]] | None = None,
 ) -> dict[str, Any]:
     """
     Handle fetching replies to a message.
@@ -206,10 +300,18 @@ async def _handle_replies_mode(
             raise ValueError(f"Could not find chat with ID '{chat_id}'")
 
         collected, discussion_metadata = await _fetch_replies(
-            client, entity, reply_to_id, limit, query, include_chat_entity=False
+            client,
+            entity,
+            reply_to_id,
+            limit,
+            query,
+            include_chat_entity=False,
+            fields=fields,
+            entity_table=entity_table,
         )
 
         window = collected[:limit] if limit is not None else collected
+        window = [project_message_result(m, fields) for m in window]
         has_more = len(collected) > len(window)
 
         if not window:
@@ -229,6 +331,8 @@ async def _handle_replies_mode(
             "has_more": has_more,
             "reply_to_id": reply_to_id,
         }
+        if entity_table is not None:
+            response["entities"] = referenced_entities(window, entity_table)
 
         if discussion_metadata:
             response |= discussion_metadata
@@ -287,10 +391,18 @@ async def _collect_messages_in_chat(
     collected: list[dict[str, Any]],
     seen_keys: set[Any],
     include_chat_entity: bool = False,
+    fields: frozenset[str] | None = None,
+    entity_table: dict[str, dict[str, Any]] | None = None,
 ) -> int | None:
     entity = await get_entity_by_id(chat_id)
     if not entity:
         raise ValueError(f"Could not find chat with ID '{chat_id}'")
+    # The count needs only the entity: fetch it while the search runs
+    count_task = (
+        asyncio.create_task(_get_chat_message_count(chat_id, entity))
+        if include_total_count
+        else None
+    )
     per_chat_queries = queries or [""]
     generators = [
         _search_chat_messages_generator(
@@ -304,12 +416,22 @@ async def _collect_messages_in_chat(
             public,
             auto_expand_batches,
             include_chat_entity,
+            fields,
+            entity_table,
         )
         for q in per_chat_queries
     ]
-    await _execute_parallel_searches_generators(generators, collected, seen_keys, limit)
-    await transcribe_voice_messages(collected, entity)
-    return await _get_chat_message_count(chat_id) if include_total_count else None
+    try:
+        await _execute_parallel_searches_generators(
+            generators, collected, seen_keys, limit
+        )
+        if wants_field(fields, "transcription"):
+            await transcribe_voice_messages(collected, entity)
+    except BaseException:
+        if count_task is not None:
+            count_task.cancel()
+        raise
+    return await count_task if count_task is not None else None
 
 
 async def _collect_messages_global(
@@ -324,6 +446,8 @@ async def _collect_messages_global(
     collected: list[dict[str, Any]],
     seen_keys: set[Any],
     include_chat_entity: bool = True,
+    fields: frozenset[str] | None = None,
+    entity_table: dict[str, dict[str, Any]] | None = None,
 ) -> None:
     generators = [
         _search_global_messages_generator(
@@ -336,6 +460,8 @@ async def _collect_messages_global(
             public,
             auto_expand_batches,
             include_chat_entity,
+            fields,
+            entity_table,
         )
         for q in queries
         if q and str(q).strip()
@@ -355,6 +481,8 @@ async def _handle_search_mode(
     auto_expand_batches: int,
     include_total_count: bool,
     params: dict[str, Any],
+    fields: frozenset[str] | None = None,
+    entity_table: dict[str, dict[str, Any]] | None = None,
 ) -> dict[str, Any]:
     """Handle search/browse mode for messages."""
     queries: list[str] = (
@@ -414,6 +542,8 @@ async def _handle_search_mode(
                     collected,
                     seen_keys,
                     include_chat_entity=False,
+                    fields=fields,
+                    entity_table=entity_table,
                 )
             except Exception as e:
                 return _connection_error_or_build(
@@ -433,6 +563,8 @@ async def _handle_search_mode(
                     collected,
                     seen_keys,
                     include_chat_entity=True,
+                    fields=fields,
+                    entity_table=entity_table,
                 )
             except Exception as e:
                 return _connection_error_or_build(
@@ -455,7 +587,10 @@ async def _handle_search_mode(
                 exception=ValueError(f"No messages found matching query '{query}'"),
             )
 
+        window = [project_message_result(m, fields) for m in window]
         response: dict[str, Any] = {"messages": window, "has_more": has_more}
+        if entity_table is not None:
+            response["entities"] = referenced_entities(window, entity_table)
         if total_count is not None:
             response["total_count"] = total_count
         return response
@@ -476,6 +611,8 @@ async def search_messages_impl(
     public: bool | None = None,
     auto_expand_batches: int = 1,
     include_total_count: bool = False,
+    fields: list[str] | None = None,
+    normalize_entities: bool = False,
 ) -> dict[str, Any]:
     """
     Unified message retrieval: search, browse, read by IDs, or list replies.
@@ -500,6 +637,12 @@ async def search_messages_impl(
         auto_expand_batches: Additional batches to fetch for filtered searches (default 1)
         include_total_count: Include total count in response (per-chat only, default False).
             Note: chat entity is excluded from each message when chat_id is provided, to save context.
+        fields: Message fields to return (see MESSAGE_RESULT_FIELDS); ``id`` is
+            always included. Senders, forward origins, links, attachment URLs and
+            transcriptions that are not selected are not fetched at all.
+        normalize_entities: Give each message's sender, chat and forward origins
+            as ``sender_id`` / ``chat_id`` referring to a response-level
+            ``entities`` map, instead of repeating their dicts on every message.
 
     Returns:
         Dictionary with:
@@ -509,6 +652,7 @@ async def search_messages_impl(
         - 'reply_to_id': Original message ID (if reply_to_id used)
         - 'discussion_chat_id': Discussion group ID (if channel post with discussion)
         - 'discussion_total_count': Total replies (if available)
+        - 'entities': Entity dicts by marked id (if normalize_entities=True)
 
     Global search requires a non-empty query; per-chat allows empty query (recent
     messages). include_total_count applies only to per-chat search. Channel
@@ -526,6 +670,8 @@ async def search_messages_impl(
         "public": public,
         "auto_expand_batches": auto_expand_batches,
         "include_total_count": include_total_count,
+        "fields": fields,
+        "normalize_entities": normalize_entities,
         "is_global_search": chat_id is None,
         "has_query": bool(query and query.strip()),
         "has_date_filter": bool(min_date or max_date),
@@ -539,6 +685,7 @@ async def search_messages_impl(
             message_ids=message_ids,
             reply_to_id=reply_to_id,
         )
+        selected_fields = message_fields(fields)
     except ValueError as e:
         return log_and_build_error(
             operation="get_messages",
@@ -546,6 +693,7 @@ async def search_messages_impl(
             params=params,
             exception=e,
         )
+    entity_table = {} if normalize_entities else None
 
     if mode is MessageRetrievalMode.MESSAGE_IDS:
         if chat_id is None or message_ids is None:
@@ -562,7 +710,9 @@ async def search_messages_impl(
                 params=params,
                 exception=ValueError("Date filters not supported for message_ids mode"),
             )
-        return await _handle_message_ids_mode(chat_id, message_ids, params)
+        return await _handle_message_ids_mode(
+            chat_id, message_ids, params, selected_fields, entity_table
+        )
 
     if mode is MessageRetrievalMode.REPLIES:
         if chat_id is None or reply_to_id is None:
@@ -579,7 +729,9 @@ async def search_messages_impl(
                 params=params,
                 exception=ValueError("Date filters not supported for replies mode"),
             )
-        return await _handle_replies_mode(chat_id, reply_to_id, limit, query, params)
+        return await _handle_replies_mode(
+            chat_id, reply_to_id, limit, query, params, selected_fields, entity_table
+        )
 
     return await _handle_search_mode(
         query=query,
@@ -592,6 +744,8 @@ async def search_messages_impl(
         auto_expand_batches=auto_expand_batches,
         include_total_count=include_total_count,
         params=params,
+        fields=selected_fields,
+        entity_table=entity_table,
     )
 
 
@@ -606,18 +760,24 @@ async def _search_chat_messages_generator(
     public,
     auto_expand_batches,
     include_chat_entity=False,
+    fields=None,
+    entity_table=None,
 ):
     """Async generator version of chat message search for memory efficiency.
 
-    include_chat_entity: passed to _build_result_for_message. Per-chat search
-    omits chat from messages since the chat is already known from chat_id.
+    include_chat_entity, fields, entity_table: passed to
+    _build_results_for_messages. Per-chat search omits chat from messages since the
+    chat is already known from chat_id.
     """
     batch_count = 0
     max_batches = 1 + auto_expand_batches if chat_type else 1
     next_offset_id = 0
 
+    page_size = min(limit or MESSAGE_PAGE_SIZE, MESSAGE_PAGE_SIZE)
     while batch_count < max_batches:
         last_id = None
+        reached_min_date = False
+        page = []
         async for message in client.iter_messages(
             entity, search=query, offset_id=next_offset_id, offset_date=max_datetime
         ):
@@ -630,10 +790,11 @@ async def _search_chat_messages_generator(
             if max_datetime and message.date and message.date > max_datetime:
                 continue
             # Stop when we hit min_datetime boundary - all subsequent messages
-            # will be older since we iterate newest->oldest. return exits the
-            # entire generator, not just the inner loop.
+            # will be older since we iterate newest->oldest; the generator
+            # ends after yielding the page built so far.
             if min_datetime and message.date and message.date < min_datetime:
-                return
+                reached_min_date = True
+                break
 
             if not _matches_chat_type(entity, chat_type):
                 continue
@@ -641,15 +802,30 @@ async def _search_chat_messages_generator(
             if not _matches_public_filter(entity, public):
                 continue
 
-            result = await _build_result_for_message(
-                client, message, entity, include_chat_entity
-            )
-            if not result:
-                continue
-
+            page.append(message)
+            if len(page) >= page_size:
+                for result in await _build_results_for_messages(
+                    client,
+                    page,
+                    entity,
+                    include_chat_entity,
+                    fields=fields,
+                    entity_table=entity_table,
+                ):
+                    yield result
+                page = []
+
+        for result in await _build_results_for_messages(
+            client,
+            page,
+            entity,
+            include_chat_entity,
+            fields=fields,
+            entity_table=entity_table,
+        ):
             yield result
 
-        if not last_id:
+        if reached_min_date or not last_id:
             break
 
         next_offset_id = last_id
@@ -666,11 +842,14 @@ async def _search_global_messages_generator(
     public,
     auto_expand_batches,
     include_chat_entity=True,
+    fields=None,
+    entity_table=None,
 ):
     """Async generator version of global message search for memory efficiency.
 
-    include_chat_entity: passed to _build_result_for_message. Global search
-    includes chat in each message since messages come from different chats.
+    include_chat_entity, fields, entity_table: passed to
+    _build_results_for_messages. Global search includes chat in each message since
+    messages come from different chats.
     """
     batch_count = 0
     max_batches = 1 + auto_expand_batches if chat_type else 1
@@ -694,9 +873,26 @@ async def _search_global_messages_generator(
         if not hasattr(result, "messages") or not result.messages:
             break
 
+        # Chats and senders come with the response; anything missing from its
+        # users/chats vectors is resolved for the whole page in batched requests
+        entities = response_entities(result)
+        await prefetch_message_entities(
+            client,
+            result.messages,
+            extra_peers=[message.peer_id for message in result.messages],
+            known=entities,
+            fields=fields,
+        )
+        page = []
+        chats = []
         for message in result.messages:
             try:
-                chat = await get_entity_by_id(message.peer_id)
+                # Raw RPC result: bind the client and the response's entities
+                # the way iter_messages does (text, sender, forward origin)
+                message._finish_init(client, entities, None)
+                chat = entity_from_map(
+                    entities, message.peer_id
+                ) or await get_entity_by_id(message.peer_id)
                 if not chat:
                     logger.warning(
                         f"Could not get entity for peer_id: {message.peer_id}"
@@ -709,17 +905,24 @@ async def _search_global_messages_generator(
                 if not _matches_public_filter(chat, public):
                     continue
 
-                msg_result = await _build_result_for_message(
-                    client, message, chat, include_chat_entity
-                )
-                if not msg_result:
-                    continue
-
-                yield msg_result
+                page.append(message)
+                chats.append(chat)
             except Exception as e:
                 logger.warning(f"Error processing message: {e}")
                 continue
 
+        for msg_result in await _build_results_for_messages(
+            client,
+            page,
+            None,
+            include_chat_entity,
+            entities,
+            chats,
+            fields,
+            entity_table,
+        ):
+            yield msg_result
+
         if result.messages:
             next_offset_id = result.messages[-1].id
         batch_count += 1
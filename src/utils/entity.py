@@ -2,36 +2,218 @@ import asyncio
 import contextlib
 import logging
 import time
+import weakref
+from collections.abc import Awaitable, Callable, Hashable
 from typing import Any
 
-from telethon import TelegramClient
-from telethon.tl.functions.channels import GetFullChannelRequest
-from telethon.tl.functions.messages import GetFullChatRequest, GetSearchCountersRequest
-from telethon.tl.functions.users import GetFullUserRequest
+from telethon import TelegramClient, events, utils
+from telethon import errors as tg_errors
+from telethon.tl.functions.channels import GetChannelsRequest, GetFullChannelRequest
+from telethon.tl.functions.messages import (
+    GetChatsRequest,
+    GetDialogFiltersRequest,
+    GetFullChatRequest,
+    GetSearchCountersRequest,
+)
+from telethon.tl.functions.users import GetFullUserRequest, GetUsersRequest
 from telethon.tl.tlobject import TLObject
-from telethon.tl.types import InputMessagesFilterEmpty, PeerChannel, PeerChat, PeerUser
-
-from ..client.connection import get_connected_client
+from telethon.tl.types import (
+    Channel,
+    ChannelForbidden,
+    Chat,
+    ChatEmpty,
+    ChatForbidden,
+    InputChannel,
+    InputMessagesFilterEmpty,
+    InputPeerChannel,
+    InputPeerChat,
+    InputPeerUser,
+    InputUser,
+    PeerChannel,
+    PeerChat,
+    PeerUser,
+    UpdateDialogFilter,
+    UpdateDialogFilterOrder,
+    UpdateDialogFilters,
+    User,
+    UserEmpty,
+)
+
+from ..client.connection import get_connected_client, get_request_token
+from ..config.server_config import get_config
+from .entity_cache import MISSING, EntityCacheRegistry, NegativeCache, TTLCache
+from .entity_index import EntityIndex, IndexedPeer, entity_indexes
 
 logger = logging.getLogger(__name__)
 
 # -------------------------
-# Manual caches (key-safe)
+# Entity caches (per session)
 # -------------------------
 
-# Cache normalized chat type per entity key
-_ENTITY_TYPE_CACHE: dict[tuple, str | None] = {}
+# "type": normalized chat type; "profile": built entity dicts (title, username,
+# counts, access_hash) and "entity": resolved Telethon entities, both refreshed
+# more often; "full": get_chat_info full-info and forum topic results.
+_entity_caches = EntityCacheRegistry(
+    max_sessions=get_config().max_active_sessions,
+    max_entries=get_config().entity_cache_max_entries,
+    ttls={
+        "type": get_config().entity_type_cache_ttl_seconds,
+        "profile": get_config().entity_cache_ttl_seconds,
+        "entity": get_config().entity_cache_ttl_seconds,
+        "full": get_config().chat_info_cache_ttl_seconds,
+        "count": get_config().message_count_cache_ttl_seconds,
+    },
+    # Failed ids/usernames: refused for a window doubling per repeated failure
+    negative=(
+        get_config().negative_cache_ttl_seconds,
+        get_config().negative_cache_max_ttl_seconds,
+    ),
+)
+
+# How get_entity_by_id resolved ids: "cache" (resolved entity cache), "index"
+# (input peer from the persistent entity index, then one fetch), "session"
+# (input peer from the session's entity table, then one fetch), "inferred" (one
+# peer type left after id-range inference), "hedged" (several peer types tried
+# concurrently), "batched" (one of many peers fetched together by resolve_many),
+# "failed".
+_resolution_paths = dict.fromkeys(
+    (
+        "cache",
+        "negative",
+        "index",
+        "session",
+        "inferred",
+        "hedged",
+        "batched",
+        "failed",
+    ),
+    0,
+)
+
+# Full-info fetches in flight by (session, cache key); concurrent callers share one
+_full_info_inflight: dict[tuple[str, Hashable], asyncio.Task] = {}
+
+# Clients whose updates clear negative cache entries (see _watch_peer_updates)
+_watched_clients: weakref.WeakSet = weakref.WeakSet()
+
+# Bare id ranges (as used by TDLib): above these an id cannot be that peer type.
+MAX_CHAT_ID = 999_999_999_999
+MAX_CHANNEL_ID = 1_000_000_000_000 - (1 << 31)
+
+# Entities found in RPC responses' users/chats vectors
+_PEER_ENTITY_TYPES = (User, Chat, ChatForbidden, Channel, ChannelForbidden)
+
+# Ids per users.getUsers / channels.getChannels / messages.getChats request
+RESOLVE_BATCH_SIZE = 100
+# Concurrent single lookups for peers a batch could not resolve
+RESOLVE_FALLBACK_CONCURRENCY = 8
+
+
+def _current_session_key() -> str:
+    return get_request_token() or get_config().session_name
+
+
+def _session_entity_cache(field_class: str) -> TTLCache:
+    """The current request's session cache for one field class."""
+    return _entity_caches.cache(_current_session_key(), field_class)
+
+
+def get_entity_cache_stats() -> dict:
+    """Entity cache sizes and hit/miss counters across sessions."""
+    return {
+        **_entity_caches.describe(),
+        "resolution_paths": dict(_resolution_paths),
+        "index": entity_indexes.describe(),
+    }
+
+
+async def _session_index(session_key: str) -> EntityIndex | None:
+    """The session's persistent entity index (loaded), or None when disabled."""
+    if not get_config().entity_index_enabled:
+        return None
+    return await entity_indexes.loaded(session_key)
+
+
+def _indexed_peer(entity) -> IndexedPeer | None:
+    """Index row for a full entity; min entities carry no usable access hash."""
+    if not isinstance(entity, _PEER_ENTITY_TYPES) or getattr(entity, "min", False):
+        return None
+    info = build_entity_dict(entity) or {}
+    username = getattr(entity, "username", None)
+    return IndexedPeer(
+        id=utils.get_peer_id(entity),
+        access_hash=getattr(entity, "access_hash", None),
+        username=username.lower() if username else None,
+        phone=getattr(entity, "phone", None),
+        type=info.get("type"),
+        title=info.get("title"),
+    )
+
+
+def record_indexed_entities(entities, session_key: str | None = None) -> None:
+    """Record resolved entities in the session's index (written in batches later)."""
+    if not get_config().entity_index_enabled:
+        return
+    index = entity_indexes.index(session_key or _current_session_key())
+    for entity in entities:
+        if (indexed := _indexed_peer(entity)) is not None:
+            index.put(indexed)
+
+
+async def resolve_indexed(query: str | None) -> Any | None:
+    """Entity for an exact ``@username`` or ``+phone`` query the index knows, else None.
+
+    Resolved through get_entity_by_id: from the entity cache, or with one typed
+    fetch of the indexed input peer (checked against the username, see
+    _fetch_indexed).
+    """
+    text = (query or "").strip()
+    if not text.startswith(("@", "+")):
+        return None
+    index = await _session_index(_current_session_key())
+    indexed = index.get(text) if index is not None else None
+    return await get_entity_by_id(text) if indexed is not None else None
+
+
+async def _fetch_indexed(
+    client: TelegramClient, key: Hashable, indexed: IndexedPeer, session_key: str
+):
+    """Entity for an index hit, or None when the entry is stale.
+
+    A failed fetch (say, an outdated access hash) and a username that no longer
+    belongs to the indexed peer both leave resolution to the session and network
+    paths; the refetched peer is recorded, which drops its stale username alias.
+    """
+    try:
+        entity = await client.get_entity(indexed.input_peer())
+    except Exception as e:
+        logger.debug(f"Indexed peer {indexed.id} could not be fetched: {e}")
+        return None
+    if isinstance(key, str) and not key.startswith("+"):
+        usernames = [getattr(entity, "username", None)] + [
+            u.username for u in getattr(entity, "usernames", None) or []
+        ]
+        if key not in {u.lower() for u in usernames if u}:
+            record_indexed_entities([entity], session_key)
+            return None
+    return entity
 
-# Cache built entity dict per entity key
-_ENTITY_DICT_CACHE: dict[tuple, dict | None] = {}
 
 # -------------------------
 # Folder list cache
 # -------------------------
 
-# Cache for folder list: key is session_id or id(session), value is (folders_list, timestamp)
+# Cache for folder list: key is session_id or id(session), value is (folders_list, timestamp).
+# Folder updates patch entries in place; older entries are still served while a
+# background fetch replaces them (stale-while-revalidate).
 _FOLDER_LIST_CACHE: dict[str | int, tuple[list[dict], float]] = {}
-_FOLDER_CACHE_TTL_SECONDS = 300  # 5 minutes
+_FOLDER_CACHE_TTL_SECONDS = 300  # Refetch in the background after 5 minutes
+
+# Folder list fetches in flight by cache key; callers and updates share one
+_folder_fetches: dict[str | int, asyncio.Task] = {}
+
+# Clients whose folder updates patch _FOLDER_LIST_CACHE (see _watch_folder_updates)
+_folder_watched_clients: weakref.WeakSet = weakref.WeakSet()
 
 
 def _extract_filter_flags(filter_obj) -> dict:
@@ -52,57 +234,118 @@ def _extract_filter_flags(filter_obj) -> dict:
     }
 
 
-async def get_dialog_filters(client) -> list[dict]:
-    """Fetch user's dialog filters from Telegram with 5-minute caching.
-
-    Uses client(functions.messages.GetDialogFiltersRequest()) via Telethon.
-
-    Returns list of flat dicts with filter metadata and flags:
-    - id, title, contacts, non_contacts, groups, broadcasts, bots,
-      exclude_muted, exclude_read, exclude_archived, include_peers, exclude_peers
+def _folder_dict(filter_obj) -> dict:
+    """Flat folder dict; the title is a TextWithEntities object - extract .text"""
+    title_obj = getattr(filter_obj, "title", None)
+    filter_dict = _extract_filter_flags(filter_obj)
+    filter_dict["title"] = getattr(title_obj, "text", None) if title_obj else None
+    return filter_dict
 
-    Note: Folder title is a TextWithEntities object - extract .text
-    """
-    global _FOLDER_LIST_CACHE
 
+def _folder_cache_key(client) -> str | int:
     # Prefer stable session_id, fall back to object id for cache key
     try:
-        cache_key = client.session.session_id
+        return client.session.session_id
     except AttributeError:
-        cache_key = id(client.session)
+        return id(client.session)
 
-    # Check cache
-    if cache_key in _FOLDER_LIST_CACHE:
-        filters, timestamp = _FOLDER_LIST_CACHE[cache_key]
-        if time.time() - timestamp < _FOLDER_CACHE_TTL_SECONDS:
-            return filters
 
-    # Fetch from Telegram
-    filters = []
+async def _fetch_dialog_filters(client, cache_key: str | int) -> list[dict] | None:
+    """Fetch folders and cache them; None (nothing cached) on failure."""
     try:
-        from telethon import functions
-
-        result = await client(functions.messages.GetDialogFiltersRequest())
-        for f in result.filters:
-            # title is TextWithEntities object - extract .text
-            title_obj = getattr(f, "title", None)
-            title_text = getattr(title_obj, "text", None) if title_obj else None
-            filter_dict = _extract_filter_flags(f)
-            filter_dict["title"] = title_text
-            filters.append(filter_dict)
+        result = await client(GetDialogFiltersRequest())
+        filters = [_folder_dict(f) for f in result.filters]
     except asyncio.CancelledError:
         # Let cancellation propagate so shutdown/timeout behavior works correctly
         raise
     except Exception as e:
         logger.debug(f"GetDialogFiltersRequest failed: {e}")
         # Don't cache empty result on failure - allows retry instead of long-lived empty cache
-        return filters
+        return None
 
-    # Update cache only on success
     _FOLDER_LIST_CACHE[cache_key] = (filters, time.time())
     return filters
 
 
+def _start_folder_fetch(client, cache_key: str | int) -> asyncio.Task:
+    """The running folder fetch for cache_key, started if there is none."""
+    task = _folder_fetches.get(cache_key)
+    if task is None:
+        task = asyncio.create_task(_fetch_dialog_filters(client, cache_key))
+        _folder_fetches[cache_key] = task
+        task.add_done_callback(lambda _: _folder_fetches.pop(cache_key, None))
+    return task
+
+
+def _patch_folder_cache(cache_key: str | int, update) -> bool:
+    """Apply a folder update to the cached list; False when it needs a refetch."""
+    entry = _FOLDER_LIST_CACHE.get(cache_key)
+    if entry is None:
+        return True  # Nothing cached; the next call fetches current folders
+    filters, timestamp = entry
+    if isinstance(update, UpdateDialogFilter):
+        changed = [_folder_dict(update.filter)] if update.filter else []
+        ids = [f["id"] for f in filters]
+        if update.id in ids:
+            i = ids.index(update.id)
+            filters = [*filters[:i], *changed, *filters[i + 1 :]]
+        else:
+            filters = [*filters, *changed]
+    elif isinstance(update, UpdateDialogFilterOrder):
+        # The default "All chats" folder has no id; Telegram orders it as 0
+        position = {folder_id: i for i, folder_id in enumerate(update.order)}
+        filters = sorted(filters, key=lambda f: position.get(f["id"] or 0, -1))
+    else:
+        return False
+    _FOLDER_LIST_CACHE[cache_key] = (filters, timestamp)
+    return True
+
+
+def _watch_folder_updates(client, cache_key: str | int) -> None:
+    """Keep the client's cached folders current from its folder updates."""
+    add_event_handler = getattr(client, "add_event_handler", None)
+    if add_event_handler is None or client in _folder_watched_clients:
+        return
+
+    async def on_folder_update(update) -> None:
+        # updateDialogFilters carries no data: refetch, serving the old list meanwhile
+        if not _patch_folder_cache(cache_key, update):
+            _start_folder_fetch(client, cache_key)
+
+    add_event_handler(
+        on_folder_update,
+        events.Raw(
+            types=[UpdateDialogFilter, UpdateDialogFilters, UpdateDialogFilterOrder]
+        ),
+    )
+    _folder_watched_clients.add(client)
+
+
+async def get_dialog_filters(client) -> list[dict]:
+    """Fetch user's dialog filters from Telegram, cached per session.
+
+    Uses client(functions.messages.GetDialogFiltersRequest()) via Telethon.
+    Only the first call waits for it: folder updates patch the cached list, and
+    a list older than 5 minutes is returned while a background fetch refreshes it.
+
+    Returns list of flat dicts with filter metadata and flags:
+    - id, title, contacts, non_contacts, groups, broadcasts, bots,
+      exclude_muted, exclude_read, exclude_archived, include_peers, exclude_peers
+
+    Note: Folder title is a TextWithEntities object - extract .text
+    """
+    cache_key = _folder_cache_key(client)
+    _watch_folder_updates(client, cache_key)
+
+    if (entry := _FOLDER_LIST_CACHE.get(cache_key)) is not None:
+        filters, timestamp = entry
+        if time.time() - timestamp >= _FOLDER_CACHE_TTL_SECONDS:
+            _start_folder_fetch(client, cache_key)
+        return filters
+
+    return await asyncio.shield(_start_folder_fetch(client, cache_key)) or []
+
+
 async def get_available_folders(client) -> list[dict]:
     """Deprecated alias for get_dialog_filters."""
     return await get_dialog_filters(client)
@@ -141,90 +384,445 @@ def is_ambiguous_peer_scalar(value: Any) -> bool:
     return bool(s.startswith("-") and len(s) > 1 and s[1:].isdigit())
 
 
+def _resolution_cache_key(peer) -> Hashable:
+    """Cache key for a get_entity_by_id argument: marked peer id or lowercased username."""
+    if isinstance(peer, str):
+        return peer.lstrip("@").lower()
+    if isinstance(peer, int):
+        return peer
+    try:
+        return utils.get_peer_id(peer)
+    except Exception:
+        return ("object", id(peer))
+
+
+def _input_peer_from_session(client: TelegramClient, peer) -> Any:
+    """Input peer from the session's own entity table (no network), or None."""
+    if isinstance(peer, (InputPeerUser, InputPeerChat, InputPeerChannel)):
+        return peer
+    try:
+        input_peer = client.session.get_input_entity(peer)
+    except Exception:
+        return None
+    if isinstance(input_peer, (InputPeerUser, InputPeerChat, InputPeerChannel)):
+        return input_peer
+    return None
+
+
+def _network_candidates(peer) -> list:
+    """Peer variants worth asking Telegram for, narrowed by the id's sign and range.
+
+    ``-100…`` ids are channels and other negative ids basic groups; a positive id
+    is a user, or a bare channel/chat id when within those types' id ranges.
+    """
+    if not isinstance(peer, int):
+        return [peer]
+    if peer < 0:
+        bare_id, peer_type = utils.resolve_id(peer)
+        return [peer_type(bare_id)]
+    candidates: list = [PeerUser(peer)]
+    if peer <= MAX_CHANNEL_ID:
+        candidates.append(PeerChannel(peer))
+    if peer <= MAX_CHAT_ID:
+        candidates.append(PeerChat(peer))
+    return candidates
+
+
+async def _get_entity_hedged(client: TelegramClient, candidates: list):
+    """Look candidates up concurrently; the first candidate that resolves wins.
+
+    Results are taken in candidate order (user, channel, chat), so an id valid
+    as several peer types resolves the same way whichever RPC finishes first;
+    lookups after the winner are cancelled.
+    """
+    tasks = [asyncio.create_task(client.get_entity(c)) for c in candidates]
+    last_error: BaseException | None = None
+    try:
+        for task in tasks:
+            try:
+                return await task
+            except Exception as e:
+                last_error = e
+                logger.debug("get_entity candidate failed: %s", e)
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled():
+                task.exception()  # Retrieved: a lower-priority failure is moot
+    raise last_error or ValueError("No peer candidates to resolve")
+
+
+def _peer_keys(entity) -> list[Hashable]:
+    """Every resolution cache key a resolved entity answers: ids and username."""
+    keys: list[Hashable] = []
+    with contextlib.suppress(Exception):
+        marked_id = utils.get_peer_id(entity)
+        keys += [marked_id, utils.resolve_id(marked_id)[0]]
+    if username := getattr(entity, "username", None):
+        keys.append(username.lower())
+    return keys
+
+
+# Failures meaning the peer does not exist or is out of reach for this account.
+# Anything else (flood waits, server errors, timeouts, transport errors) is
+# transient and never negative-cached.
+_LOOKUP_MISS_ERRORS = (
+    ValueError,
+    TypeError,
+    tg_errors.UsernameNotOccupiedError,
+    tg_errors.UsernameInvalidError,
+    tg_errors.PeerIdInvalidError,
+    tg_errors.ChannelInvalidError,
+    tg_errors.ChannelPrivateError,
+    tg_errors.ChatIdInvalidError,
+    tg_errors.UserIdInvalidError,
+)
+
+
+def _is_lookup_miss(exc: BaseException) -> bool:
+    """True for "no such peer" failures, the only ones negative-cached."""
+    return isinstance(exc, _LOOKUP_MISS_ERRORS)
+
+
+def _watch_peer_updates(client: TelegramClient, session_key: str) -> None:
+    """Clear negative entries for peers that the client's updates mention."""
+    add_event_handler = getattr(client, "add_event_handler", None)
+    if add_event_handler is None or client in _watched_clients:
+        return
+
+    async def on_update(update) -> None:
+        entities = getattr(update, "_entities", None)
+        if entities:
+            negative = _entity_caches.cache(session_key, "negative")
+            negative.clear_keys(k for e in entities.values() for k in _peer_keys(e))
+
+    add_event_handler(on_update, events.Raw)
+    _watched_clients.add(client)
+
+
+def _parse_peer(entity_id):
+    """Numeric strings become ints; anything else is returned unchanged."""
+    try:
+        return int(entity_id)
+    except (ValueError, TypeError):
+        return entity_id
+
+
+def _remember_entity(session_key: str, key: Hashable, entity):
+    """Cache a resolved entity under key and its marked id; unblock all its keys."""
+    cache = _entity_caches.cache(session_key, "entity")
+    cache.set(key, entity)
+    with contextlib.suppress(Exception):
+        cache.set(utils.get_peer_id(entity), entity)
+    _entity_caches.cache(session_key, "negative").clear_keys([key, *_peer_keys(entity)])
+    record_indexed_entities([entity], session_key)
+    return entity
+
+
 async def get_entity_by_id(entity_id, *, client: TelegramClient | None = None):
     """
     A wrapper around client.get_entity to handle numeric strings and log errors.
     Special handling for 'me' identifier for Saved Messages.
-    Tries multiple peer types (raw ID, PeerChannel, PeerUser, PeerChat) for better resolution.
+
+    Resolution is offline-first: the session's resolved-entity cache, then the
+    persistent entity index and the session's entity table (one targeted fetch
+    with the input peer either provides), and only then network lookups of
+    the peer types the id can still be, run concurrently. The path taken is
+    counted in get_entity_cache_stats()["resolution_paths"].
+
+    Ids and usernames that failed to resolve are refused without any RPC for a
+    short window that doubles with each repeated failure, until an update or a
+    successful lookup mentions the peer.
 
     Args:
-        entity_id: Username, ``me``, numeric id, or numeric string.
+        entity_id: Username, ``me``, numeric id, numeric string or Peer.
         client: Optional Telethon client; if omitted, ``get_connected_client()`` is used.
     """
     if client is None:
         client = await get_connected_client()
     peer = None
+    negative: NegativeCache | None = None
+    key: Hashable = None
     try:
         # Special handling for 'me' identifier (Saved Messages)
         if entity_id == "me":
             return await client.get_me()
 
-        # Try to convert entity_id to an integer if it's a numeric string
-        try:
-            peer = int(entity_id)
-        except (ValueError, TypeError):
-            peer = entity_id
-
+        peer = _parse_peer(entity_id)
         if not peer:
             raise ValueError("Entity ID cannot be null or empty")
 
-        candidates: list = [peer]
-        if isinstance(peer, int):
-            candidates.extend([PeerChannel(peer), PeerUser(peer), PeerChat(peer)])
-
-        last_error: Exception | None = None
-        for candidate in candidates:
-            try:
-                return await client.get_entity(candidate)
-            except Exception as err:
-                last_error = err
-                logger.debug("get_entity failed for %r: %s", candidate, last_error)
-        if last_error:
-            raise last_error
+        session_key = _current_session_key()
+        cache = _entity_caches.cache(session_key, "entity")
+        key = _resolution_cache_key(peer)
+        entity = cache.get(key)
+        if entity is not MISSING:
+            _resolution_paths["cache"] += 1
+            return entity
+
+        negative = _entity_caches.cache(session_key, "negative")
+        retry_after = negative.retry_after(key)
+        if retry_after > 0:
+            _resolution_paths["negative"] += 1
+            logger.debug(
+                f"Not resolving '{entity_id}': failed recently, retry in {retry_after:.0f}s"
+            )
+            return None
+        _watch_peer_updates(client, session_key)
+
+        index = await _session_index(session_key)
+        indexed = index.get(key) if index is not None else None
+        entity = None
+        if indexed is not None:
+            entity = await _fetch_indexed(client, key, indexed, session_key)
+            path = "index"
+        if entity is None:
+            if (input_peer := _input_peer_from_session(client, peer)) is not None:
+                entity = await client.get_entity(input_peer)
+                path = "session"
+            else:
+                candidates = _network_candidates(peer)
+                entity = await _get_entity_hedged(client, candidates)
+                path = "inferred" if len(candidates) == 1 else "hedged"
+        _resolution_paths[path] += 1
+        return _remember_entity(session_key, key, entity)
 
     except Exception as e:
+        _resolution_paths["failed"] += 1
+        if negative is not None and _is_lookup_miss(e):
+            negative.record_failure(key)
         logger.warning(
             f"Could not get entity for '{entity_id}' (parsed as '{peer}') after trying all peer types. Error: {e}"
         )
         return None
 
 
-def _cache_channel_normalized_type(entity, cache_key: tuple) -> str:
+def _batch_slot(
+    client: TelegramClient, peer, indexed: IndexedPeer | None = None
+) -> tuple[str, Any, int] | None:
+    """Which batched request can fetch peer: (kind, request item, marked id), or None.
+
+    Users and channels need an access hash, so they come from the entity index,
+    the session's entity table (or an InputPeer argument); basic groups only
+    need their id.
+    """
+    if indexed is not None:
+        input_peer = indexed.input_peer()
+    else:
+        input_peer = _input_peer_from_session(client, peer)
+    if isinstance(input_peer, InputPeerUser):
+        item = InputUser(input_peer.user_id, input_peer.access_hash)
+        return "users", item, input_peer.user_id
+    if isinstance(input_peer, InputPeerChannel):
+        item = InputChannel(input_peer.channel_id, input_peer.access_hash)
+        return "channels", item, utils.get_peer_id(input_peer)
+    if isinstance(input_peer, InputPeerChat):
+        return "chats", input_peer.chat_id, -input_peer.chat_id
+    if isinstance(peer, PeerChat):
+        return "chats", peer.chat_id, -peer.chat_id
+    if isinstance(peer, int) and -MAX_CHAT_ID <= peer < 0:
+        return "chats", -peer, peer
+    return None
+
+
+def _batch_requests(kind: str, items: list) -> list:
+    chunks = [
+        items[i : i + RESOLVE_BATCH_SIZE]
+        for i in range(0, len(items), RESOLVE_BATCH_SIZE)
+    ]
+    if kind == "users":
+        return [GetUsersRequest(id=chunk) for chunk in chunks]
+    if kind == "channels":
+        return [GetChannelsRequest(id=chunk) for chunk in chunks]
+    return [GetChatsRequest(id=chunk) for chunk in chunks]
+
+
+async def _fetch_batched(client: TelegramClient, slots: dict) -> dict[int, Any]:
+    """Run one request per peer kind and chunk; returns entities by marked id."""
+    items: dict[str, list] = {}
+    for kind, item, _ in slots.values():
+        items.setdefault(kind, []).append(item)
+    requests = [
+        request
+        for kind, kind_items in items.items()
+        for request in _batch_requests(kind, kind_items)
+    ]
+    results = await asyncio.gather(
+        *(client(request) for request in requests), return_exceptions=True
+    )
+
+    fetched: dict[int, Any] = {}
+    for request, result in zip(requests, results, strict=True):
+        if isinstance(result, BaseException):
+            if not isinstance(result, Exception):
+                raise result
+            logger.debug(f"{type(request).__name__} failed: {result}")
+            continue
+        entities = result if isinstance(result, list) else getattr(result, "chats", [])
+        for entity in entities:
+            if isinstance(entity, (UserEmpty, ChatEmpty)):
+                continue
+            with contextlib.suppress(Exception):
+                fetched[utils.get_peer_id(entity)] = entity
+    return fetched
+
+
+async def resolve_many(peers, *, client: TelegramClient | None = None) -> dict:
+    """Resolve many peers with one batched RPC per peer type instead of one each.
+
+    Cached entities are returned as-is and recently failed peers are skipped
+    (see get_entity_by_id). The rest is grouped into users.getUsers,
+    channels.getChannels and messages.getChats requests of at most
+    RESOLVE_BATCH_SIZE ids, all sent concurrently. Peers no batch could fetch
+    (unknown access hash, usernames, failed requests) fall back to
+    get_entity_by_id. Resolved entities fill the session's entity cache and
+    entity index.
+
+    Args:
+        peers: Iterable of anything get_entity_by_id accepts except ``me``.
+        client: Optional Telethon client; if omitted, ``get_connected_client()`` is used.
+
+    Returns:
+        Entities keyed by ``_resolution_cache_key(peer)`` (marked id or
+        lowercased username); unresolved peers are left out.
+    """
+    if client is None:
+        client = await get_connected_client()
+    session_key = _current_session_key()
+    cache = _entity_caches.cache(session_key, "entity")
+    negative = _entity_caches.cache(session_key, "negative")
+
+    resolved: dict[Hashable, Any] = {}
+    pending: dict[Hashable, Any] = {}
+    for entity_id in peers:
+        peer = _parse_peer(entity_id)
+        if not peer or peer == "me":
+            continue
+        key = _resolution_cache_key(peer)
+        if key in resolved or key in pending:
+            continue
+        entity = cache.get(key)
+        if entity is not MISSING:
+            _resolution_paths["cache"] += 1
+            resolved[key] = entity
+        elif negative.retry_after(key) > 0:
+            _resolution_paths["negative"] += 1
+        else:
+            pending[key] = peer
+    if not pending:
+        return resolved
+
+    index = await _session_index(session_key)
+    slots = {}
+    for key, peer in pending.items():
+        indexed = index.get(key) if index is not None else None
+        if (slot := _batch_slot(client, peer, indexed)) is not None:
+            slots[key] = slot
+    fetched = await _fetch_batched(client, slots) if slots else {}
+
+    leftover = []
+    for key, peer in pending.items():
+        entity = fetched.get(slots[key][2]) if key in slots else None
+        if entity is None:
+            leftover.append((key, peer))
+            continue
+        _resolution_paths["batched"] += 1
+        resolved[key] = _remember_entity(session_key, key, entity)
+
+    if leftover:
+        sem = asyncio.Semaphore(RESOLVE_FALLBACK_CONCURRENCY)
+
+        async def _resolve_one(peer):
+            async with sem:
+                return await get_entity_by_id(peer, client=client)
+
+        entities = await asyncio.gather(*(_resolve_one(p) for _, p in leftover))
+        for (key, _), entity in zip(leftover, entities, strict=True):
+            if entity is not None:
+                resolved[key] = entity
+    return resolved
+
+
+def _add_entity(entities: dict[int, Any], entity) -> None:
+    if isinstance(entity, _PEER_ENTITY_TYPES):
+        entities[utils.get_peer_id(entity)] = entity
+
+
+def response_entities(*responses) -> dict[int, Any]:
+    """Response-scoped entity map: the users/chats vectors of RPC responses.
+
+    messages.Search, GetHistory and SearchGlobal responses carry every peer
+    their messages mention, so senders and chats can be read from here instead
+    of being resolved again. Keyed by marked peer id; see entity_from_map.
+    """
+    entities: dict[int, Any] = {}
+    for response in responses:
+        for entity in [
+            *(getattr(response, "users", None) or []),
+            *(getattr(response, "chats", None) or []),
+        ]:
+            _add_entity(entities, entity)
+    return entities
+
+
+def message_entities(messages) -> dict[int, Any]:
+    """Entity map from the senders and chats Telethon attached to its messages.
+
+    Messages returned by iter_messages/get_messages were initialized with their
+    response's users/chats vectors; this collects those (including forward
+    origins) in the response_entities format.
+    """
+    entities: dict[int, Any] = {}
+    for message in messages:
+        for holder in (message, getattr(message, "_forward", None)):
+            for attr in ("_sender", "_chat"):
+                _add_entity(entities, getattr(holder, attr, None))
+    return entities
+
+
+def entity_from_map(entities: dict[int, Any] | None, peer) -> Any:
+    """Entity for peer (marked id, bare user id or Peer) from an entity map, or None."""
+    if not entities or peer is None:
+        return None
+    try:
+        return entities.get(utils.get_peer_id(peer))
+    except Exception:
+        return None
+
+
+def _cache_channel_normalized_type(entity, cache_key: tuple, cache: TTLCache) -> str:
     """Map Channel / ChannelForbidden to 'group' (megagroup) or 'channel'."""
     resolved = "group" if bool(getattr(entity, "megagroup", False)) else "channel"
-    _ENTITY_TYPE_CACHE[cache_key] = resolved
-    return resolved
+    return cache.set(cache_key, resolved)
 
 
 def get_normalized_chat_type(entity) -> str | None:
     """Return normalized chat type: 'private', 'bot', 'group', or 'channel'."""
     if not entity:
         return None
-    # Check manual cache first
+    # Check the session's cache first
+    cache = _session_entity_cache("type")
     key = _entity_cache_key(entity)
-    if key in _ENTITY_TYPE_CACHE:
-        return _ENTITY_TYPE_CACHE[key]
+    cached = cache.get(key)
+    if cached is not MISSING:
+        return cached
     try:
         entity_class = entity.__class__.__name__
     except Exception:
-        _ENTITY_TYPE_CACHE[key] = None
-        return _ENTITY_TYPE_CACHE[key]
+        return cache.set(key, None)
 
     if entity_class == "User":
         # Check if this user is a bot (bot field is boolean true/false)
         with contextlib.suppress(AttributeError):
             if getattr(entity, "bot", False):
-                _ENTITY_TYPE_CACHE[key] = "bot"
-                return _ENTITY_TYPE_CACHE[key]
-        _ENTITY_TYPE_CACHE[key] = "private"
-        return _ENTITY_TYPE_CACHE[key]
+                return cache.set(key, "bot")
+        return cache.set(key, "private")
     if entity_class == "Chat":
-        _ENTITY_TYPE_CACHE[key] = "group"
-        return _ENTITY_TYPE_CACHE[key]
+        return cache.set(key, "group")
     if entity_class in ["Channel", "ChannelForbidden"]:
-        return _cache_channel_normalized_type(entity, key)
-    _ENTITY_TYPE_CACHE[key] = None
-    return _ENTITY_TYPE_CACHE[key]
+        return _cache_channel_normalized_type(entity, key, cache)
+    return cache.set(key, None)
 
 
 def build_entity_dict(entity) -> dict | None:
@@ -241,10 +839,12 @@ def build_entity_dict(entity) -> dict | None:
     if not entity:
         return None
 
-    # Check manual cache first
+    # Check the session's cache first
+    cache = _session_entity_cache("profile")
     key = _entity_cache_key(entity)
-    if key in _ENTITY_DICT_CACHE:
-        return _ENTITY_DICT_CACHE[key]
+    cached = cache.get(key)
+    if cached is not MISSING:
+        return cached
 
     first_name = getattr(entity, "first_name", None)
     last_name = getattr(entity, "last_name", None)
@@ -296,8 +896,7 @@ def build_entity_dict(entity) -> dict | None:
 
     # Prune None values for a compact, uniform schema
     compact = {k: v for k, v in result.items() if v is not None}
-    _ENTITY_DICT_CACHE[key] = compact
-    return compact
+    return cache.set(key, compact)
 
 
 def _forward_peer_id_and_type_label(peer) -> tuple[object | None, str]:
@@ -325,24 +924,27 @@ def _forward_stub_entity_dict(entity_id: object, type_label: str) -> dict:
     }
 
 
-async def _extract_forward_info(message) -> dict | None:
-    """
-    Extract forward information from a Telegram message in minimal format.
+def _forward_origin_dict(peer, entity, name: str | None = None) -> dict | None:
+    """Entity dict of a forward origin; a stub (titled ``name``) when unresolved."""
+    peer_id, type_label = _forward_peer_id_and_type_label(peer)
+    if not peer_id:
+        return None
+    if entity:
+        return build_entity_dict(entity)
+    return {**_forward_stub_entity_dict(peer_id, type_label), "title": name}
 
-    Args:
-        message: Telegram message object
 
-    Returns:
-        dict: Forward information dictionary containing:
-            - sender: Original sender information (if available)
-            - date: Original message date in ISO format
-            - chat: Source chat information (if available)
-        None: If the message is not forwarded
-    """
-    if not message:
-        return None
+def forward_info_from_entities(
+    message, sender_entity=None, chat_entity=None
+) -> dict | None:
+    """Forward information of a message whose origins are already resolved.
 
-    forward = getattr(message, "forward", None)
+    ``sender_entity`` / ``chat_entity`` are the entities of ``forward.from_id``
+    and ``forward.saved_from_peer`` (None when unknown, giving stub dicts).
+    Senders who hide their account are given by ``forward.from_name`` only and
+    get an id-less stub with that title. See _extract_forward_info for the format.
+    """
+    forward = getattr(message, "forward", None) if message else None
     if not forward:
         return None
 
@@ -353,41 +955,69 @@ async def _extract_forward_info(message) -> dict | None:
         except Exception:
             original_date = str(forward_date)
 
+    from_id = getattr(forward, "from_id", None)
+    saved_from_peer = getattr(forward, "saved_from_peer", None)
+    # Set instead of from_id when the original sender hides their account
+    from_name = getattr(forward, "from_name", None)
     sender = None
-    if from_id := getattr(forward, "from_id", None):
-        sender_id, type_label = _forward_peer_id_and_type_label(from_id)
-        if sender_id:
-            try:
-                sender_entity = await get_entity_by_id(sender_id)
-                sender = (
-                    build_entity_dict(sender_entity)
-                    if sender_entity
-                    else _forward_stub_entity_dict(sender_id, type_label)
-                )
-            except Exception as e:
-                logger.warning(
-                    f"Failed to resolve forwarded sender entity {sender_id}: {e}"
-                )
-                sender = _forward_stub_entity_dict(sender_id, type_label)
+    if from_id:
+        sender = _forward_origin_dict(from_id, sender_entity, from_name)
+    elif from_name:
+        sender = {**_forward_stub_entity_dict(None, "User"), "title": from_name}
+    return {
+        "sender": sender,
+        "date": original_date,
+        "chat": (
+            _forward_origin_dict(saved_from_peer, chat_entity)
+            if saved_from_peer
+            else None
+        ),
+    }
 
-    chat = None
-    if saved_from_peer := getattr(forward, "saved_from_peer", None):
-        chat_id, type_label = _forward_peer_id_and_type_label(saved_from_peer)
-        if chat_id:
-            try:
-                chat_entity = await get_entity_by_id(chat_id)
-                chat = (
-                    build_entity_dict(chat_entity)
-                    if chat_entity
-                    else _forward_stub_entity_dict(chat_id, type_label)
-                )
-            except Exception as e:
-                logger.warning(
-                    f"Failed to resolve forwarded chat entity {chat_id}: {e}"
-                )
-                chat = _forward_stub_entity_dict(chat_id, type_label)
 
-    return {"sender": sender, "date": original_date, "chat": chat}
+async def _resolve_forward_origin(peer, entities, label: str) -> Any:
+    peer_id, _ = _forward_peer_id_and_type_label(peer)
+    if not peer or not peer_id:
+        return None
+    try:
+        return entity_from_map(entities, peer) or await get_entity_by_id(peer)
+    except Exception as e:
+        logger.warning(f"Failed to resolve forwarded {label} entity {peer_id}: {e}")
+        return None
+
+
+async def _extract_forward_info(
+    message, entities: dict[int, Any] | None = None
+) -> dict | None:
+    """
+    Extract forward information from a Telegram message in minimal format.
+
+    Args:
+        message: Telegram message object
+        entities: Optional response-scoped entity map (see response_entities)
+
+    Returns:
+        dict: Forward information dictionary containing:
+            - sender: Original sender information (if available)
+            - date: Original message date in ISO format
+            - chat: Source chat information (if available)
+        None: If the message is not forwarded
+    """
+    forward = getattr(message, "forward", None) if message else None
+    if not forward:
+        return None
+
+    # Origins Telethon attached from the response's users/chats vectors
+    entities = {**message_entities([message]), **(entities or {})}
+    return forward_info_from_entities(
+        message,
+        await _resolve_forward_origin(
+            getattr(forward, "from_id", None), entities, "sender"
+        ),
+        await _resolve_forward_origin(
+            getattr(forward, "saved_from_peer", None), entities, "chat"
+        ),
+    )
 
 
 def compute_entity_identifier(entity) -> str | None:
@@ -411,28 +1041,39 @@ def compute_entity_identifier(entity) -> str | None:
     return entity_id_str
 
 
-async def _get_chat_message_count(chat_id: str) -> int | None:
+async def _get_chat_message_count(chat_id: str, entity=None) -> int | None:
     """
     Get total message count for a specific chat.
+
+    Pass the already-resolved entity to skip resolving chat_id again. Counts are
+    cached per session for MESSAGE_COUNT_CACHE_TTL_SECONDS.
     """
     try:
         client = await get_connected_client()
-        entity = await get_entity_by_id(chat_id)
+        if entity is None:
+            entity = await get_entity_by_id(chat_id)
         if not entity:
             return None
 
+        cache = _session_entity_cache("count")
+        key = _resolution_cache_key(entity)
+        if (count := cache.get(key)) is not MISSING:
+            return count
+
         result = await client(
             GetSearchCountersRequest(peer=entity, filters=[InputMessagesFilterEmpty()])
         )
 
-        if hasattr(result, "counters") and result.counters:
-            for counter in result.counters:
-                if hasattr(counter, "filter") and isinstance(
-                    counter.filter, InputMessagesFilterEmpty
-                ):
-                    return getattr(counter, "count", 0)
+        # messages.getSearchCounters returns a plain Vector<SearchCounter>
+        count = 0
+        for counter in getattr(result, "counters", result) or []:
+            if hasattr(counter, "filter") and isinstance(
+                counter.filter, InputMessagesFilterEmpty
+            ):
+                count = getattr(counter, "count", 0)
+                break
 
-        return 0
+        return cache.set(key, count)
 
     except Exception as e:
         logger.warning(f"Error getting search count for chat {chat_id}: {e!s}")
@@ -491,8 +1132,13 @@ async def _fetch_enrichment_fields(
     entity,
     computed_type: str | None,
     entity_class: str,
-) -> tuple[int | None, int | None, str | None, str | None]:
-    """Load optional counts, about, and bio via Telethon full-info requests."""
+) -> tuple[int | None, int | None, str | None, str | None, bool]:
+    """Load optional counts, about, and bio via Telethon full-info requests.
+
+    The last element is False when a full-info request failed (flood wait,
+    timeout, private channel) and the fields it would have filled are missing.
+    """
+    complete = True
     members_count: int | None = None
     subscribers_count: int | None = None
     about_value: str | None = None
@@ -508,6 +1154,7 @@ async def _fetch_enrichment_fields(
                     members_count = getattr(full_chat, "participants_count", None)
                     about_value = getattr(full_chat, "about", None)
                 except Exception as e:
+                    complete = False
                     logger.debug(
                         f"GetFullChatRequest failed for chat {getattr(entity, 'id', None)}: {e}"
                     )
@@ -518,6 +1165,7 @@ async def _fetch_enrichment_fields(
                 members_count = getattr(full_chat, "participants_count", None)
                 about_value = getattr(full_chat, "about", None)
             except Exception as e:
+                complete = False
                 logger.debug(
                     f"GetFullChannelRequest (megagroup) failed for {getattr(entity, 'id', None)}: {e}"
                 )
@@ -529,6 +1177,7 @@ async def _fetch_enrichment_fields(
             subscribers_count = getattr(full_chat, "participants_count", None)
             about_value = getattr(full_chat, "about", None)
         except Exception as e:
+            complete = False
             logger.debug(
                 f"GetFullChannelRequest (channel) failed for {getattr(entity, 'id', None)}: {e}"
             )
@@ -538,17 +1187,70 @@ async def _fetch_enrichment_fields(
             full_user = await client(GetFullUserRequest(id=entity))
             bio_value = getattr(full_user, "about", None)
         except Exception as e:
+            complete = False
             logger.debug(
                 f"GetFullUserRequest failed for user {getattr(entity, 'id', None)}: {e}"
             )
 
-    return members_count, subscribers_count, about_value, bio_value
+    return members_count, subscribers_count, about_value, bio_value, complete
+
+
+async def cached_full_info(
+    key: Hashable,
+    fetch: Callable[[], Awaitable[Any]],
+    *,
+    cacheable: Callable[[Any], bool] | None = None,
+) -> tuple[Any, bool, float]:
+    """Serve key from the session's "full" cache, or run fetch() once for all callers.
+
+    Concurrent callers for the same key share one fetch. None results, and
+    results cacheable() rejects (partial ones), are not cached, so a failed
+    fetch is retried by the next call.
+
+    Returns:
+        (value, from_cache, age_seconds): age is how long ago value was fetched.
+    """
+    session_key = _current_session_key()
+    cache = _entity_caches.cache(session_key, "full")
+    cached = cache.get(key)
+    if cached is not MISSING:
+        value, fetched_at = cached
+        return value, True, time.time() - fetched_at
+
+    flight = (session_key, key)
+    task = _full_info_inflight.get(flight)
+    if task is None:
+
+        async def _fetch_and_cache():
+            value = await fetch()
+            if value is not None and (cacheable is None or cacheable(value)):
+                cache.set(key, (value, time.time()))
+            return value
+
+        task = asyncio.create_task(_fetch_and_cache())
+        _full_info_inflight[flight] = task
+        task.add_done_callback(lambda _: _full_info_inflight.pop(flight, None))
+    # Shield so a cancelled caller does not abort the fetch other callers await.
+    return await asyncio.shield(task), False, 0.0
 
 
 async def build_entity_dict_enriched(entity_or_id) -> dict | None:
     """
     Build entity dict and include enriched fields by querying Telegram when needed.
 
+    See enrich_entity_dict, which also reports whether enrichment was complete.
+    """
+    info, _complete = await enrich_entity_dict(entity_or_id)
+    return info
+
+
+async def enrich_entity_dict(entity_or_id) -> tuple[dict | None, bool]:
+    """
+    Build entity dict and include enriched fields by querying Telegram when needed.
+
+    Returns the dict and whether every full-info request succeeded; a partial
+    dict lacks the counts/about of the failed request.
+
     Adds when applicable:
     - groups: members_count, about/description
     - channels: subscribers_count, about/description
@@ -568,7 +1270,9 @@ async def build_entity_dict_enriched(entity_or_id) -> dict | None:
 
         base = build_entity_dict(entity)
         if not base:
-            return None
+            return None, False
+        # build_entity_dict's result is shared with the profile cache
+        base = dict(base)
 
         computed_type = base.get("type")
         client = await get_connected_client()
@@ -579,6 +1283,7 @@ async def build_entity_dict_enriched(entity_or_id) -> dict | None:
             subscribers_count,
             about_value,
             bio_value,
+            complete,
         ) = await _fetch_enrichment_fields(client, entity, computed_type, entity_class)
 
         if members_count is not None:
@@ -589,7 +1294,7 @@ async def build_entity_dict_enriched(entity_or_id) -> dict | None:
             base["about"] = about_value
         if bio_value is not None:
             base["bio"] = bio_value
-        return base
+        return base, complete
     except Exception as e:
         logger.warning(f"Failed to build entity dict with counts: {e}")
         try:
@@ -598,9 +1303,9 @@ async def build_entity_dict_enriched(entity_or_id) -> dict | None:
                 if isinstance(entity_or_id, TLObject)
                 else await get_entity_by_id(entity_or_id)
             )
-            return build_entity_dict(entity)
+            return build_entity_dict(entity), False
         except Exception:
-            return None
+            return None, False
 
 
 def build_dialog_entity_dict(dialog, entity) -> dict | None:
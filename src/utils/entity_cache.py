@@ -0,0 +1,218 @@
+"""Session-scoped, bounded entity caches with per-field-class TTLs.
+
+Each session (token) gets its own namespace, so cached dicts carrying the
+per-user ``access_hash`` are never served to another session. Within a
+namespace every field class (e.g. ``type``, ``profile``) is a separate LRU cache
+with its own TTL: a chat's kind practically never changes, while titles,
+usernames and member counts should refresh. Namespaces themselves are LRU
+bounded, so tokens that stopped making requests release their entries.
+"""
+
+from __future__ import annotations
+
+import time
+from collections import Counter, OrderedDict
+from collections.abc import Callable, Hashable, Iterable
+from typing import Any
+
+# Returned by TTLCache.get() on a miss (None is a valid cached value)
+MISSING: Any = object()
+
+
+class TTLCache:
+    """LRU cache with a fixed entry bound and a TTL applied to every entry."""
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: OrderedDict[Hashable, tuple[Any, float]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Any:
+        """Cached value for key, or MISSING when absent or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return MISSING
+        value, expires_at = entry
+        if self._clock() >= expires_at:
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return MISSING
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any) -> Any:
+        """Store value (evicting the least recently used entry if full); returns it."""
+        if self.max_entries <= 0:
+            return value
+        self._entries[key] = (value, self._clock() + self.ttl_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return value
+
+    def discard(self, key: Hashable) -> bool:
+        """Remove key if cached; returns whether it was."""
+        return self._entries.pop(key, None) is not None
+
+    def counters(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "expirations": self.expirations,
+            "evictions": self.evictions,
+        }
+
+
+class NegativeCache(TTLCache):
+    """Failed lookups, refused for a window that doubles with every repeated failure.
+
+    Entries hold ``(failures, retry_at)`` and are kept for twice the longest
+    window, so a key that keeps failing after its window ends gets a longer one.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        base_seconds: float,
+        max_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        super().__init__(max_entries, ttl_seconds=2 * max_seconds, clock=clock)
+        self.base_seconds = base_seconds
+        self.max_seconds = max_seconds
+        self.refusals = 0
+        self.clears = 0
+
+    def retry_after(self, key: Hashable) -> float:
+        """Seconds until key may be looked up again; 0 when it is not blocked."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return 0.0
+        remaining = entry[0][1] - self._clock()
+        if remaining <= 0:
+            return 0.0
+        self.refusals += 1
+        return remaining
+
+    def record_failure(self, key: Hashable) -> float:
+        """Block key for its next window; returns the window length in seconds."""
+        previous = self.get(key)
+        failures = 1 if previous is MISSING else previous[0] + 1
+        window = min(self.base_seconds * 2 ** (failures - 1), self.max_seconds)
+        self.set(key, (failures, self._clock() + window))
+        return window
+
+    def clear_keys(self, keys: Iterable[Hashable]) -> None:
+        """Unblock keys (an update or a successful lookup mentioned the peer)."""
+        for key in keys:
+            if self.discard(key):
+                self.clears += 1
+
+    def counters(self) -> dict[str, int]:
+        return {
+            **super().counters(),
+            "refusals": self.refusals,
+            "clears": self.clears,
+        }
+
+
+class EntityCacheRegistry:
+    """Per-session namespaces of TTL caches, one cache per field class.
+
+    With ``negative=(base_seconds, max_seconds)`` each namespace also has a
+    NegativeCache of failed lookups under the "negative" field class.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int,
+        max_entries: int,
+        ttls: dict[str, float],
+        clock: Callable[[], float] = time.monotonic,
+        negative: tuple[float, float] | None = None,
+    ) -> None:
+        self.max_sessions = max_sessions
+        self.max_entries = max_entries
+        self.ttls = dict(ttls)
+        self.negative = negative
+        self._clock = clock
+        self._sessions: OrderedDict[str, dict[str, TTLCache]] = OrderedDict()
+        self.sessions_evicted = 0
+        # Reported TTL per field class; negative entries by their longest window
+        self._field_ttls = dict(self.ttls)
+        if negative is not None:
+            self._field_ttls["negative"] = negative[1]
+        # Counters of dropped namespaces, so describe() stays cumulative
+        self._retired: dict[str, Counter[str]] = {
+            field: Counter() for field in self._field_ttls
+        }
+
+    def _new_namespace(self) -> dict[str, TTLCache]:
+        namespace = {
+            field: TTLCache(self.max_entries, ttl, self._clock)
+            for field, ttl in self.ttls.items()
+        }
+        if self.negative is not None:
+            namespace["negative"] = NegativeCache(
+                self.max_entries, *self.negative, clock=self._clock
+            )
+        return namespace
+
+    def cache(self, session_key: str, field_class: str) -> TTLCache:
+        """The session's cache for one field class, creating the namespace if needed."""
+        namespace = self._sessions.get(session_key)
+        if namespace is None:
+            namespace = self._sessions[session_key] = self._new_namespace()
+            while len(self._sessions) > self.max_sessions:
+                _, evicted = self._sessions.popitem(last=False)
+                self._retire(evicted)
+                self.sessions_evicted += 1
+        else:
+            self._sessions.move_to_end(session_key)
+        return namespace[field_class]
+
+    def _retire(self, namespace: dict[str, TTLCache]) -> None:
+        for field, cache in namespace.items():
+            self._retired[field].update(cache.counters())
+
+    def clear(self) -> None:
+        self._sessions.clear()
+
+    def describe(self) -> dict[str, Any]:
+        fields = {}
+        for field, ttl in self._field_ttls.items():
+            caches = [ns[field] for ns in self._sessions.values()]
+            totals = Counter(self._retired[field])
+            for cache in caches:
+                totals.update(cache.counters())
+            lookups = totals["hits"] + totals["misses"]
+            fields[field] = {
+                "ttl_seconds": ttl,
+                "entries": sum(len(c) for c in caches),
+                **totals,
+                "hit_rate": round(totals["hits"] / lookups, 3) if lookups else None,
+            }
+        return {
+            "sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "max_entries_per_field": self.max_entries,
+            "sessions_evicted": self.sessions_evicted,
+            "fields": fields,
+        }
@@ -0,0 +1,297 @@
+"""Persistent per-session index of resolved peers, for fast cold starts.
+
+Each session (token) gets a compact SQLite file ``{session}.index`` next to its
+``.session`` file, mapping marked peer id, username and phone to what is needed
+to address the peer again (peer type via the marked id, access_hash) plus our
+own derived display fields (normalized type, title). Telethon's entity table
+has no derived fields and is only reachable through the session object.
+
+An index is loaded lazily on first use, kept in memory, and updated write-behind:
+resolved entities are recorded in memory and written in periodic batches (see
+``EntityIndexRegistry.flush``), off the event loop.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import sqlite3
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from telethon import utils
+from telethon.tl.types import (
+    InputPeerChannel,
+    InputPeerChat,
+    InputPeerUser,
+    PeerChannel,
+    PeerChat,
+)
+
+from ..config.server_config import get_config
+from ..config.settings import SESSION_DIR
+
+logger = logging.getLogger(__name__)
+
+INDEX_SUFFIX = ".index"
+
+_SCHEMA = """
+create table if not exists peers (
+    id integer primary key,
+    access_hash integer,
+    username text,
+    phone text,
+    type text,
+    title text,
+    updated integer
+)
+"""
+
+
+@dataclass(frozen=True)
+class IndexedPeer:
+    """One indexed peer; ``id`` is the marked peer id (-100… channels, -N chats)."""
+
+    id: int
+    access_hash: int | None
+    username: str | None
+    phone: str | None
+    type: str | None
+    title: str | None
+
+    def input_peer(self) -> Any:
+        """Input peer addressing this peer without any lookup."""
+        bare_id, peer_type = utils.resolve_id(self.id)
+        if peer_type is PeerChat:
+            return InputPeerChat(bare_id)
+        if peer_type is PeerChannel:
+            return InputPeerChannel(bare_id, self.access_hash or 0)
+        return InputPeerUser(bare_id, self.access_hash or 0)
+
+    def entity_dict(self) -> dict:
+        """The build_entity_dict subset the index can answer."""
+        result = {
+            "id": utils.resolve_id(self.id)[0],
+            "title": self.title,
+            "type": self.type,
+            "username": self.username,
+        }
+        return {k: v for k, v in result.items() if v is not None}
+
+
+def index_key(value: Any) -> int | str | None:
+    """Lookup key: marked id as int, ``phone:<digits>`` or lowercased username."""
+    if isinstance(value, int):
+        return value
+    if not isinstance(value, str):
+        return None
+    text = value.strip()
+    if text.startswith("+") and text[1:].isdigit():
+        return f"phone:{text[1:]}"
+    return text.lstrip("@").lower()
+
+
+class EntityIndex:
+    """In-memory view of one session's index file plus rows not yet written."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.loaded = False
+        self._peers: dict[int, IndexedPeer] = {}
+        self._aliases: dict[str, int] = {}
+        self._dirty: dict[int, IndexedPeer] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._peers)
+
+    @property
+    def dirty_count(self) -> int:
+        return len(self._dirty)
+
+    def _aliases_of(self, peer: IndexedPeer) -> list[str]:
+        aliases = [peer.username] if peer.username else []
+        if peer.phone:
+            aliases.append(f"phone:{peer.phone}")
+        return aliases
+
+    def _store(self, peer: IndexedPeer) -> None:
+        if previous := self._peers.get(peer.id):
+            for alias in self._aliases_of(previous):
+                if self._aliases.get(alias) == peer.id:
+                    del self._aliases[alias]
+        self._peers[peer.id] = peer
+        for alias in self._aliases_of(peer):
+            self._aliases[alias] = peer.id
+
+    def get(self, value: Any) -> IndexedPeer | None:
+        """Indexed peer for a marked id, ``+phone`` or username, or None."""
+        key = index_key(value)
+        peer_id = key if isinstance(key, int) or key is None else self._aliases.get(key)
+        peer = self._peers.get(peer_id) if peer_id is not None else None
+        if peer is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return peer
+
+    def put(self, peer: IndexedPeer) -> None:
+        """Record a resolved peer; only new or changed peers are written."""
+        if self._peers.get(peer.id) == peer:
+            return
+        self._store(peer)
+        self._dirty[peer.id] = peer
+
+    def take_dirty(self) -> list[IndexedPeer]:
+        peers = list(self._dirty.values())
+        self._dirty.clear()
+        return peers
+
+    def load(self) -> None:
+        """Merge the index file into memory (blocking); recorded peers win."""
+        for peer in read_index(self.path):
+            if peer.id not in self._peers:
+                self._store(peer)
+        self.loaded = True
+
+
+def read_index(path: Path) -> list[IndexedPeer]:
+    """Read an index file (blocking); a missing or unreadable file is empty."""
+    if not path.exists():
+        return []
+    try:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    except sqlite3.Error:
+        return []
+    try:
+        return [
+            IndexedPeer(*row)
+            for row in conn.execute(
+                "select id, access_hash, username, phone, type, title from peers"
+            )
+        ]
+    except sqlite3.Error as e:
+        logger.debug(f"Ignoring unreadable entity index {path.name}: {e}")
+        return []
+    finally:
+        conn.close()
+
+
+def write_index(path: Path, peers: list[IndexedPeer]) -> int:
+    """Upsert peers into an index file, creating it if needed (blocking).
+
+    Skipped once the session's ``.session`` file is gone, so a write-behind
+    batch of a logged-out session does not recreate its removed index.
+    """
+    session_path = path.with_name(path.name.removesuffix(INDEX_SUFFIX) + ".session")
+    if not peers or not session_path.exists():
+        return 0
+    now = int(time.time())
+    conn = sqlite3.connect(path)
+    try:
+        with conn:
+            conn.execute(_SCHEMA)
+            conn.executemany(
+                "insert or replace into peers values (?,?,?,?,?,?,?)",
+                [
+                    (p.id, p.access_hash, p.username, p.phone, p.type, p.title, now)
+                    for p in peers
+                ],
+            )
+    finally:
+        conn.close()
+    return len(peers)
+
+
+def write_index_batches(batches: list[tuple[Path, list[IndexedPeer]]]) -> int:
+    """Write several sessions' recorded peers in one worker-thread hop (blocking)."""
+    written = 0
+    for path, peers in batches:
+        try:
+            written += write_index(path, peers)
+        except sqlite3.Error as e:
+            logger.debug(f"Skipped writing entity index {path.name}: {e}")
+    return written
+
+
+class EntityIndexRegistry:
+    """Per-session indexes, LRU bounded; evicted indexes keep their unwritten rows."""
+
+    def __init__(self, directory: Path, max_sessions: int) -> None:
+        self.directory = directory
+        self.max_sessions = max_sessions
+        self._indexes: OrderedDict[str, EntityIndex] = OrderedDict()
+        self._loading: dict[str, asyncio.Task] = {}
+        self._pending: list[tuple[Path, list[IndexedPeer]]] = []
+
+    def path(self, session_key: str) -> Path:
+        return self.directory / f"{session_key}{INDEX_SUFFIX}"
+
+    def index(self, session_key: str) -> EntityIndex:
+        """The session's index, created (not yet loaded) if needed."""
+        index = self._indexes.get(session_key)
+        if index is None:
+            index = self._indexes[session_key] = EntityIndex(self.path(session_key))
+            while len(self._indexes) > self.max_sessions:
+                _, evicted = self._indexes.popitem(last=False)
+                if evicted.dirty_count:
+                    self._pending.append((evicted.path, evicted.take_dirty()))
+        else:
+            self._indexes.move_to_end(session_key)
+        return index
+
+    async def loaded(self, session_key: str) -> EntityIndex:
+        """The session's index with its file read; concurrent first uses share one read."""
+        index = self.index(session_key)
+        if index.loaded:
+            return index
+        task = self._loading.get(session_key)
+        if task is None:
+            task = asyncio.create_task(asyncio.to_thread(index.load))
+            self._loading[session_key] = task
+            task.add_done_callback(lambda _: self._loading.pop(session_key, None))
+        await asyncio.shield(task)
+        return index
+
+    def discard(self, session_key: str) -> None:
+        """Forget a session's index and unwritten rows (its session is being removed)."""
+        self._indexes.pop(session_key, None)
+        path = self.path(session_key)
+        self._pending = [batch for batch in self._pending if batch[0] != path]
+
+    async def flush(self) -> int:
+        """Write every index's recorded peers in one worker-thread hop."""
+        batches, self._pending = self._pending, []
+        for index in self._indexes.values():
+            if index.dirty_count:
+                batches.append((index.path, index.take_dirty()))
+        if not batches:
+            return 0
+        return await asyncio.to_thread(write_index_batches, batches)
+
+    def clear(self) -> None:
+        self._indexes.clear()
+        self._pending.clear()
+
+    def describe(self) -> dict[str, Any]:
+        indexes = list(self._indexes.values())
+        hits = sum(i.hits for i in indexes)
+        lookups = hits + sum(i.misses for i in indexes)
+        return {
+            "sessions": len(indexes),
+            "loaded": sum(i.loaded for i in indexes),
+            "entries": sum(len(i) for i in indexes),
+            "unwritten": sum(i.dirty_count for i in indexes)
+            + sum(len(peers) for _, peers in self._pending),
+            "hits": hits,
+            "hit_rate": round(hits / lookups, 3) if lookups else None,
+        }
+
+
+entity_indexes = EntityIndexRegistry(
+    SESSION_DIR, max_sessions=get_config().max_active_sessions
+)
@@ -219,7 +219,12 @@ def log_and_build_error(
 def find_connection_exception(
     exc: BaseException,
 ) -> SessionNotAuthorizedError | TelegramTransportError | None:
-    """Return session or transport error from exc or its __cause__ chain."""
+    """Return session or transport error from exc or its __cause__ chain.
+
+    Telegram rejecting the session on a regular RPC counts as a session error.
+    """
+    from src.client.connection import session_error_from_rpc
+
     session_cls, transport_cls = _get_connection_error_types()
     seen: set[int] = set()
     cur: BaseException | None = exc
@@ -229,6 +234,8 @@ def find_connection_exception(
             return cur
         if isinstance(cur, transport_cls):
             return cur
+        if (session_error := session_error_from_rpc(cur)) is not None:
+            return session_error
         cur = cur.__cause__
     return None
 
@@ -257,7 +264,7 @@ def log_connection_error_response(
             action=ErrorAction.AUTHENTICATE_SESSION,
             code=MCPErrorCode.SESSION_NOT_AUTHORIZED,
         )
-    return log_and_build_error(
+    response = log_and_build_error(
         operation=operation,
         error_message=str(resolved),
         params=params,
@@ -265,6 +272,11 @@ def log_connection_error_response(
         action=ErrorAction.RETRY,
         code=MCPErrorCode.CONNECTION_ERROR,
     )
+    # SessionTemporarilyUnavailableError: reconnect backoff, tell the caller when
+    retry_after = getattr(resolved, "retry_after", None)
+    if retry_after is not None:
+        response["retry_after"] = round(retry_after, 1)
+    return response
 
 
 def handle_tool_error(
@@ -0,0 +1,75 @@
+"""Consistent hashing of bearer tokens onto worker processes."""
+
+from __future__ import annotations
+
+import bisect
+import hashlib
+from collections.abc import Iterable
+
+# Virtual nodes per worker; more nodes give a more even token spread.
+VIRTUAL_NODES = 128
+
+
+def token_routing_key(token: str) -> str:
+    """Stable, non-secret routing key for a bearer token.
+
+    Also prefixes attachment ticket ids so ticket downloads, which carry no
+    bearer token, reach the worker that owns the session.
+    """
+    return hashlib.sha256(token.encode()).hexdigest()[:16]
+
+
+def _ring_hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest())
+
+
+class HashRing:
+    """Consistent-hash ring: adding or removing a node moves only ~1/N of the keys."""
+
+    def __init__(self, nodes: Iterable[str] = (), vnodes: int = VIRTUAL_NODES):
+        self._vnodes = vnodes
+        self._hashes: list[int] = []
+        self._owners: list[str] = []
+        self._nodes: set[str] = set()
+        for node in nodes:
+            self.add(node)
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def __contains__(self, node: object) -> bool:
+        return node in self._nodes
+
+    @property
+    def nodes(self) -> frozenset[str]:
+        return frozenset(self._nodes)
+
+    def add(self, node: str) -> None:
+        if node in self._nodes:
+            return
+        self._nodes.add(node)
+        for i in range(self._vnodes):
+            h = _ring_hash(f"{node}#{i}")
+            idx = bisect.bisect(self._hashes, h)
+            self._hashes.insert(idx, h)
+            self._owners.insert(idx, node)
+
+    def remove(self, node: str) -> None:
+        if node not in self._nodes:
+            return
+        self._nodes.discard(node)
+        keep = [
+            (h, o) for h, o in zip(self._hashes, self._owners, strict=True) if o != node
+        ]
+        self._hashes = [h for h, _ in keep]
+        self._owners = [o for _, o in keep]
+
+    def node_for(self, key: str) -> str | None:
+        """Owner of key: the first virtual node clockwise from the key's hash."""
+        if not self._hashes:
+            return None
+        idx = bisect.bisect(self._hashes, _ring_hash(key)) % len(self._hashes)
+        return self._owners[idx]
+
+    def node_for_token(self, token: str) -> str | None:
+        return self.node_for(token_routing_key(token))
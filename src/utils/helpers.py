@@ -11,10 +11,12 @@ def _append_dedup_until_limit(
 ) -> None:
     """Append messages into collected with deduplication until target_total is reached.
 
-    Deduplicates by (chat.id, message.id) pair.
+    Deduplicates by (chat.id, message.id) pair; normalized results carry the
+    chat as chat_id.
     """
     for msg in new_messages:
-        key = (msg.get("chat", {}).get("id"), msg.get("id"))
+        chat_id = msg.get("chat_id", (msg.get("chat") or {}).get("id"))
+        key = (chat_id, msg.get("id"))
         if key in seen_keys:
             continue
         seen_keys.add(key)
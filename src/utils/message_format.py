@@ -6,17 +6,26 @@ from collections.abc import Callable
 from typing import Any
 from urllib.parse import quote
 
+from telethon import utils
 from telethon.errors import RPCError
 from telethon.tl.functions.messages import TranscribeAudioRequest
 
 from src.client.connection import get_connected_client, get_request_token
 from src.config.server_config import get_config
-from src.server_components.attachment_tickets import mint_attachment_ticket
+from src.server_components.attachment_tickets import (
+    mint_attachment_ticket,
+    mint_attachment_tickets,
+)
 from src.utils.entity import (
     _extract_forward_info,
     _forward_peer_id_and_type_label,
+    _resolution_cache_key,
     build_entity_dict,
+    entity_from_map,
+    forward_info_from_entities,
     get_entity_by_id,
+    message_entities,
+    resolve_many,
 )
 
 logger = logging.getLogger(__name__)
@@ -42,6 +51,75 @@ _KNOWN_MEDIA_CLASSES = frozenset(
 )
 
 
+# Top-level keys of a message result that a ``fields`` projection may select
+MESSAGE_RESULT_FIELDS = frozenset(
+    {
+        "id",
+        "date",
+        "text",
+        "link",
+        "sender",
+        "chat",
+        "reply_to_msg_id",
+        "topic_id",
+        "media",
+        "forwarded_from",
+        "reply_markup",
+        "transcription",
+    }
+)
+
+
+def message_fields(fields: list[str] | None) -> frozenset[str] | None:
+    """Validated ``fields`` projection for message results; None selects every field.
+
+    ``id`` is always included. Raises ValueError for unknown field names.
+    """
+    if fields is None:
+        return None
+    requested = {f.strip() for f in fields if f and f.strip()}
+    if unknown := requested - MESSAGE_RESULT_FIELDS:
+        raise ValueError(
+            f"Unknown message fields: {', '.join(sorted(unknown))}. "
+            f"Valid fields: {', '.join(sorted(MESSAGE_RESULT_FIELDS))}"
+        )
+    return frozenset(requested | {"id"})
+
+
+def wants_field(fields: frozenset[str] | None, name: str) -> bool:
+    return fields is None or name in fields
+
+
+# Normalized results' references, selected by the field they replace
+_REFERENCE_FIELDS = {"sender_id": "sender", "chat_id": "chat"}
+
+
+def project_message_result(
+    result: dict[str, Any], fields: frozenset[str] | None
+) -> dict[str, Any]:
+    """result limited to fields; error entries keep their error."""
+    if fields is None:
+        return result
+    return {
+        k: v
+        for k, v in result.items()
+        if k in fields or _REFERENCE_FIELDS.get(k) in fields or k == "error"
+    }
+
+
+def referenced_entities(
+    messages: list[dict[str, Any]], entity_table: dict[str, dict[str, Any]]
+) -> dict[str, dict[str, Any]]:
+    """The part of a normalized response's entity table its messages refer to."""
+    ids = set()
+    for message in messages:
+        forward = message.get("forwarded_from") or {}
+        for holder in (message, forward):
+            ids.add(str(holder.get("sender_id")))
+            ids.add(str(holder.get("chat_id")))
+    return {k: v for k, v in entity_table.items() if k in ids}
+
+
 def _document_voice_and_round_note_flags(document) -> tuple[bool, bool]:
     """Return (is_voice_message, is_round_video) from document attributes."""
     is_voice = False
@@ -72,6 +150,30 @@ def _message_supports_streaming_attachment(message) -> bool:
     return False
 
 
+def _attachment_session_token() -> str | None:
+    """Session to mint attachment tickets for; None unless HTTP mode with a public DOMAIN."""
+    cfg = get_config()
+    if cfg.transport != "http" or not cfg.public_base_url_normalized:
+        return None
+    session_token = get_request_token()
+    if session_token is None:
+        session_token = cfg.session_name
+    return session_token
+
+
+def _str_or_none(value) -> str | None:
+    return value if isinstance(value, str) else None
+
+
+def _attachment_download_url(media_dict: dict[str, Any], message, tid: str) -> str:
+    base = get_config().public_base_url_normalized
+    url = f"{base}/v1/attachments/{tid}"
+    if tid_filename := media_dict.get("filename"):
+        return f"{url}/{quote(tid_filename, safe='')}"
+    msg_id = getattr(message, "id", "unknown")
+    return f"{url}/photo_{msg_id}.jpg"
+
+
 async def _maybe_set_attachment_download_url(
     media_dict: dict[str, Any],
     message,
@@ -80,33 +182,52 @@ async def _maybe_set_attachment_download_url(
     """Set media['attachment_download_url'] when HTTP mode and DOMAIN resolves to a public origin."""
     if chat_id is None:
         return
-    cfg = get_config()
-    if cfg.transport != "http" or not cfg.public_base_url_normalized:
+    session_token = _attachment_session_token()
+    if session_token is None:
         return
     if not _message_supports_streaming_attachment(message):
         return
 
-    session_token = get_request_token()
-    if session_token is None:
-        session_token = cfg.session_name
-
-    filename = media_dict.get("filename")
-    mime_type = media_dict.get("mime_type")
     tid = await mint_attachment_ticket(
         session_token,
         int(chat_id),
         int(message.id),
-        filename=filename if isinstance(filename, str) else None,
-        mime_type=mime_type if isinstance(mime_type, str) else None,
+        filename=_str_or_none(media_dict.get("filename")),
+        mime_type=_str_or_none(media_dict.get("mime_type")),
     )
-    base = cfg.public_base_url_normalized
-    url = f"{base}/v1/attachments/{tid}"
-    if tid_filename := media_dict.get("filename"):
-        url = f"{url}/{quote(tid_filename, safe='')}"
-    else:
-        msg_id = getattr(message, "id", "unknown")
-        url = f"{url}/photo_{msg_id}.jpg"
-    media_dict["attachment_download_url"] = url
+    media_dict["attachment_download_url"] = _attachment_download_url(
+        media_dict, message, tid
+    )
+
+
+async def _set_attachment_download_urls(
+    attachments: list[tuple[dict[str, Any], Any, int]],
+) -> None:
+    """_maybe_set_attachment_download_url for (media, message, chat_id) triples,
+    minting all their tickets together."""
+    session_token = _attachment_session_token()
+    if session_token is None:
+        return
+    attachments = [
+        a for a in attachments if _message_supports_streaming_attachment(a[1])
+    ]
+    if not attachments:
+        return
+
+    tids = await mint_attachment_tickets(
+        session_token,
+        [
+            (
+                int(chat_id),
+                int(message.id),
+                _str_or_none(media.get("filename")),
+                _str_or_none(media.get("mime_type")),
+            )
+            for media, message, chat_id in attachments
+        ],
+    )
+    for (media, message, _), tid in zip(attachments, tids, strict=True):
+        media["attachment_download_url"] = _attachment_download_url(media, message, tid)
 
 
 def _has_any_media(message) -> bool:
@@ -256,10 +377,58 @@ def build_send_edit_result(message, chat, status: str) -> dict[str, Any]:
     return result
 
 
-async def get_sender_info(client, message) -> dict[str, Any] | None:
+def message_entity_peers(message, fields: frozenset[str] | None = None) -> list:
+    """Peers build_message_result resolves for a message: sender and forward
+    origins, as far as ``fields`` selects them."""
+    peers = []
+    sender_id = getattr(message, "sender_id", None)
+    if sender_id and wants_field(fields, "sender"):
+        peers.append(sender_id)
+    fwd_from = getattr(message, "fwd_from", None)
+    if fwd_from and wants_field(fields, "forwarded_from"):
+        peers += [
+            peer
+            for peer in (
+                getattr(fwd_from, "from_id", None),
+                getattr(fwd_from, "saved_from_peer", None),
+            )
+            if peer is not None
+        ]
+    return peers
+
+
+async def prefetch_message_entities(
+    client,
+    messages,
+    extra_peers=(),
+    known: dict | None = None,
+    fields: frozenset[str] | None = None,
+) -> dict:
+    """Resolve every peer a page of messages refers to in batched requests.
+
+    Warms the entity cache so build_message_result's per-message lookups are
+    cache hits; returns resolve_many's mapping. Peers already in ``known`` (a
+    response-scoped entity map) are not resolved at all, nor senders and
+    forward origins that ``fields`` leaves out.
+    """
+    peers = [*extra_peers]
+    for message in messages:
+        if message:
+            peers += message_entity_peers(message, fields)
+    peers = [peer for peer in peers if entity_from_map(known, peer) is None]
+    if not peers:
+        return {}
+    return await resolve_many(peers, client=client)
+
+
+async def get_sender_info(
+    client, message, entities: dict | None = None
+) -> dict[str, Any] | None:
     if hasattr(message, "sender_id") and message.sender_id:
         try:
-            sender = await get_entity_by_id(message.sender_id)
+            sender = entity_from_map(
+                entities, message.sender_id
+            ) or await get_entity_by_id(message.sender_id)
             if sender:
                 return build_entity_dict(sender)
             return {"id": message.sender_id, "error": "Sender not found"}
@@ -475,13 +644,30 @@ def _extract_topic_metadata(message: Any) -> dict[str, Any]:
     return {"topic_id": topic_id} if topic_id is not None else {}
 
 
-async def build_message_result(
-    client, message, entity_or_chat, link: str | None, include_chat_entity: bool = False
+def _sender_dict(message, sender) -> dict[str, Any] | None:
+    """get_sender_info's result for an already looked-up sender entity."""
+    sender_id = getattr(message, "sender_id", None)
+    if not sender_id:
+        return None
+    if sender:
+        return build_entity_dict(sender)
+    return {"id": sender_id, "error": "Sender not found"}
+
+
+def _assemble_message_result(
+    message,
+    chat: dict[str, Any] | None,
+    link: str | None,
+    include_chat_entity: bool,
+    sender: dict[str, Any] | None,
+    forward_info: dict[str, Any] | None,
+    fields: frozenset[str] | None = None,
 ) -> dict[str, Any]:
-    sender = await get_sender_info(client, message)
-    chat = build_entity_dict(entity_or_chat)
-    forward_info = await _extract_forward_info(message)
+    """Result dict for one message from its resolved parts (no attachment URL).
 
+    Media and reply markup are only parsed when ``fields`` selects them (media
+    also for ``transcription``); the result is not projected here.
+    """
     full_text = (
         getattr(message, "text", None)
         or getattr(message, "message", None)
@@ -508,24 +694,205 @@ async def build_message_result(
     # Topic metadata: derived from reply_to.forum_topic (set on forum thread messages).
     result |= _extract_topic_metadata(message)
 
-    if hasattr(message, "media") and message.media:
+    wants_media = wants_field(fields, "media") or wants_field(fields, "transcription")
+    if wants_media and hasattr(message, "media") and message.media:
         media_placeholder = _build_media_placeholder(message)
         if media_placeholder is not None:
             result["media"] = media_placeholder
-            await _maybe_set_attachment_download_url(
-                result["media"], message, chat.get("id") if chat else None
-            )
 
     if forward_info is not None:
         result["forwarded_from"] = forward_info
 
-    reply_markup = _extract_reply_markup(message)
-    if reply_markup is not None:
-        result["reply_markup"] = reply_markup
+    if wants_field(fields, "reply_markup"):
+        reply_markup = _extract_reply_markup(message)
+        if reply_markup is not None:
+            result["reply_markup"] = reply_markup
+
+    return result
+
+
+async def build_message_result(
+    client,
+    message,
+    entity_or_chat,
+    link: str | None,
+    include_chat_entity: bool = False,
+    entities: dict | None = None,
+) -> dict[str, Any]:
+    """Build the result dict for one message.
 
+    ``entities`` is an optional response-scoped entity map (see
+    response_entities/message_entities); senders and forward origins found
+    there are not resolved again. Pages of messages should use
+    build_message_results_batch.
+    """
+    sender = await get_sender_info(client, message, entities)
+    chat = build_entity_dict(entity_or_chat)
+    forward_info = await _extract_forward_info(message, entities)
+
+    result = _assemble_message_result(
+        message, chat, link, include_chat_entity, sender, forward_info
+    )
+    if "media" in result:
+        await _maybe_set_attachment_download_url(
+            result["media"], message, chat.get("id") if chat else None
+        )
     return result
 
 
+async def build_message_results_batch(
+    client,
+    messages: list,
+    chat,
+    links: list[str | None] | None = None,
+    *,
+    include_chat_entity: bool = False,
+    entities: dict | None = None,
+    chats: list | None = None,
+    fields: frozenset[str] | None = None,
+    entity_table: dict[str, dict[str, Any]] | None = None,
+) -> list[dict[str, Any]]:
+    """Build result dicts for a page of messages, like build_message_result.
+
+    Every sender and forward origin the page refers to is read from
+    ``entities`` (a response-scoped entity map) or the entities Telethon
+    attached to the messages, and the rest are resolved in one batched pass;
+    attachment tickets for the whole page are minted together. The dicts are
+    then assembled without further awaits.
+
+    Args:
+        messages: The page, in result order
+        chat: Chat entity the messages belong to
+        links: Optional message link per message
+        chats: Optional chat entity per message (overrides ``chat``), for pages
+            spanning several chats such as global search
+        fields: Optional projection (see message_fields). Senders and forward
+            origins are only resolved, and attachment tickets only minted, when
+            selected; ``media`` is kept for ``transcription`` so callers can
+            transcribe and then project_message_result (as is ``chat`` for
+            deduplication).
+        entity_table: Normalized output: messages carry ``sender_id`` and
+            ``chat_id`` (marked ids; forward origins likewise) instead of entity
+            dicts, and each entity's dict is added to this table once, keyed by
+            the id as a string (see referenced_entities).
+    """
+    normalized = entity_table is not None
+    build_fields = fields
+    if fields is not None:
+        if "transcription" in fields:
+            build_fields = build_fields | {"media"}
+        if include_chat_entity or normalized:
+            build_fields = build_fields | {"chat"}
+    entities = {**message_entities(messages), **(entities or {})}
+    resolved = await prefetch_message_entities(
+        client, messages, known=entities, fields=fields
+    )
+
+    def lookup(peer):
+        if not peer:
+            return None
+        return entity_from_map(entities, peer) or resolved.get(
+            _resolution_cache_key(peer)
+        )
+
+    chat_dicts: dict[int, dict[str, Any] | None] = {}
+    results = []
+    attachments = []
+    for i, message in enumerate(messages):
+        message_chat = chats[i] if chats is not None else chat
+        if id(message_chat) not in chat_dicts:
+            chat_dicts[id(message_chat)] = build_entity_dict(message_chat)
+        chat_dict = chat_dicts[id(message_chat)]
+
+        sender = forward_info = None  # Normalized: set by _set_entity_references
+        if not normalized and wants_field(fields, "sender"):
+            sender = _sender_dict(message, lookup(getattr(message, "sender_id", None)))
+        if not normalized and wants_field(fields, "forwarded_from"):
+            forward = getattr(message, "forward", None)
+            forward_info = forward_info_from_entities(
+                message,
+                lookup(getattr(forward, "from_id", None)),
+                lookup(getattr(forward, "saved_from_peer", None)),
+            )
+        result = _assemble_message_result(
+            message,
+            chat_dict,
+            links[i] if links is not None else None,
+            include_chat_entity and not normalized,
+            sender,
+            forward_info,
+            fields,
+        )
+        if normalized:
+            _set_entity_references(
+                result, message, message_chat, lookup, entity_table, fields
+            )
+        if (
+            "media" in result
+            and wants_field(fields, "media")
+            and chat_dict
+            and chat_dict.get("id") is not None
+        ):
+            attachments.append((result["media"], message, chat_dict["id"]))
+        results.append(project_message_result(result, build_fields))
+
+    await _set_attachment_download_urls(attachments)
+    return results
+
+
+def _entity_reference(entity_table: dict[str, dict[str, Any]], entity) -> int | None:
+    """Marked id of entity, recording its build_entity_dict in entity_table."""
+    try:
+        marked_id = utils.get_peer_id(entity)
+    except Exception:
+        return None
+    key = str(marked_id)
+    if key not in entity_table:
+        entity_table[key] = build_entity_dict(entity)
+    return marked_id
+
+
+def _set_entity_references(
+    result: dict[str, Any],
+    message,
+    chat,
+    lookup: Callable[[Any], Any],
+    entity_table: dict[str, dict[str, Any]],
+    fields: frozenset[str] | None,
+) -> None:
+    """Normalized output: sender, chat and forward origins as ids into entity_table.
+
+    Senders and origins that could not be resolved have no table entry; forward
+    origins then keep their inline stub.
+    """
+    result.pop("sender", None)
+    sender_id = getattr(message, "sender_id", None)
+    if sender_id and wants_field(fields, "sender"):
+        if (sender := lookup(sender_id)) is not None:
+            _entity_reference(entity_table, sender)
+        result["sender_id"] = sender_id
+    if (chat_id := _entity_reference(entity_table, chat)) is not None:
+        result["chat_id"] = chat_id
+
+    forward = getattr(message, "forward", None)
+    if forward is None or not wants_field(fields, "forwarded_from"):
+        return
+    origins = {
+        "sender": lookup(getattr(forward, "from_id", None)),
+        "chat": lookup(getattr(forward, "saved_from_peer", None)),
+    }
+    forward_info = forward_info_from_entities(
+        message, origins["sender"], origins["chat"]
+    )
+    for role, entity in origins.items():
+        if entity is None:
+            continue
+        if (origin_id := _entity_reference(entity_table, entity)) is not None:
+            del forward_info[role]
+            forward_info[f"{role}_id"] = origin_id
+    result["forwarded_from"] = forward_info
+
+
 class PremiumRequiredError(Exception):
     """Exception raised when transcription fails due to non-premium account."""
 
@@ -5,7 +5,10 @@ Pytest configuration and shared fixtures for Telegram MCP Server tests.
 This module provides common fixtures and configuration used across all test files.
 """
 
+import asyncio
+from collections.abc import Awaitable, Callable
 from datetime import datetime
+from typing import Any
 from unittest.mock import AsyncMock, MagicMock
 
 import pytest
@@ -13,6 +16,7 @@ import pytest_asyncio
 from fastmcp import Client, FastMCP
 from fastmcp.server.auth import AccessToken
 from fastmcp.server.auth.providers.jwt import StaticTokenVerifier
+from telethon.sessions import MemorySession
 
 from src.config.server_config import ServerConfig, ServerMode, set_config
 
@@ -81,6 +85,51 @@ def mock_client():
     return MockTelegramClient()
 
 
+@pytest.fixture
+def fake_telegram_client():
+    """Factory for offline TelegramClient doubles used by session and resolution tests.
+
+    ``fake_telegram_client(rpc, get_entity=..., rpc_seconds=...)`` returns a
+    connected MagicMock client with a MemorySession and AsyncMock
+    connect/disconnect. ``await client(request)`` is recorded in
+    ``client.requests`` and answered by ``await client.rpc(request)``, which
+    starts out as ``rpc``; ``client.get_entity(peer)`` is recorded in
+    ``client.lookups`` and answered by ``await get_entity(peer)``. Each call
+    first sleeps ``rpc_seconds``.
+    """
+
+    def make(
+        rpc: Callable[[Any], Awaitable[Any]] | None = None,
+        *,
+        get_entity: Callable[[Any], Awaitable[Any]] | None = None,
+        rpc_seconds: float = 0.0,
+    ) -> MagicMock:
+        client = MagicMock()
+        client.session = MemorySession()
+        client.is_connected.return_value = True
+        client.connect = AsyncMock()
+        client.disconnect = AsyncMock()
+        client.requests = []
+        client.lookups = []
+        client.rpc = rpc
+
+        async def call(request):
+            client.requests.append(request)
+            await asyncio.sleep(rpc_seconds)
+            return await client.rpc(request) if client.rpc is not None else None
+
+        async def lookup(peer):
+            client.lookups.append(peer)
+            await asyncio.sleep(rpc_seconds)
+            return await get_entity(peer) if get_entity is not None else None
+
+        client.side_effect = call
+        client.get_entity.side_effect = lookup
+        return client
+
+    return make
+
+
 @pytest.fixture
 def test_server(mock_client):
     """Create a FastMCP server instance for testing with mock authentication."""
@@ -540,16 +589,15 @@ def clear_entity_cache():
 
     This fixture runs automatically for every test via autouse=True.
     """
-    from src.utils.entity import (
-        _ENTITY_DICT_CACHE,
-        _ENTITY_TYPE_CACHE,
-        _FOLDER_LIST_CACHE,
-    )
+    from src.utils.entity import _FOLDER_LIST_CACHE, _entity_caches, _folder_fetches
+    from src.utils.entity_index import entity_indexes
 
-    _ENTITY_TYPE_CACHE.clear()
-    _ENTITY_DICT_CACHE.clear()
+    _entity_caches.clear()
     _FOLDER_LIST_CACHE.clear()
+    _folder_fetches.clear()
+    entity_indexes.clear()
     yield
-    _ENTITY_TYPE_CACHE.clear()
-    _ENTITY_DICT_CACHE.clear()
+    _entity_caches.clear()
     _FOLDER_LIST_CACHE.clear()
+    _folder_fetches.clear()
+    entity_indexes.clear()
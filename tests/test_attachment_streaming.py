@@ -1,23 +1,29 @@
 """Attachment ticket store and unauthenticated GET /v1/attachments/{ticket_id} streaming."""
 
+import os
+import time
 from unittest.mock import AsyncMock, MagicMock, patch
 from urllib.parse import quote
 
 import pytest
 import pytest_asyncio
 
+from src.config.server_config import get_config
 from src.server_components.attachment_routes import handle_attachment_download
 from src.server_components.attachment_tickets import (
     clear_attachment_tickets_for_tests,
     get_attachment_ticket,
     mint_attachment_ticket,
+    revoke_attachment_tickets,
 )
+from src.utils.hash_ring import token_routing_key
 
 pytestmark = pytest.mark.usefixtures("http_no_auth_config")
 
 
 @pytest_asyncio.fixture(autouse=True)
-async def _reset_tickets():
+async def _reset_tickets(http_no_auth_config, tmp_path):
+    http_no_auth_config.session_dir = str(tmp_path)
     await clear_attachment_tickets_for_tests()
     yield
     await clear_attachment_tickets_for_tests()
@@ -53,6 +59,96 @@ async def test_expired_ticket_returns_none():
         assert await get_attachment_ticket(tid) is None
 
 
+@pytest.mark.asyncio
+async def test_ticket_is_signed_and_does_not_carry_the_token():
+    tid = await mint_attachment_ticket("secret-token", -1001, 7, filename="a.pdf")
+    assert "secret-token" not in tid
+    assert tid.startswith(f"{token_routing_key('secret-token')}.")
+
+    prefix, key_id, payload, signature = tid.split(".")
+    forged = await mint_attachment_ticket("secret-token", -1001, 8, filename="a.pdf")
+    assert (
+        await get_attachment_ticket(
+            f"{prefix}.{key_id}.{forged.split('.')[2]}.{signature}"
+        )
+        is None
+    )
+    assert (
+        await get_attachment_ticket(f"{prefix}.{key_id}.{payload}.{signature[:-2]}AA")
+        is None
+    )
+
+
+@pytest.mark.asyncio
+async def test_rotated_keys_keep_verifying_until_removed():
+    cfg = get_config()
+    cfg.attachment_ticket_keys = "old-key"
+    old = await mint_attachment_ticket("tok", 1, 1)
+
+    cfg.attachment_ticket_keys = "new-key,old-key"
+    new = await mint_attachment_ticket("tok", 1, 2)
+    assert new.split(".")[1] != old.split(".")[1]
+    assert (await get_attachment_ticket(old)).message_id == 1
+    assert (await get_attachment_ticket(new)).message_id == 2
+
+    cfg.attachment_ticket_keys = "new-key"
+    assert await get_attachment_ticket(old) is None
+    assert await get_attachment_ticket(new) is not None
+
+
+@pytest.mark.asyncio
+async def test_other_process_verifies_ticket_for_a_session_file(tmp_path):
+    get_config().session_dir = str(tmp_path)
+    (tmp_path / "file-token.session").touch()
+    tid = await mint_attachment_ticket("file-token", -1001, 5)
+    orphan = await mint_attachment_ticket("no-session-token", -1001, 5)
+    await clear_attachment_tickets_for_tests()  # Fresh worker: nothing minted here
+
+    ticket = await get_attachment_ticket(tid)
+    assert ticket.session_token == "file-token"
+    assert ticket.chat_id == -1001
+    assert await get_attachment_ticket(orphan) is None
+
+
+@pytest.mark.asyncio
+async def test_revoked_session_tickets_are_refused():
+    before = await mint_attachment_ticket("logged-out", 1, 1)
+    other = await mint_attachment_ticket("still-in", 1, 1)
+
+    await revoke_attachment_tickets("logged-out")
+    after = await mint_attachment_ticket("logged-out", 1, 2)  # Logged in again
+
+    assert await get_attachment_ticket(before) is None
+    assert await get_attachment_ticket(other) is not None
+    assert await get_attachment_ticket(after) is not None
+
+
+@pytest.mark.asyncio
+async def test_revocation_in_one_process_is_honoured_by_another(tmp_path):
+    (tmp_path / "logged-out.session").touch()
+    before = await mint_attachment_ticket("logged-out", 1, 1)
+
+    await revoke_attachment_tickets("logged-out")  # On the worker handling logout
+    await clear_attachment_tickets_for_tests()  # The worker serving downloads
+    assert await get_attachment_ticket(before) is None
+
+    after = await mint_attachment_ticket("logged-out", 1, 2)
+    assert await get_attachment_ticket(after) is not None
+
+
+@pytest.mark.asyncio
+async def test_expired_revocation_markers_are_removed(tmp_path):
+    await revoke_attachment_tickets("long-gone")
+    marker = tmp_path / f"{token_routing_key('long-gone')}.tickets-revoked"
+    expired = time.time() - get_config().attachment_ticket_ttl_seconds - 1
+    os.utime(marker, (expired, expired))
+
+    await revoke_attachment_tickets("just-now")
+
+    assert not marker.exists()
+    assert (tmp_path / f"{token_routing_key('just-now')}.tickets-revoked").exists()
+
+
 @pytest.mark.asyncio
 async def test_unknown_ticket_returns_404():
     req = MagicMock()
@@ -0,0 +1,155 @@
+"""get_chat_info: per-session TTL cache, coalesced concurrent calls and concurrent
+full-info / forum-topics fetches."""
+
+import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from telethon.errors import FloodWaitError
+from telethon.tl import functions, types
+
+from src.client.connection import set_request_token
+from src.tools.contacts import get_chat_info_impl
+from src.utils import entity as entity_module
+from src.utils.entity_cache import EntityCacheRegistry
+
+RPC_SECONDS = 0.05
+
+FORUM = types.Channel(
+    id=777,
+    title="Forum",
+    photo=types.ChatPhotoEmpty(),
+    date=None,
+    access_hash=1,
+    megagroup=True,
+    forum=True,
+)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+async def _answer(request):
+    if isinstance(request, functions.channels.GetFullChannelRequest):
+        full_chat = MagicMock(participants_count=42, about="About the forum")
+        return MagicMock(full_chat=full_chat)
+    topic = MagicMock(id=7, title="General")
+    return MagicMock(topics=[topic])
+
+
+def _request_names(client) -> list[str]:
+    return [type(request).__name__ for request in client.requests]
+
+
+@pytest.fixture
+def clock():
+    clock = FakeClock()
+    registry = EntityCacheRegistry(
+        max_sessions=2,
+        max_entries=100,
+        ttls={"type": 600, "profile": 600, "entity": 600, "full": 300},
+        clock=clock,
+    )
+    with patch.object(entity_module, "_entity_caches", registry):
+        yield clock
+    set_request_token(None)
+
+
+@pytest.fixture
+def client(clock, fake_telegram_client):
+    client = fake_telegram_client(_answer, rpc_seconds=RPC_SECONDS)
+    with (
+        patch("src.tools.contacts.get_entity_by_id", AsyncMock(return_value=FORUM)),
+        patch(
+            "src.tools.contacts.get_connected_client", AsyncMock(return_value=client)
+        ),
+        patch("src.utils.entity.get_connected_client", AsyncMock(return_value=client)),
+    ):
+        yield client
+
+
+@pytest.mark.asyncio
+async def test_repeated_calls_within_ttl_are_served_from_cache(client, clock):
+    first = await get_chat_info_impl("777")
+    assert first["from_cache"] is False
+    assert first["members_count"] == 42
+    assert first["topics"] == [{"topic_id": 7, "title": "General"}]
+
+    later = time.time() + 90
+    with patch.object(entity_module, "time", MagicMock(time=lambda: later)):
+        clock.now = 90
+        second = await get_chat_info_impl("777")
+    assert second["from_cache"] is True
+    assert 89 < second["cache_age_seconds"] < 91
+    assert second["topics"] == first["topics"]
+    assert _request_names(client) == ["GetFullChannelRequest", "GetForumTopicsRequest"]
+
+    clock.now = 300
+    third = await get_chat_info_impl("777")
+    assert third["from_cache"] is False
+    assert len(client.requests) == 4
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_concurrent_fetch(client):
+    started = time.perf_counter()
+    results = await asyncio.gather(*(get_chat_info_impl("777") for _ in range(5)))
+    elapsed = time.perf_counter() - started
+
+    assert sorted(_request_names(client)) == [
+        "GetForumTopicsRequest",
+        "GetFullChannelRequest",
+    ]
+    # Full info and topics overlap instead of running back to back.
+    assert elapsed < 2 * RPC_SECONDS
+    assert all(r["about"] == "About the forum" for r in results)
+
+
+@pytest.mark.asyncio
+async def test_sessions_do_not_share_cached_info(client):
+    set_request_token("tenant-a")
+    await get_chat_info_impl("777")
+    set_request_token("tenant-b")
+    result = await get_chat_info_impl("777")
+
+    assert result["from_cache"] is False
+    assert len(client.requests) == 4
+
+
+@pytest.mark.asyncio
+async def test_failed_topics_fetch_is_not_cached(client):
+    with patch(
+        "src.tools.contacts._list_forum_topics",
+        AsyncMock(side_effect=RuntimeError("boom")),
+    ):
+        result = await get_chat_info_impl("777")
+    assert "topics" not in result
+
+    result = await get_chat_info_impl("777")
+    assert result["topics"] == [{"topic_id": 7, "title": "General"}]
+    assert result["from_cache"] is False  # Full info cached, topics fetched now
+
+
+@pytest.mark.asyncio
+async def test_partial_full_info_is_not_cached(client):
+    failures = [FloodWaitError(None, 30)]
+
+    async def flood_once(request):
+        if isinstance(request, functions.channels.GetFullChannelRequest) and failures:
+            raise failures.pop()
+        return await _answer(request)
+
+    client.rpc = flood_once
+    degraded = await get_chat_info_impl("777")
+    assert "members_count" not in degraded
+
+    result = await get_chat_info_impl("777")
+    assert result["members_count"] == 42
+    assert result["about"] == "About the forum"
+    assert _request_names(client).count("GetFullChannelRequest") == 2
@@ -0,0 +1,167 @@
+"""Session-scoped, bounded entity caches with per-field-class TTLs."""
+
+import random
+import tracemalloc
+from unittest.mock import patch
+
+import pytest
+from telethon.tl import types
+
+from src.client.connection import set_request_token
+from src.utils import entity as entity_module
+from src.utils.entity import build_entity_dict, get_normalized_chat_type
+from src.utils.entity_cache import MISSING, EntityCacheRegistry, TTLCache
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _user(user_id: int, access_hash: int = 1, name: str = "Alice") -> types.User:
+    return types.User(id=user_id, access_hash=access_hash, first_name=name)
+
+
+@pytest.fixture
+def clock():
+    clock = FakeClock()
+    registry = EntityCacheRegistry(
+        max_sessions=2,
+        max_entries=100,
+        ttls={"type": 86400, "profile": 600},
+        clock=clock,
+    )
+    with patch.object(entity_module, "_entity_caches", registry):
+        yield clock
+    set_request_token(None)
+
+
+def test_ttl_cache_evicts_lru_and_expires():
+    clock = FakeClock()
+    cache = TTLCache(max_entries=2, ttl_seconds=10, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", None)
+    assert cache.get("a") == 1  # "b" is now least recently used
+    cache.set("c", 3)
+
+    assert cache.get("b") is MISSING
+    assert cache.get("c") == 3
+    clock.now = 10
+    assert cache.get("a") is MISSING
+    assert cache.counters() == {
+        "hits": 2,
+        "misses": 2,
+        "expirations": 1,
+        "evictions": 1,
+    }
+
+
+def test_sessions_never_share_cached_access_hashes(clock):
+    set_request_token("tenant-a")
+    assert build_entity_dict(_user(7, access_hash=111))["access_hash"] == 111
+    set_request_token("tenant-b")
+    assert build_entity_dict(_user(7, access_hash=222))["access_hash"] == 222
+    set_request_token("tenant-a")
+    assert build_entity_dict(_user(7, access_hash=222))["access_hash"] == 111
+
+
+def test_profiles_refresh_after_ttl_while_types_stay_cached(clock):
+    set_request_token("tenant-a")
+    build_entity_dict(_user(7, name="Alice"))
+
+    clock.now = 599
+    assert build_entity_dict(_user(7, name="Alicia"))["title"] == "Alice"
+    clock.now = 600
+    assert build_entity_dict(_user(7, name="Alicia"))["title"] == "Alicia"
+
+    stats = entity_module.get_entity_cache_stats()["fields"]
+    assert stats["profile"]["expirations"] == 1
+    assert stats["type"]["expirations"] == 0
+    assert get_normalized_chat_type(_user(7)) == "private"
+
+
+def test_least_recently_used_session_namespace_is_dropped(clock):
+    for token in ("tenant-a", "tenant-b", "tenant-c"):
+        set_request_token(token)
+        build_entity_dict(_user(7))
+
+    stats = entity_module.get_entity_cache_stats()
+    assert stats["sessions"] == 2
+    assert stats["sessions_evicted"] == 1
+    # Counters of the dropped namespace are kept.
+    assert stats["fields"]["profile"]["misses"] == 3
+
+
+TENANTS = [f"tenant-{i}" for i in range(8)]
+
+
+def _simulate_week(clock: FakeClock, rng: random.Random) -> int:
+    """Hourly traffic per tenant: three tool calls a minute apart over a working
+    set of known chats, plus chats never seen before (new search results)."""
+    known = {
+        tenant: [_user(i * 100_000 + j, access_hash=i) for j in range(300)]
+        for i, tenant in enumerate(TENANTS)
+    }
+    tracemalloc.start()
+    lookups = 0
+    for hour in range(7 * 24):
+        for i, tenant in enumerate(TENANTS):
+            set_request_token(tenant)
+            working_set = rng.sample(known[tenant], 20)
+            for call in range(3):
+                clock.now = hour * 3600 + i * 60 + call * 60
+                for entity in rng.sample(working_set, 10):
+                    build_entity_dict(entity)
+                lookups += 10
+            for j in range(5):
+                build_entity_dict(
+                    _user(i * 100_000 + 1000 + hour * 5 + j, access_hash=i)
+                )
+            lookups += 5
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return lookups, retained
+
+
+def test_bounded_caches_plateau_over_a_week_of_traffic(clock):
+    """A simulated week of multi-tenant lookups stays within the entry bound, retains
+    under 75% of the unbounded caches' memory and still hits on profiles."""
+    # The old caches: two process-wide dicts, no session scoping, no expiry.
+    legacy = EntityCacheRegistry(
+        max_sessions=1,
+        max_entries=10**9,
+        ttls={"type": float("inf"), "profile": float("inf")},
+        clock=clock,
+    )
+    bounded = EntityCacheRegistry(
+        max_sessions=8,
+        max_entries=500,
+        ttls={"type": 86400, "profile": 600},
+        clock=clock,
+    )
+
+    with (
+        patch.object(entity_module, "_entity_caches", legacy),
+        patch.object(entity_module, "get_request_token", lambda: None),
+    ):
+        lookups, legacy_bytes = _simulate_week(clock, random.Random(1))
+    with patch.object(entity_module, "_entity_caches", bounded):
+        _, bounded_bytes = _simulate_week(clock, random.Random(1))
+
+    def entries(registry: EntityCacheRegistry) -> int:
+        return sum(f["entries"] for f in registry.describe()["fields"].values())
+
+    profile = bounded.describe()["fields"]["profile"]
+    print(
+        f"\nweek of traffic ({lookups} lookups, {len(TENANTS)} tenants): "
+        f"unbounded {entries(legacy)} entries / {legacy_bytes / 1024:.0f} KiB, "
+        f"bounded {entries(bounded)} entries / {bounded_bytes / 1024:.0f} KiB, "
+        f"profile hit rate {profile['hit_rate']}"
+    )
+    assert entries(bounded) <= len(TENANTS) * 2 * 500
+    # The legacy dicts keep growing with every new chat; the bounded caches plateau.
+    assert bounded_bytes < legacy_bytes * 0.75
+    assert profile["hit_rate"] > 0.3
@@ -0,0 +1,220 @@
+"""Persistent per-session entity index: write-behind recording, lazy loading and
+cold-start resolution without hedged lookups or contacts.search."""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from telethon.tl import types
+
+from src.client import connection
+from src.config.server_config import get_config
+from src.tools.contacts import search_contacts_native
+from src.utils import entity as entity_module
+from src.utils.entity import get_entity_by_id
+from src.utils.entity_index import EntityIndexRegistry, IndexedPeer, write_index
+
+CHANNEL = types.Channel(
+    id=1234567890,
+    title="News",
+    photo=types.ChatPhotoEmpty(),
+    date=None,
+    access_hash=42,
+    username="News",
+)
+INDEXED = IndexedPeer(
+    id=-1001234567890,
+    access_hash=42,
+    username="news",
+    phone=None,
+    type="channel",
+    title="News",
+)
+
+
+@pytest.fixture
+def registry(tmp_path):
+    registry = EntityIndexRegistry(tmp_path, max_sessions=4)
+    with patch.object(entity_module, "entity_indexes", registry):
+        yield registry
+
+
+@pytest.fixture
+def resolution_paths():
+    with patch.dict(
+        entity_module._resolution_paths,
+        dict.fromkeys(entity_module._resolution_paths, 0),
+    ):
+        yield entity_module._resolution_paths
+
+
+@pytest.fixture
+def client(fake_telegram_client):
+    """Cold client: empty session entity table, typed fetches only."""
+
+    async def unexpected_rpc(request):
+        raise AssertionError("unexpected RPC")
+
+    async def get_entity(peer):
+        if isinstance(peer, types.InputPeerChannel | types.PeerChannel):
+            return CHANNEL
+        raise ValueError("not found")
+
+    return fake_telegram_client(unexpected_rpc, get_entity=get_entity)
+
+
+@pytest.mark.asyncio
+async def test_recorded_peers_are_written_behind_and_loaded_lazily(tmp_path):
+    (tmp_path / "alice.session").touch()
+    writer = EntityIndexRegistry(tmp_path, max_sessions=4)
+    writer.index("alice").put(INDEXED)
+    writer.index("alice").put(INDEXED)  # Unchanged peers are not rewritten
+    assert not writer.path("alice").exists()
+
+    assert await writer.flush() == 1
+    assert await writer.flush() == 0
+
+    reader = EntityIndexRegistry(tmp_path, max_sessions=4)
+    assert not reader.index("alice").loaded
+    index = await reader.loaded("alice")
+    assert index.get("@NEWS") == INDEXED
+    assert index.get(-1001234567890) == INDEXED
+    assert (await reader.loaded("bob")).get("news") is None
+
+
+@pytest.mark.asyncio
+async def test_renamed_username_replaces_its_alias(tmp_path):
+    (tmp_path / "alice.session").touch()
+    registry = EntityIndexRegistry(tmp_path, max_sessions=4)
+    index = registry.index("alice")
+    index.put(INDEXED)
+    renamed = IndexedPeer(**{**INDEXED.__dict__, "username": "daily"})
+    index.put(renamed)
+
+    assert index.get("news") is None
+    assert index.get("daily") == renamed
+    await registry.flush()
+    reloaded = await EntityIndexRegistry(tmp_path, max_sessions=4).loaded("alice")
+    assert reloaded.get("news") is None
+    assert reloaded.get("daily") == renamed
+
+
+@pytest.mark.asyncio
+async def test_resolved_entities_are_recorded_in_the_index(registry, client):
+
+    assert await get_entity_by_id(-1001234567890, client=client) is CHANNEL
+
+    index = registry.index(get_config().session_name)
+    assert index.get("news") == INDEXED
+    assert index.dirty_count == 1
+
+
+@pytest.mark.asyncio
+async def test_cold_start_resolves_username_from_the_index(
+    registry, resolution_paths, client
+):
+    registry.path(get_config().session_name).with_suffix(".session").touch()
+    registry.index(get_config().session_name).put(INDEXED)
+    await registry.flush()
+    registry.clear()  # Process restart: only the file remains
+
+    assert await get_entity_by_id("@news", client=client) is CHANNEL
+
+    assert client.lookups == [types.InputPeerChannel(1234567890, 42)]
+    assert resolution_paths["index"] == 1
+    assert resolution_paths["hedged"] == 0
+
+
+@pytest.mark.asyncio
+async def test_find_chats_answers_indexed_username_without_search(registry, client):
+    registry.index(get_config().session_name).put(INDEXED)
+
+    with patch("src.utils.entity.get_connected_client", AsyncMock(return_value=client)):
+        results = [c async for c in search_contacts_native("@news")]
+        filtered = [
+            c async for c in search_contacts_native("@news", chat_type="private")
+        ]
+
+    assert [r["title"] for r in results] == ["News"]
+    assert filtered == []
+    client.assert_not_called()  # No contacts.search
+
+
+@pytest.mark.asyncio
+async def test_deleted_session_index_is_not_rewritten(tmp_path):
+    registry = EntityIndexRegistry(tmp_path, max_sessions=1)
+    (tmp_path / "alice.session").touch()
+    registry.index("alice").put(INDEXED)
+    await registry.flush()
+    registry.index("alice").put(IndexedPeer(**{**INDEXED.__dict__, "title": "Daily"}))
+    registry.index("bob")  # Evicts alice with an unwritten row
+
+    with (
+        patch.object(connection, "SESSION_DIR", tmp_path),
+        patch.object(get_config(), "session_dir", str(tmp_path)),
+        patch.object(connection, "entity_indexes", registry),
+    ):
+        await connection.forget_session("alice", "deleted")
+
+    assert registry.describe()["unwritten"] == 0
+    assert not (tmp_path / "alice.session").exists()
+    assert not registry.path("alice").exists()
+    assert await registry.flush() == 0
+    assert not registry.path("alice").exists()
+
+
+def test_index_of_a_session_without_session_file_is_not_written(tmp_path):
+    assert write_index(tmp_path / "gone.index", [INDEXED]) == 0
+    assert not (tmp_path / "gone.index").exists()
+
+
+@pytest.fixture
+def network_client(fake_telegram_client):
+    """Client whose fetch of the indexed input peer returns or raises indexed_fetch;
+    resolving the username over the network finds CHANNEL."""
+
+    def make(indexed_fetch) -> MagicMock:
+        async def get_entity(peer):
+            if peer == "@news":
+                return CHANNEL
+            if isinstance(indexed_fetch, Exception):
+                raise indexed_fetch
+            return indexed_fetch
+
+        return fake_telegram_client(get_entity=get_entity)
+
+    return make
+
+
+@pytest.mark.asyncio
+async def test_stale_access_hash_falls_back_to_network(
+    registry, resolution_paths, network_client
+):
+    registry.index(get_config().session_name).put(INDEXED)
+    client = network_client(ValueError("CHANNEL_INVALID"))
+
+    assert await get_entity_by_id("@news", client=client) is CHANNEL
+
+    assert client.lookups == [types.InputPeerChannel(1234567890, 42), "@news"]
+    assert resolution_paths["failed"] == 0
+
+
+@pytest.mark.asyncio
+async def test_moved_username_is_not_trusted_and_its_alias_is_dropped(
+    registry, client, network_client
+):
+    index = registry.index(get_config().session_name)
+    index.put(IndexedPeer(**{**INDEXED.__dict__, "id": -1000000000777}))
+    old_owner = types.Channel(
+        id=777,
+        title="Old owner",
+        photo=types.ChatPhotoEmpty(),
+        date=None,
+        access_hash=42,
+        username="renamed",
+    )
+
+    entity = await get_entity_by_id("@news", client=network_client(old_owner))
+
+    assert entity is CHANNEL
+    assert index.get("news") == INDEXED
+    assert index.get("renamed").id == -1000000000777
@@ -0,0 +1,333 @@
+"""Offline-first peer resolution in get_entity_by_id: hedged network fallback,
+the negative cache of failed lookups and batched resolution in resolve_many."""
+
+import asyncio
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from telethon import errors as tg_errors
+from telethon.tl import functions, types
+
+from src.utils import entity as entity_module
+from src.utils.entity import get_entity_by_id, resolve_many
+from src.utils.entity_cache import EntityCacheRegistry
+from src.utils.message_format import prefetch_message_entities
+
+CHANNEL = types.Channel(
+    id=1234567890,
+    title="News",
+    photo=types.ChatPhotoEmpty(),
+    date=None,
+    access_hash=42,
+)
+
+
+@pytest.fixture(autouse=True)
+def resolution_paths():
+    with patch.dict(
+        entity_module._resolution_paths,
+        dict.fromkeys(entity_module._resolution_paths, 0),
+    ):
+        yield entity_module._resolution_paths
+
+
+@pytest.mark.asyncio
+async def test_session_entity_table_resolves_type_without_guessing(
+    resolution_paths, fake_telegram_client
+):
+    async def lookup(peer):
+        assert isinstance(peer, types.InputPeerChannel)
+        return CHANNEL
+
+    client = fake_telegram_client(get_entity=lookup)
+    client.session._entities = {(-1001234567890, 42, "news", None, "News")}
+
+    assert await get_entity_by_id(-1001234567890, client=client) is CHANNEL
+    assert await get_entity_by_id("-1001234567890", client=client) is CHANNEL
+
+    assert len(client.lookups) == 1
+    assert resolution_paths["session"] == 1
+    assert resolution_paths["cache"] == 1
+
+
+@pytest.mark.asyncio
+async def test_marked_channel_id_asks_only_for_a_channel(
+    resolution_paths, fake_telegram_client
+):
+    async def lookup(peer):
+        return CHANNEL
+
+    client = fake_telegram_client(get_entity=lookup)
+
+    assert await get_entity_by_id(-1001234567890, client=client) is CHANNEL
+    assert client.lookups == [types.PeerChannel(1234567890)]
+    assert resolution_paths["inferred"] == 1
+    # Also cached under the resolved entity's marked id.
+    assert await get_entity_by_id("-1001234567890", client=client) is CHANNEL
+    assert len(client.lookups) == 1
+
+
+@pytest.mark.asyncio
+async def test_bare_id_is_hedged_and_first_resolving_candidate_wins(
+    resolution_paths, fake_telegram_client
+):
+    cancelled = []
+
+    async def lookup(peer):
+        if isinstance(peer, types.PeerChannel):
+            await asyncio.sleep(0.01)
+            return CHANNEL
+        try:
+            # The user lookup fails after the channel's succeeds; the chat's is slow
+            await asyncio.sleep(0.02 if isinstance(peer, types.PeerUser) else 1)
+        except asyncio.CancelledError:
+            cancelled.append(type(peer).__name__)
+            raise
+        raise ValueError("not found")
+
+    client = fake_telegram_client(get_entity=lookup)
+
+    started = time.perf_counter()
+    assert await get_entity_by_id(1234567890, client=client) is CHANNEL
+    assert time.perf_counter() - started < 0.5
+
+    await asyncio.sleep(0)
+    assert cancelled == ["PeerChat"]
+    assert resolution_paths["hedged"] == 1
+
+
+@pytest.mark.asyncio
+async def test_ambiguous_id_prefers_the_user_whichever_answers_first(
+    fake_telegram_client,
+):
+    user = types.User(id=1234567890, access_hash=1, first_name="Alice")
+
+    async def lookup(peer):
+        if isinstance(peer, types.PeerUser):
+            await asyncio.sleep(0.02)
+            return user
+        if isinstance(peer, types.PeerChannel):
+            return CHANNEL  # Answers first
+        await asyncio.sleep(1)
+        raise ValueError("not found")
+
+    client = fake_telegram_client(get_entity=lookup)
+
+    assert await get_entity_by_id(1234567890, client=client) is user
+
+
+@pytest.mark.asyncio
+async def test_large_bare_id_can_only_be_a_user(fake_telegram_client):
+    async def lookup(peer):
+        raise ValueError("not found")
+
+    client = fake_telegram_client(get_entity=lookup)
+
+    assert await get_entity_by_id(5_000_000_000_000, client=client) is None
+    assert client.lookups == [types.PeerUser(5_000_000_000_000)]
+    assert entity_module.get_entity_cache_stats()["resolution_paths"]["failed"] == 1
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    clock = FakeClock()
+    registry = EntityCacheRegistry(
+        max_sessions=2,
+        max_entries=100,
+        ttls={"type": 600, "profile": 600, "entity": 600},
+        clock=clock,
+        negative=(30, 900),
+    )
+    with patch.object(entity_module, "_entity_caches", registry):
+        yield clock
+
+
+async def _missing(peer):
+    raise tg_errors.UsernameNotOccupiedError(request=None)
+
+
+@pytest.mark.asyncio
+async def test_failed_username_is_refused_with_doubling_window(
+    clock, resolution_paths, fake_telegram_client
+):
+    client = fake_telegram_client(get_entity=_missing)
+
+    assert await get_entity_by_id("@stale_name", client=client) is None
+    clock.now = 29
+    assert await get_entity_by_id("stale_name", client=client) is None
+    assert len(client.lookups) == 1
+    assert resolution_paths["negative"] == 1
+
+    clock.now = 30
+    assert await get_entity_by_id("stale_name", client=client) is None
+    assert len(client.lookups) == 2
+    clock.now = 89  # Second failure blocks for 60s
+    assert await get_entity_by_id("stale_name", client=client) is None
+    assert len(client.lookups) == 2
+
+
+@pytest.mark.asyncio
+async def test_transport_errors_are_not_negative_cached(clock, fake_telegram_client):
+    async def offline(peer):
+        raise ConnectionError("network down")
+
+    client = fake_telegram_client(get_entity=offline)
+
+    await get_entity_by_id("news", client=client)
+    await get_entity_by_id("news", client=client)
+
+    assert len(client.lookups) == 2
+
+
+@pytest.mark.asyncio
+async def test_flood_waits_and_server_errors_are_not_negative_cached(
+    clock, fake_telegram_client
+):
+    errors = [
+        tg_errors.FloodWaitError(request=None, capture=5),
+        tg_errors.RpcCallFailError(request=None),
+    ]
+
+    async def throttled(peer):
+        raise errors.pop(0)
+
+    client = fake_telegram_client(get_entity=throttled)
+
+    assert await get_entity_by_id("news", client=client) is None
+    assert await get_entity_by_id("news", client=client) is None
+
+    assert len(client.lookups) == 2
+    negative = entity_module.get_entity_cache_stats()["fields"]["negative"]
+    assert negative["entries"] == 0
+
+
+@pytest.mark.asyncio
+async def test_update_mentioning_peer_clears_negative_entry(
+    clock, fake_telegram_client
+):
+    state = {"exists": False}
+
+    async def lookup(peer):
+        if not state["exists"]:
+            raise ValueError("Could not find the input entity")
+        return CHANNEL
+
+    client = fake_telegram_client(get_entity=lookup)
+    assert await get_entity_by_id(-1001234567890, client=client) is None
+    assert await get_entity_by_id(-1001234567890, client=client) is None
+    assert len(client.lookups) == 1
+
+    # The account joins the channel; Telethon dispatches an update carrying it.
+    handler = client.add_event_handler.call_args.args[0]
+    update = MagicMock(_entities={-1001234567890: CHANNEL})
+    await handler(update)
+    state["exists"] = True
+
+    assert await get_entity_by_id(-1001234567890, client=client) is CHANNEL
+    negative = entity_module.get_entity_cache_stats()["fields"]["negative"]
+    assert negative["clears"] == 1
+    assert negative["refusals"] == 1
+
+
+@pytest.fixture
+def batch_client(fake_telegram_client):
+    """Client serving users.getUsers / channels.getChannels / messages.getChats."""
+
+    def make(users: list[types.User], channels: list[types.Channel] = ()):
+        by_id = {u.id: u for u in users} | {c.id: c for c in channels}
+
+        async def call(request):
+            if isinstance(request, functions.users.GetUsersRequest):
+                return [
+                    by_id.get(u.user_id, types.UserEmpty(u.user_id)) for u in request.id
+                ]
+            if isinstance(request, functions.channels.GetChannelsRequest):
+                chats = [by_id[c.channel_id] for c in request.id]
+            else:
+                chats = [
+                    types.Chat(
+                        id=i,
+                        title="Group",
+                        photo=types.ChatPhotoEmpty(),
+                        participants_count=3,
+                        date=None,
+                        version=1,
+                    )
+                    for i in request.id
+                ]
+            return types.messages.Chats(chats=chats)
+
+        client = fake_telegram_client(call, get_entity=_missing)
+        client.session.process_entities(
+            types.contacts.ResolvedPeer(peer=None, chats=list(channels), users=users)
+        )
+        return client
+
+    return make
+
+
+def _users(count: int) -> list[types.User]:
+    return [
+        types.User(id=1000 + i, access_hash=i, first_name=f"U{i}") for i in range(count)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_page_of_messages_resolves_senders_in_one_request(
+    resolution_paths, batch_client
+):
+    users = _users(30)
+    client = batch_client(users)
+    messages = [MagicMock(sender_id=users[i % 30].id, fwd_from=None) for i in range(50)]
+
+    await prefetch_message_entities(client, messages)
+
+    assert len(client.requests) == 1
+    assert client.lookups == []
+    assert resolution_paths["batched"] == 30
+    # build_message_result's per-message lookups are now cache hits.
+    for message in messages:
+        await get_entity_by_id(message.sender_id, client=client)
+    assert len(client.requests) == 1
+    assert resolution_paths["cache"] == 50
+
+
+@pytest.mark.asyncio
+async def test_peer_types_are_batched_separately_and_chunked(batch_client):
+    users = _users(250)
+    client = batch_client(users, [CHANNEL])
+    peers = [u.id for u in users] + [types.PeerChannel(CHANNEL.id), -77]
+
+    resolved = await resolve_many(peers, client=client)
+
+    assert len(resolved) == 252
+    assert resolved[-1001234567890] is CHANNEL
+    assert resolved[-77].id == 77
+    kinds = sorted(type(r).__name__ for r in client.requests)
+    assert kinds == ["GetChannelsRequest", "GetChatsRequest", *["GetUsersRequest"] * 3]
+
+
+@pytest.mark.asyncio
+async def test_peers_a_batch_cannot_fetch_fall_back_to_single_lookups(
+    clock, batch_client
+):
+    client = batch_client(_users(1))
+    # Not in the session: no access hash to batch with.
+    unknown = types.PeerUser(5_000_000_000_000)
+
+    resolved = await resolve_many([1000, unknown, 1000], client=client)
+
+    assert list(resolved) == [1000]
+    assert client.lookups == [unknown]
+    # The miss is negative-cached like any single lookup.
+    await resolve_many([unknown], client=client)
+    assert len(client.lookups) == 1
@@ -0,0 +1,135 @@
+"""Folder (dialog filter) cache: patched from the session's folder updates and
+refreshed in the background, so only the first call waits for the RPC."""
+
+import asyncio
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from telethon.tl import types
+
+from src.client import connection as conn
+from src.client.session_pool import SessionPool
+from src.utils.entity import _FOLDER_LIST_CACHE, _folder_fetches, get_dialog_filters
+
+# conftest's test_server fixture swaps the module attribute for an AsyncMock
+_get_client_by_token = conn._get_client_by_token
+
+RPC_SECONDS = 0.05
+
+
+def _folder(folder_id: int, title: str) -> types.DialogFilter:
+    return types.DialogFilter(
+        id=folder_id,
+        title=types.TextWithEntities(text=title, entities=[]),
+        pinned_peers=[],
+        include_peers=[],
+        exclude_peers=[],
+        groups=True,
+    )
+
+
+@pytest.fixture
+def folders_client(fake_telegram_client):
+    """Client whose messages.getDialogFilters returns ``client.folders``."""
+
+    def make(folders: list) -> MagicMock:
+        async def answer(request):
+            return types.messages.DialogFilters(filters=list(client.folders))
+
+        client = fake_telegram_client(answer, rpc_seconds=RPC_SECONDS)
+        client.session = MagicMock(session_id="folders")
+        client.folders = folders
+        return client
+
+    return make
+
+
+def _handler(client):
+    return client.add_event_handler.call_args.args[0]
+
+
+def _titles(folders: list[dict]) -> list[str | None]:
+    return [f["title"] for f in folders]
+
+
+@pytest.mark.asyncio
+async def test_folder_updates_patch_the_cached_list(folders_client):
+    client = folders_client(
+        [types.DialogFilterDefault(), _folder(2, "Work"), _folder(3, "Home")]
+    )
+    assert _titles(await get_dialog_filters(client)) == [None, "Work", "Home"]
+    on_update = _handler(client)
+
+    await on_update(types.UpdateDialogFilter(id=2, filter=_folder(2, "Projects")))
+    await on_update(types.UpdateDialogFilter(id=4, filter=_folder(4, "News")))
+    await on_update(types.UpdateDialogFilter(id=3))  # Deleted
+    await on_update(types.UpdateDialogFilterOrder(order=[4, 0, 2]))
+
+    assert _titles(await get_dialog_filters(client)) == ["News", None, "Projects"]
+    assert len(client.requests) == 1
+
+
+@pytest.mark.asyncio
+async def test_filters_update_refetches_while_serving_the_old_list(folders_client):
+    client = folders_client([_folder(2, "Work")])
+    await get_dialog_filters(client)
+    client.folders = [_folder(2, "Work"), _folder(5, "Shared")]
+
+    await _handler(client)(types.UpdateDialogFilters())
+    assert _titles(await get_dialog_filters(client)) == ["Work"]
+
+    await asyncio.gather(*_folder_fetches.values())
+    assert _titles(await get_dialog_filters(client)) == ["Work", "Shared"]
+    assert len(client.requests) == 2
+
+
+@pytest.mark.asyncio
+async def test_old_list_is_served_while_refreshing_in_the_background(folders_client):
+    client = folders_client([_folder(2, "Work")])
+    await get_dialog_filters(client)
+    filters, _ = _FOLDER_LIST_CACHE["folders"]
+    _FOLDER_LIST_CACHE["folders"] = (filters, time.time() - 301)
+    client.folders = [_folder(2, "Renamed")]
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(get_dialog_filters(client) for _ in range(3)))
+    assert time.perf_counter() - started < RPC_SECONDS
+    assert all(_titles(r) == ["Work"] for r in results)
+
+    await asyncio.gather(*_folder_fetches.values())
+    assert _titles(await get_dialog_filters(client)) == ["Renamed"]
+    assert len(client.requests) == 2
+
+
+@pytest.mark.asyncio
+async def test_concurrent_cold_calls_share_one_fetch(folders_client):
+    client = folders_client([_folder(2, "Work")])
+
+    results = await asyncio.gather(*(get_dialog_filters(client) for _ in range(3)))
+
+    assert all(_titles(r) == ["Work"] for r in results)
+    assert len(client.requests) == 1
+
+
+@pytest.mark.asyncio
+async def test_prewarmed_session_serves_folders_without_waiting(folders_client):
+    client = folders_client([_folder(2, "Work")])
+
+    async def build(session_path, token):
+        return client
+
+    with (
+        patch.object(conn, "_session_cache", SessionPool(capacity=5)),
+        patch.object(conn, "_get_client_by_token", _get_client_by_token),
+        patch.object(conn, "_build_telegram_client_for_token", build),
+    ):
+        await conn.prewarm_sessions(
+            ["tok"], concurrency=1, after_connect=get_dialog_filters
+        )
+    conn._pending_connects.clear()
+
+    started = time.perf_counter()
+    assert _titles(await get_dialog_filters(client)) == ["Work"]
+    assert time.perf_counter() - started < RPC_SECONDS
+    assert len(client.requests) == 1
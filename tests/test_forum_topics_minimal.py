@@ -157,14 +157,17 @@ async def test_get_chat_info_returns_topics_for_forum_chat():
             "src.tools.contacts.get_entity_by_id", new=AsyncMock(return_value=entity)
         ),
         patch(
-            "src.tools.contacts.build_entity_dict_enriched",
+            "src.tools.contacts.enrich_entity_dict",
             new=AsyncMock(
-                return_value={
-                    "id": 999,
-                    "title": "Forum Chat",
-                    "type": "group",
-                    "is_forum": True,
-                }
+                return_value=(
+                    {
+                        "id": 999,
+                        "title": "Forum Chat",
+                        "type": "group",
+                        "is_forum": True,
+                    },
+                    True,
+                )
             ),
         ),
         patch(
@@ -193,9 +196,9 @@ async def test_get_chat_info_skips_topics_for_non_forum_chat():
             "src.tools.contacts.get_entity_by_id", new=AsyncMock(return_value=entity)
         ),
         patch(
-            "src.tools.contacts.build_entity_dict_enriched",
+            "src.tools.contacts.enrich_entity_dict",
             new=AsyncMock(
-                return_value={"id": 1000, "title": "Regular", "type": "group"}
+                return_value=({"id": 1000, "title": "Regular", "type": "group"}, True)
             ),
         ),
         patch(
@@ -620,9 +623,12 @@ async def test_get_chat_info_forum_topics_failure_is_non_fatal():
             new=AsyncMock(return_value=entity),
         ),
         patch(
-            "src.tools.contacts.build_entity_dict_enriched",
+            "src.tools.contacts.enrich_entity_dict",
             new=AsyncMock(
-                return_value={"id": 999, "title": "Forum Chat", "is_forum": True}
+                return_value=(
+                    {"id": 999, "title": "Forum Chat", "is_forum": True},
+                    True,
+                )
             ),
         ),
         patch(
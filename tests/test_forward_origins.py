@@ -0,0 +1,127 @@
+"""Forward origins: resolved once per page in batched requests, cached per session,
+read from the entities attached to the message, and named by from_name when the
+original sender hides their account."""
+
+from datetime import UTC, datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from telethon.tl import functions, types
+
+from src.utils.entity import _extract_forward_info
+from src.utils.message_format import build_message_results_batch
+
+DATE = datetime(2024, 6, 1, tzinfo=UTC)
+
+ORIGINS = [
+    types.Channel(
+        id=9000 + i,
+        title=f"Origin {i}",
+        photo=types.ChatPhotoEmpty(),
+        date=DATE,
+        access_hash=i,
+        broadcast=True,
+    )
+    for i in range(3)
+]
+CHAT = types.Channel(
+    id=5000,
+    title="Reposts",
+    photo=types.ChatPhotoEmpty(),
+    date=DATE,
+    access_hash=1,
+    broadcast=True,
+)
+
+
+def _message(i: int, fwd_from: types.MessageFwdHeader, entities=None):
+    message = types.Message(
+        id=i,
+        peer_id=types.PeerChannel(CHAT.id),
+        date=DATE,
+        message=f"repost {i}",
+        fwd_from=fwd_from,
+    )
+    message._finish_init(
+        MagicMock(_self_id=1, _mb_entity_cache=None), entities or {}, None
+    )
+    return message
+
+
+def _repost(i: int, origin: types.Channel):
+    peer = types.PeerChannel(origin.id)
+    return _message(
+        i,
+        types.MessageFwdHeader(
+            date=DATE, from_id=peer, saved_from_peer=peer, saved_from_msg_id=i
+        ),
+    )
+
+
+def _page(start: int, count: int = 50):
+    """Reposts from the same three channels, as a heavily re-posting channel has."""
+    return [_repost(i, ORIGINS[i % 3]) for i in range(start, start + count)]
+
+
+@pytest.fixture
+def client(fake_telegram_client):
+    async def get_channels(request):
+        assert isinstance(request, functions.channels.GetChannelsRequest)
+        by_id = {c.id: c for c in ORIGINS}
+        return types.messages.Chats(chats=[by_id[c.channel_id] for c in request.id])
+
+    async def per_origin_lookup(peer):
+        raise AssertionError("per-origin lookup")
+
+    client = fake_telegram_client(get_channels, get_entity=per_origin_lookup)
+    client.session.process_entities(
+        types.contacts.ResolvedPeer(peer=None, chats=ORIGINS, users=[])
+    )
+    with patch("src.utils.entity.get_connected_client", AsyncMock(return_value=client)):
+        yield client
+
+
+@pytest.mark.asyncio
+async def test_origins_are_resolved_once_per_page_and_cached_per_session(client):
+    first = await build_message_results_batch(client, _page(1), CHAT)
+    second = await build_message_results_batch(client, _page(51), CHAT)
+
+    assert len(client.requests) == 1
+    assert len(client.requests[0].id) == 3
+    for result in [*first, *second]:
+        forwarded = result["forwarded_from"]
+        assert forwarded["sender"] == forwarded["chat"]
+    assert [r["forwarded_from"]["chat"]["title"] for r in first[:3]] == [
+        "Origin 1",
+        "Origin 2",
+        "Origin 0",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_hidden_sender_is_named_by_from_name(client):
+    hidden = _message(
+        1, types.MessageFwdHeader(date=DATE, from_name="Anonymous Reader")
+    )
+
+    [result] = await build_message_results_batch(client, [hidden], CHAT)
+
+    sender = result["forwarded_from"]["sender"]
+    assert sender["id"] is None
+    assert sender["title"] == "Anonymous Reader"
+    assert client.requests == []
+
+
+@pytest.mark.asyncio
+async def test_single_message_reads_the_attached_origin(client):
+    origin = ORIGINS[0]
+    message = _message(
+        1,
+        types.MessageFwdHeader(date=DATE, from_id=types.PeerChannel(origin.id)),
+        entities={-1000000000000 - origin.id: origin},
+    )
+
+    forward_info = await _extract_forward_info(message)
+
+    assert forward_info["sender"]["title"] == "Origin 0"
+    assert client.requests == []
@@ -82,7 +82,7 @@ class TestGetMessagesReadByIds:
             message_ids=[1, 2],
         )
 
-        mock_read.assert_called_once_with("me", [1, 2])
+        mock_read.assert_called_once_with("me", [1, 2], None, None)
         assert isinstance(result, dict)
         assert "messages" in result
         assert "has_more" in result
@@ -118,7 +118,7 @@ class TestGetMessagesReadByIds:
             message_ids=[999],
         )
 
-        mock_read.assert_called_once_with("me", [999])
+        mock_read.assert_called_once_with("me", [999], None, None)
         assert isinstance(result, dict)
         assert "error" in result
         assert result["error"] == "Message not found"
@@ -0,0 +1,101 @@
+"""include_total_count: the chat's message count is fetched concurrently with the
+search, for the already-resolved entity, and cached per session for a short TTL."""
+
+import asyncio
+import time
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from telethon.tl import functions, types
+
+from src.tools.search import _collect_messages_in_chat
+from src.utils import entity as entity_module
+from src.utils.entity_cache import EntityCacheRegistry
+
+RPC_SECONDS = 0.05
+
+CHANNEL = types.Channel(
+    id=777,
+    title="Chat",
+    photo=types.ChatPhotoEmpty(),
+    date=None,
+    access_hash=1,
+    megagroup=True,
+)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    clock = FakeClock()
+    registry = EntityCacheRegistry(
+        max_sessions=2,
+        max_entries=100,
+        ttls={"type": 600, "profile": 600, "entity": 600, "count": 30},
+        clock=clock,
+    )
+    with patch.object(entity_module, "_entity_caches", registry):
+        yield clock
+
+
+@pytest.fixture
+def client(clock, fake_telegram_client):
+    async def get_search_counters(request):
+        counter = types.messages.SearchCounter(
+            filter=types.InputMessagesFilterEmpty(), count=1234
+        )
+        return [counter]
+
+    client = fake_telegram_client(get_search_counters, rpc_seconds=RPC_SECONDS)
+    resolve = AsyncMock(side_effect=AssertionError("entity resolved again"))
+
+    async def search(*args, **kwargs):
+        await asyncio.sleep(RPC_SECONDS)
+        yield {"id": 1, "text": "hello"}
+
+    with (
+        patch("src.tools.search.get_entity_by_id", AsyncMock(return_value=CHANNEL)),
+        patch("src.tools.search._search_chat_messages_generator", search),
+        patch("src.tools.search.transcribe_voice_messages", AsyncMock()),
+        patch("src.utils.entity.get_entity_by_id", resolve),
+        patch("src.utils.entity.get_connected_client", AsyncMock(return_value=client)),
+    ):
+        yield client
+
+
+async def _collect(client) -> int | None:
+    return await _collect_messages_in_chat(
+        client, "777", [], 10, None, None, None, None, 0, True, [], set()
+    )
+
+
+@pytest.mark.asyncio
+async def test_count_is_fetched_while_the_search_runs(client):
+    started = time.perf_counter()
+    assert await _collect(client) == 1234
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 1.8 * RPC_SECONDS
+    assert len(client.requests) == 1
+    request = client.requests[0]
+    assert isinstance(request, functions.messages.GetSearchCountersRequest)
+    assert request.peer is CHANNEL
+
+
+@pytest.mark.asyncio
+async def test_count_is_cached_per_chat_for_its_ttl(client, clock):
+    assert await _collect(client) == 1234
+    clock.now = 29
+    assert await _collect(client) == 1234
+    assert len(client.requests) == 1
+
+    clock.now = 30
+    assert await _collect(client) == 1234
+    assert len(client.requests) == 2
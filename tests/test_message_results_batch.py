@@ -0,0 +1,362 @@
+"""build_message_results_batch: one resolution pass and one ticket mint per page,
+only the lookups the requested ``fields`` need, and normalized output referring
+to one entity table."""
+
+import json
+import time
+from datetime import UTC, datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from telethon.tl import functions, types
+
+from src.config.server_config import set_config
+from src.server_components.attachment_tickets import mint_attachment_tickets
+from src.tools.messages.reading import read_messages_by_ids
+from src.tools.search import search_messages_impl
+from src.utils.entity import _entity_caches
+from src.utils.entity_index import entity_indexes
+from src.utils.helpers import _append_dedup_until_limit
+from src.utils.message_format import (
+    build_message_result,
+    build_message_results_batch,
+    message_fields,
+    project_message_result,
+    referenced_entities,
+)
+
+RPC_SECONDS = 0.002
+DATE = datetime(2024, 6, 1, tzinfo=UTC)
+
+USERS = [
+    types.User(id=100 + i, access_hash=i, first_name=f"User {i}") for i in range(40)
+]
+SOURCES = [
+    types.Channel(
+        id=9000 + i,
+        title=f"Source {i}",
+        photo=types.ChatPhotoEmpty(),
+        date=DATE,
+        access_hash=i,
+        broadcast=True,
+    )
+    for i in range(5)
+]
+CHAT = types.Channel(
+    id=5000,
+    title="Chat",
+    photo=types.ChatPhotoEmpty(),
+    date=DATE,
+    access_hash=1,
+    megagroup=True,
+)
+
+
+def _media(i: int):
+    if i % 3 == 1:
+        return types.MessageMediaPhoto(photo=types.PhotoEmpty(id=i))
+    document = types.Document(
+        id=i,
+        access_hash=i,
+        file_reference=b"",
+        date=DATE,
+        mime_type="application/pdf",
+        size=1024,
+        dc_id=2,
+        attributes=[types.DocumentAttributeFilename(file_name=f"report {i}.pdf")],
+    )
+    return types.MessageMediaDocument(document=document)
+
+
+def _page(count: int = 100, chat: types.Channel = CHAT) -> list[types.Message]:
+    """Messages from 40 senders; every third forwarded, every other with media."""
+    finisher = MagicMock(_self_id=1, _mb_entity_cache=None, parse_mode=None)
+    messages = []
+    for i in range(count):
+        fwd_from = None
+        if i % 3 == 0:
+            fwd_from = types.MessageFwdHeader(
+                date=DATE,
+                from_id=types.PeerUser(USERS[(i + 7) % 40].id),
+                saved_from_peer=types.PeerChannel(SOURCES[i % 5].id),
+            )
+        message = types.Message(
+            id=i + 1,
+            peer_id=types.PeerChannel(chat.id),
+            date=DATE,
+            message=f"message {i}",
+            from_id=types.PeerUser(USERS[i % 40].id),
+            fwd_from=fwd_from,
+            media=_media(i) if i % 2 else None,
+        )
+        # As read from the network with a cold entity cache: nothing attached
+        message._finish_init(finisher, {}, None)
+        messages.append(message)
+    return messages
+
+
+BY_ID = {u.id: u for u in USERS} | {c.id: c for c in SOURCES}
+
+
+async def _get_entity(peer):
+    return BY_ID[getattr(peer, "user_id", None) or peer.channel_id]
+
+
+async def _answer(request):
+    if isinstance(request, functions.users.GetUsersRequest):
+        return [BY_ID[u.user_id] for u in request.id]
+    return types.messages.Chats(chats=[BY_ID[c.channel_id] for c in request.id])
+
+
+def _rpcs(client) -> int:
+    return len(client.requests) + len(client.lookups)
+
+
+@pytest.fixture
+def attachments(http_no_auth_config):
+    """Batch ticket minting, counted."""
+    http_no_auth_config.domain = "files.example.test"
+    set_config(http_no_auth_config)
+    mint = AsyncMock(wraps=mint_attachment_tickets)
+    with patch("src.utils.message_format.mint_attachment_tickets", mint):
+        yield mint
+
+
+@pytest.fixture
+def cold_start(fake_telegram_client):
+    """Returns a fresh client with empty entity caches, also used for lookups.
+
+    Its session knows every peer's access hash; each RPC takes RPC_SECONDS.
+    """
+    connected = AsyncMock()
+
+    def start() -> MagicMock:
+        _entity_caches.clear()
+        entity_indexes.clear()
+        client = fake_telegram_client(
+            _answer, get_entity=_get_entity, rpc_seconds=RPC_SECONDS
+        )
+        client.session.process_entities(
+            types.contacts.ResolvedPeer(peer=None, chats=SOURCES, users=USERS)
+        )
+        connected.return_value = client
+        return client
+
+    with patch("src.utils.entity.get_connected_client", connected):
+        yield start
+
+
+def _without_ticket_ids(results: list[dict]) -> list[dict]:
+    for result in results:
+        if "media" in result:
+            url = result["media"].pop("attachment_download_url")
+            assert url.startswith("https://files.example.test/v1/attachments/")
+    return results
+
+
+@pytest.mark.asyncio
+async def test_batch_matches_per_message_results(attachments, cold_start):
+    messages = _page(30)
+    links = [f"https://t.me/c/5000/{m.id}" for m in messages]
+
+    batch = await build_message_results_batch(
+        cold_start(), messages, CHAT, links, include_chat_entity=True
+    )
+    client = cold_start()
+    single = [
+        await build_message_result(client, m, CHAT, link, include_chat_entity=True)
+        for m, link in zip(messages, links, strict=True)
+    ]
+
+    [minted] = attachments.await_args_list  # One mint for the whole batch
+    assert len(minted.args[1]) == 15  # One ticket per media message
+    assert _without_ticket_ids(batch) == _without_ticket_ids(single)
+    assert batch[0]["forwarded_from"]["chat"]["title"] == "Source 0"
+    assert batch[0]["forwarded_from"]["sender"]["first_name"] == "User 7"
+
+
+@pytest.mark.asyncio
+async def test_batch_resolves_a_page_in_two_rpcs(attachments, cold_start):
+    """A 100-message page built as one batch needs users.getUsers and
+    channels.getChannels instead of 45 get_entity calls, and finishes sooner."""
+    messages = _page()
+
+    client = cold_start()
+    started = time.perf_counter()
+    for message in messages:
+        await build_message_result(client, message, CHAT, None)
+    per_message = time.perf_counter() - started, _rpcs(client)
+
+    client = cold_start()
+    started = time.perf_counter()
+    results = await build_message_results_batch(client, messages, CHAT)
+    batched = time.perf_counter() - started, _rpcs(client)
+
+    print(
+        f"\n100-message page (40 senders, 34 forwards, 50 media): "
+        f"per message {per_message[0] * 1000:.1f} ms / {per_message[1]} RPCs, "
+        f"batch {batched[0] * 1000:.1f} ms / {batched[1]} RPCs"
+    )
+    assert len(results) == 100
+    assert batched[1] == 2  # users.getUsers + channels.getChannels
+    assert per_message[1] == 45  # One get_entity per distinct peer
+    assert batched[0] < per_message[0]
+
+
+PROJECTIONS = [
+    ["id", "date", "text"],
+    ["id", "date", "text", "sender"],
+    ["id", "date", "text", "forwarded_from"],
+    ["id", "date", "text", "media"],
+    None,
+]
+
+
+@pytest.mark.asyncio
+async def test_fields_cost_only_the_rpcs_and_mints_they_need(attachments, cold_start):
+    """Each field projection of a 100-message page pays only for its own lookups
+    and ticket mints, and returns no unselected keys."""
+    messages = _page()
+    costs = {}
+    for fields in PROJECTIONS:
+        client = cold_start()
+        attachments.reset_mock()
+        selected = message_fields(fields)
+        started = time.perf_counter()
+        results = await build_message_results_batch(
+            client, messages, CHAT, fields=selected
+        )
+        elapsed = time.perf_counter() - started
+        label = (
+            "all fields" if fields is None else "+".join(fields[3:]) or "id+date+text"
+        )
+        costs[label] = (_rpcs(client), attachments.await_count)
+        print(
+            f"\n{label:>16}: {elapsed * 1000:6.1f} ms, {_rpcs(client)} RPCs, "
+            f"{attachments.await_count} ticket mints"
+        )
+        if selected is not None:
+            assert all(result.keys() <= selected for result in results)
+
+    assert costs == {
+        "id+date+text": (0, 0),
+        "sender": (1, 0),  # users.getUsers
+        "forwarded_from": (2, 0),  # users.getUsers + channels.getChannels
+        "media": (0, 1),
+        "all fields": (2, 1),
+    }
+
+
+@pytest.mark.asyncio
+async def test_unknown_field_is_rejected():
+    result = await search_messages_impl(chat_id="me", fields=["id", "body"])
+
+    assert result["ok"] is False
+    assert "Unknown message fields: body" in result["error"]
+
+
+@pytest.mark.asyncio
+async def test_read_by_ids_skips_unselected_work(cold_start):
+    messages = _page(4)
+    client = cold_start()
+    client.get_messages = AsyncMock(return_value=messages)
+    transcribe = AsyncMock()
+
+    with (
+        patch(
+            "src.tools.messages.reading.get_connected_client",
+            AsyncMock(return_value=client),
+        ),
+        patch(
+            "src.tools.messages.reading.get_entity_by_id", AsyncMock(return_value=CHAT)
+        ),
+        patch("src.tools.messages.reading.transcribe_voice_messages", transcribe),
+    ):
+        results = await read_messages_by_ids(
+            "5000", [1, 2, 3, 4, 99], message_fields(["text"])
+        )
+
+    assert [r["id"] for r in results[:4]] == [1, 2, 3, 4]
+    assert all(r.keys() == {"id", "text"} for r in results[:4])
+    assert results[4]["error"] == "Message not found or inaccessible"
+    transcribe.assert_not_awaited()
+    assert _rpcs(client) == 0
+
+
+@pytest.mark.asyncio
+async def test_normalized_results_refer_to_one_entity_table(cold_start):
+    messages = _page(30)
+    nested = await build_message_results_batch(
+        cold_start(), messages, CHAT, include_chat_entity=True
+    )
+    table = {}
+    client = cold_start()
+    normalized = await build_message_results_batch(
+        client, messages, CHAT, include_chat_entity=True, entity_table=table
+    )
+
+    assert _rpcs(client) == 2
+    assert len(table) == 32 + 5 + 1  # Senders and forward senders, sources, chat
+    for flat, full in zip(normalized, nested, strict=True):
+        assert "sender" not in flat and "chat" not in flat
+        assert table[str(flat["sender_id"])] == full["sender"]
+        assert table[str(flat["chat_id"])] == full["chat"]
+    forwarded = normalized[0]["forwarded_from"]
+    assert table[str(forwarded["sender_id"])]["first_name"] == "User 7"
+    assert table[str(forwarded["chat_id"])]["title"] == "Source 0"
+    assert referenced_entities(normalized[:1], table).keys() == {
+        str(normalized[0]["sender_id"]),
+        str(normalized[0]["chat_id"]),
+        str(forwarded["sender_id"]),
+        str(forwarded["chat_id"]),
+    }
+
+
+@pytest.mark.asyncio
+async def test_normalized_results_deduplicate_by_chat_id(cold_start):
+    """Same message ids in two chats stay distinct, even when chat is not selected."""
+    other = types.Channel(
+        id=5001, title="Other", photo=types.ChatPhotoEmpty(), date=DATE, access_hash=2
+    )
+    fields = message_fields(["text"])
+    results = await build_message_results_batch(
+        cold_start(),
+        [*_page(3), *_page(3, other)],
+        None,
+        include_chat_entity=True,
+        chats=[CHAT] * 3 + [other] * 3,
+        fields=fields,
+        entity_table={},
+    )
+
+    collected = []
+    _append_dedup_until_limit(collected, set(), results, 10)
+
+    assert len(collected) == 6
+    assert all(
+        project_message_result(r, fields).keys() == {"id", "text"} for r in collected
+    )
+
+
+@pytest.mark.asyncio
+async def test_normalized_page_serializes_smaller_than_nested(cold_start):
+    """A normalized 100-message search page serializes to under 80% of the nested
+    page's size."""
+    messages = _page()
+    sizes = {}
+    for mode in ("nested", "normalized"):
+        table = {} if mode == "normalized" else None
+        results = await build_message_results_batch(
+            cold_start(), messages, CHAT, include_chat_entity=True, entity_table=table
+        )
+        started = time.perf_counter()
+        response = {"messages": results, "has_more": True}
+        if table is not None:
+            response["entities"] = referenced_entities(results, table)
+        sizes[mode] = len(json.dumps(response, ensure_ascii=False))
+        elapsed = time.perf_counter() - started
+        print(
+            f"\n{mode:>10}: {sizes[mode]} bytes, serialized in {elapsed * 1000:.1f} ms"
+        )
+
+    assert sizes["normalized"] < sizes["nested"] * 0.8
@@ -0,0 +1,196 @@
+"""Background reconnect supervisor: fail-fast backoff with retry_after."""
+
+import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+import pytest_asyncio
+
+from src.client import connection as conn
+from src.client.connection import SessionTemporarilyUnavailableError, ensure_connection
+from src.client.session_pool import SessionPool
+from src.server_components.auth import (
+    MAX_RECONNECT_WAIT_SECONDS,
+    reconnect_wait_from_headers,
+)
+from src.utils.error_handling import log_connection_error_response
+
+TOKEN = "tok-reconnect"
+
+
+@pytest.fixture
+def dropped_client(fake_telegram_client):
+    """Client that lost its connection; connecting raises ``connect_error`` if given."""
+
+    def make(connect_error: Exception | None = None) -> MagicMock:
+        client = fake_telegram_client()
+        state = {"connected": False}
+        client.is_connected.side_effect = lambda: state["connected"]
+
+        async def connect():
+            await asyncio.sleep(0.01)
+            if connect_error is not None:
+                raise connect_error
+            state["connected"] = True
+
+        client.connect.side_effect = connect
+        return client
+
+    return make
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def isolated_state():
+    pool = SessionPool(capacity=5)
+    conn._connection_failures.clear()
+    conn._reconnect_supervisors.clear()
+    with (
+        patch.object(conn, "_session_cache", pool),
+        patch.object(conn, "verify_authorized_connection", AsyncMock()),
+    ):
+        yield pool
+    for supervisor in list(conn._reconnect_supervisors.values()):
+        supervisor.task.cancel()
+    conn._connection_failures.clear()
+    conn._reconnect_supervisors.clear()
+
+
+@pytest.mark.asyncio
+async def test_connected_client_returns_without_supervisor(
+    isolated_state, fake_telegram_client
+):
+    client = fake_telegram_client()
+
+    assert await ensure_connection(client, TOKEN) is True
+    assert not conn._reconnect_supervisors
+
+
+@pytest.mark.asyncio
+async def test_failed_reconnect_fails_fast_during_backoff(
+    isolated_state, dropped_client
+):
+    client = dropped_client(connect_error=OSError("network unreachable"))
+    isolated_state[TOKEN] = (client, time.time())
+
+    with pytest.raises(SessionTemporarilyUnavailableError) as first:
+        await ensure_connection(client, TOKEN)
+    assert 1.5 < first.value.retry_after <= 2.0
+    assert conn._connection_failures[TOKEN][0] == 1
+
+    started = time.perf_counter()
+    with pytest.raises(SessionTemporarilyUnavailableError) as second:
+        await ensure_connection(client, TOKEN)
+    assert time.perf_counter() - started < 0.05
+    assert second.value.retry_after > 0
+    # The supervisor keeps owning the retry; no second connect was started.
+    assert client.connect.await_count == 1
+    assert len(conn._reconnect_supervisors) == 1
+
+
+@pytest.mark.asyncio
+async def test_caller_deadline_waits_for_supervised_reconnect(
+    isolated_state, dropped_client
+):
+    client = dropped_client()
+    isolated_state[TOKEN] = (client, time.time())
+    # One earlier failure, backoff (2s) nearly elapsed.
+    conn._connection_failures[TOKEN] = (1, time.time() - 1.9)
+
+    with pytest.raises(SessionTemporarilyUnavailableError):
+        await ensure_connection(client, TOKEN)
+
+    results = await asyncio.gather(
+        *(ensure_connection(client, TOKEN, wait_seconds=1.0) for _ in range(10))
+    )
+
+    assert results == [True] * 10
+    assert client.connect.await_count == 1
+    assert TOKEN not in conn._connection_failures
+
+
+@pytest.mark.asyncio
+async def test_supervisor_of_a_replaced_client_is_replaced(
+    isolated_state, dropped_client
+):
+    old = dropped_client(connect_error=OSError("network unreachable"))
+    isolated_state[TOKEN] = (old, time.time())
+    with pytest.raises(SessionTemporarilyUnavailableError):
+        await ensure_connection(old, TOKEN)
+    stale = conn._reconnect_supervisors[TOKEN]
+    waiter = asyncio.create_task(ensure_connection(old, TOKEN, wait_seconds=5))
+    await asyncio.sleep(0)
+
+    new = dropped_client()
+    isolated_state[TOKEN] = (new, time.time())
+    conn._connection_failures.clear()
+
+    assert await ensure_connection(new, TOKEN) is True
+    assert conn._reconnect_supervisors.get(TOKEN) is not stale
+    assert stale.task.cancelled() or stale.task.done()
+    with pytest.raises(SessionTemporarilyUnavailableError):
+        await waiter
+    new.connect.assert_awaited_once()
+    assert old.connect.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_request_reconnect_wait_bounds_get_connected_client(
+    isolated_state, dropped_client
+):
+    client = dropped_client()
+    isolated_state[TOKEN] = (client, time.time())
+    conn._connection_failures[TOKEN] = (1, time.time() - 1.9)
+    conn.set_request_token(TOKEN)
+
+    with patch.object(conn, "_get_client_by_token", AsyncMock(return_value=client)):
+        with pytest.raises(SessionTemporarilyUnavailableError):
+            await conn.get_connected_client()
+
+        conn.set_request_reconnect_wait(1.0)
+        try:
+            assert await conn.get_connected_client() is client
+        finally:
+            conn.set_request_reconnect_wait(None)
+            conn.set_request_token(None)
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"),
+    [("2.5", 2.5), ("600", MAX_RECONNECT_WAIT_SECONDS), ("0", None), ("soon", None)],
+)
+def test_reconnect_wait_header_is_parsed_and_capped(value, expected):
+    assert reconnect_wait_from_headers({"x-reconnect-wait": value}) == expected
+    assert reconnect_wait_from_headers({}) is None
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_breaker_reports_cooldown(isolated_state, dropped_client):
+    client = dropped_client()
+    conn._connection_failures[TOKEN] = (conn.CIRCUIT_BREAKER_FAILURES, time.time())
+
+    with pytest.raises(SessionTemporarilyUnavailableError) as exc:
+        await ensure_connection(client, TOKEN, wait_seconds=5)
+
+    assert exc.value.retry_after > conn.CIRCUIT_BREAKER_WINDOW_SECONDS - 5
+    client.connect.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_supervisor_never_revives_evicted_client(isolated_state, dropped_client):
+    client = dropped_client()
+
+    with pytest.raises(SessionTemporarilyUnavailableError):
+        await ensure_connection(client, TOKEN)
+
+    client.connect.assert_not_awaited()
+
+
+def test_tool_error_carries_retry_after():
+    error = SessionTemporarilyUnavailableError("Reconnect is backing off", 12.34)
+
+    response = log_connection_error_response("get_messages", None, error)
+
+    assert response["retry_after"] == 12.3
+    assert response["action"] == "RETRY"
+    assert "retry after 12.3s" in response["error"]
@@ -0,0 +1,102 @@
+"""Single-flight coalescing: identical in-flight read-only requests on one
+session's client share one RPC; everything else is sent as usual."""
+
+import asyncio
+
+import pytest
+from telethon import TelegramClient
+from telethon.sessions import MemorySession
+from telethon.tl import functions, types
+
+from src.client.coalescing import CoalescingStats, install_coalescing
+
+RPC_SECONDS = 0.05
+ALLOWLIST = {"ResolveUsernameRequest", "GetFullChannelRequest"}
+
+
+def _client(stats: CoalescingStats, error: Exception | None = None) -> TelegramClient:
+    client = TelegramClient(MemorySession(), 1, "hash")
+    client.sent = []
+
+    async def invoke(sender, request, ordered=False, flood_sleep_threshold=None):
+        client.sent.append(request)
+        await asyncio.sleep(RPC_SECONDS)
+        if error is not None:
+            raise error
+        return f"result for {type(request).__name__}"
+
+    client._call = invoke
+    install_coalescing(client, ALLOWLIST, stats)
+    return client
+
+
+def _resolve(name: str):
+    return functions.contacts.ResolveUsernameRequest(username=name)
+
+
+@pytest.mark.asyncio
+async def test_identical_in_flight_requests_share_one_rpc():
+    stats = CoalescingStats()
+    client = _client(stats)
+
+    results = await asyncio.gather(
+        *(client(_resolve("news")) for _ in range(5)),
+        client(_resolve("other")),
+        client(
+            functions.channels.GetFullChannelRequest(
+                channel=types.InputChannel(channel_id=1, access_hash=2)
+            )
+        ),
+    )
+
+    assert results[:5] == ["result for ResolveUsernameRequest"] * 5
+    assert len(client.sent) == 3
+    assert stats.describe()["coalesced_by_type"] == {"ResolveUsernameRequest": 4}
+    # Completed calls are not reused
+    await client(_resolve("news"))
+    assert len(client.sent) == 4
+
+
+@pytest.mark.asyncio
+async def test_requests_outside_the_allowlist_are_always_sent():
+    client = _client(CoalescingStats())
+    request = functions.messages.GetHistoryRequest(
+        peer=types.InputPeerSelf(),
+        offset_id=0,
+        offset_date=None,
+        add_offset=0,
+        limit=10,
+        max_id=0,
+        min_id=0,
+        hash=0,
+    )
+
+    await asyncio.gather(client(request), client(request))
+
+    assert len(client.sent) == 2
+
+
+@pytest.mark.asyncio
+async def test_sessions_do_not_share_calls():
+    stats = CoalescingStats()
+    first, second = _client(stats), _client(stats)
+
+    await asyncio.gather(first(_resolve("news")), second(_resolve("news")))
+
+    assert len(first.sent) == len(second.sent) == 1
+    assert stats.describe()["coalesced"] == 0
+
+
+@pytest.mark.asyncio
+async def test_failure_reaches_every_caller_and_cancelled_callers_do_not_cancel():
+    client = _client(CoalescingStats(), error=ValueError("No user has 'ghost'"))
+
+    leader = asyncio.create_task(client(_resolve("ghost")))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(client(_resolve("ghost")))
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    with pytest.raises(ValueError, match="ghost"):
+        await follower
+    assert len(client.sent) == 1
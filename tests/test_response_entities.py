@@ -0,0 +1,124 @@
+"""Response-scoped entity maps: senders and chats are read from the users/chats
+vectors of the RPC response instead of being resolved again per message."""
+
+from datetime import UTC, datetime
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from telethon import utils
+from telethon.tl import functions, types
+
+from src.tools.messages.reading import _build_message_results
+from src.tools.search import _search_global_messages_generator
+from src.utils.entity import entity_from_map, message_entities, response_entities
+
+DATE = datetime(2024, 6, 1, tzinfo=UTC)
+
+USERS = [
+    types.User(id=100 + i, access_hash=i, first_name=f"User {i}") for i in range(30)
+]
+CHANNELS = [
+    types.Channel(
+        id=5000 + i,
+        title=f"Channel {i}",
+        photo=types.ChatPhotoEmpty(),
+        date=DATE,
+        access_hash=i,
+        username=f"channel{i}",
+        megagroup=True,
+    )
+    for i in range(5)
+]
+
+
+def _page() -> list[types.Message]:
+    """50 messages from 30 distinct senders across 5 chats."""
+    return [
+        types.Message(
+            id=i + 1,
+            peer_id=types.PeerChannel(CHANNELS[i % 5].id),
+            date=DATE,
+            message=f"message {i}",
+            from_id=types.PeerUser(USERS[i % 30].id),
+        )
+        for i in range(50)
+    ]
+
+
+@pytest.fixture
+def offline_client(fake_telegram_client):
+    """Client that answers only the search RPC itself; any entity lookup fails the test."""
+
+    async def entity_rpc(peer):
+        raise AssertionError("entity RPC")
+
+    def make(response=None) -> MagicMock:
+        async def answer(request):
+            return response
+
+        client = fake_telegram_client(answer, get_entity=entity_rpc)
+        client.get_me = AsyncMock(return_value=MagicMock(premium=False))
+        return client
+
+    return make
+
+
+def test_response_entities_are_keyed_by_marked_id():
+    response = types.messages.Messages(
+        messages=[], topics=[], chats=CHANNELS, users=USERS
+    )
+    entities = response_entities(response)
+
+    assert entity_from_map(entities, 100) is USERS[0]
+    assert entity_from_map(entities, types.PeerChannel(5000)) is CHANNELS[0]
+    assert entity_from_map(entities, utils.get_peer_id(CHANNELS[0])) is CHANNELS[0]
+    assert entity_from_map(entities, 5000) is None
+
+
+@pytest.mark.asyncio
+async def test_global_search_page_needs_no_entity_rpcs(offline_client):
+    response = types.messages.Messages(
+        messages=_page(), topics=[], chats=CHANNELS, users=USERS
+    )
+    client = offline_client(response)
+
+    results = [
+        result
+        async for result in _search_global_messages_generator(
+            client, "message", 50, None, None, None, None, 0
+        )
+    ]
+
+    assert len(results) == 50
+    assert client.call_count == 1  # messages.SearchGlobal only
+    assert isinstance(client.call_args.args[0], functions.messages.SearchGlobalRequest)
+    client.get_entity.assert_not_called()
+    assert results[31]["sender"]["title"] == "User 1"
+    assert results[31]["chat"]["title"] == "Channel 1"
+
+
+@pytest.mark.asyncio
+async def test_read_messages_uses_entities_attached_by_telethon(offline_client):
+    messages = _page()[:10]
+    for message in messages:
+        message.fwd_from = types.MessageFwdHeader(
+            date=DATE, from_id=types.PeerUser(USERS[29].id)
+        )
+    finisher = MagicMock(_self_id=1, _mb_entity_cache=None)
+    entities = response_entities(
+        types.messages.Messages(messages=[], topics=[], chats=CHANNELS, users=USERS)
+    )
+    for message in messages:
+        message._finish_init(finisher, entities, None)
+    assert len(message_entities(messages)) == 16  # 10 senders, 1 origin, 5 chats
+
+    client = offline_client()
+    ids = [m.id for m in messages]
+    results = await _build_message_results(
+        client, messages, ids, CHANNELS[0], {}, {"id": CHANNELS[0].id}
+    )
+
+    assert [r["sender"]["title"] for r in results] == [f"User {i}" for i in range(10)]
+    assert results[0]["forwarded_from"]["sender"]["title"] == "User 29"
+    client.assert_not_called()
+    client.get_entity.assert_not_called()
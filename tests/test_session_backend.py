@@ -0,0 +1,186 @@
+"""Session storage backends: buffered in-memory sessions and batched flushes."""
+
+import sqlite3
+import time
+from unittest.mock import patch
+
+import pytest
+from telethon.crypto import AuthKey
+from telethon.sessions import SQLiteSession
+from telethon.tl import types
+
+from src.client import connection as conn
+from src.client.session_backend import (
+    BufferedMemorySession,
+    load_buffered_session,
+    write_entity_rows,
+)
+from src.client.session_pool import SessionPool
+
+
+def _page(start: int, users: int, channels: int) -> types.messages.Messages:
+    """A response page carrying users/chats vectors, as dialogs and search return."""
+    return types.messages.Messages(
+        messages=[],
+        topics=[],
+        users=[
+            types.User(
+                id=start + i,
+                access_hash=start + i,
+                first_name=f"User {i}",
+                username=f"user{start + i}",
+            )
+            for i in range(users)
+        ],
+        chats=[
+            types.Channel(
+                id=start + users + i,
+                title=f"Channel {i}",
+                photo=types.ChatPhotoEmpty(),
+                date=None,
+                access_hash=start + i,
+            )
+            for i in range(channels)
+        ],
+    )
+
+
+def _session_file(tmp_path, rows=()) -> SQLiteSession:
+    session = SQLiteSession(str(tmp_path / "tok"))
+    session.set_dc(2, "149.154.167.51", 443)
+    session.auth_key = AuthKey(b"\x03" * 256)
+    session._cursor().executemany(
+        "insert into entities values (?,?,?,?,?,?)", [(*r, 0) for r in rows]
+    )
+    session.save()
+    return session
+
+
+def _stored_ids(path) -> set[int]:
+    db = sqlite3.connect(path)
+    try:
+        return {r[0] for r in db.execute("select id from entities")}
+    finally:
+        db.close()
+
+
+def test_buffered_session_tracks_new_rows_until_taken():
+    session = BufferedMemorySession()
+    session.process_entities(_page(1, users=3, channels=2))
+
+    assert session.dirty_row_count == 5
+    assert len(session.take_dirty_rows()) == 5
+    assert session.dirty_row_count == 0
+    assert len(session._entities) == 5
+
+
+def test_load_buffered_session_reads_auth_and_entities(tmp_path):
+    _session_file(tmp_path, rows=[(7, 1, "bob", None, "Bob")]).close()
+
+    session = load_buffered_session(tmp_path / "tok.session")
+
+    assert session.auth_key.key == b"\x03" * 256
+    assert session.get_input_entity(7).user_id == 7
+    assert session.dirty_row_count == 0
+
+
+def test_dc_and_auth_key_changes_are_written_through(tmp_path):
+    _session_file(tmp_path).close()
+    session = load_buffered_session(tmp_path / "tok.session")
+
+    # Telethon's DC switch: set_dc, drop the key, save; later store the new key
+    session.set_dc(4, "149.154.167.91", 443)
+    session.auth_key = None
+    session.save()
+    session.auth_key = AuthKey(b"\x04" * 256)
+    session.save()
+
+    stored = SQLiteSession(str(tmp_path / "tok"))
+    assert (stored.dc_id, stored.server_address) == (4, "149.154.167.91")
+    assert stored.auth_key.key == b"\x04" * 256
+    stored.close()
+
+
+def test_dc_change_of_a_deleted_session_does_not_recreate_it(tmp_path):
+    _session_file(tmp_path).close()
+    session = load_buffered_session(tmp_path / "tok.session")
+    (tmp_path / "tok.session").unlink()
+
+    session.set_dc(4, "149.154.167.91", 443)
+
+    assert session.dc_id == 4
+    assert not (tmp_path / "tok.session").exists()
+
+
+def test_write_entity_rows_never_creates_missing_file(tmp_path):
+    with pytest.raises(sqlite3.OperationalError):
+        write_entity_rows(tmp_path / "deleted.session", [(1, 1, None, None, "x")])
+    assert not (tmp_path / "deleted.session").exists()
+
+
+@pytest.mark.asyncio
+async def test_flush_writes_only_buffered_rows(tmp_path, fake_telegram_client):
+    _session_file(tmp_path).close()
+    session = load_buffered_session(tmp_path / "tok.session")
+    session.process_entities(_page(100, users=4, channels=1))
+    client = fake_telegram_client()
+    client.session = session
+    pool = SessionPool(capacity=5)
+    pool["tok"] = (client, time.time())
+
+    with (
+        patch.object(conn, "_session_cache", pool),
+        patch.object(conn, "SESSION_DIR", tmp_path),
+    ):
+        assert await conn.flush_session_buffers() == 5
+        assert await conn.flush_session_buffers() == 0
+
+    # Four users plus one channel (stored under its marked -100 peer id).
+    assert _stored_ids(tmp_path / "tok.session") == {100, 101, 102, 103, -1000000000104}
+
+
+def test_buffered_session_stores_same_rows_with_less_loop_time_than_sqlite(tmp_path):
+    """Buffering dialog and search pages, then flushing once, leaves the same rows
+    on disk as per-response SQLite writes while spending less event-loop time."""
+    # find_chats over 400 dialogs (4 pages) plus 30 pages of search results,
+    # repeated as a tenant would over a few minutes.
+    pages = [_page(10_000 + p * 100, users=60, channels=40) for p in range(4)]
+    pages += [_page(50_000 + p * 60, users=45, channels=15) for p in range(30)]
+    rounds = 5
+
+    sqlite_dir, memory_dir = tmp_path / "sqlite", tmp_path / "memory"
+    sqlite_dir.mkdir()
+    memory_dir.mkdir()
+
+    sqlite_session = _session_file(sqlite_dir)
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        for page in pages:
+            sqlite_session.process_entities(page)
+        sqlite_session.save()  # Telethon commits from its update loop
+    sqlite_loop = time.perf_counter() - t0
+    sqlite_session.close()
+
+    memory_session = BufferedMemorySession()
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        for page in pages:
+            memory_session.process_entities(page)
+    memory_loop = time.perf_counter() - t0
+    _session_file(memory_dir).close()
+    t0 = time.perf_counter()
+    flushed = write_entity_rows(
+        memory_dir / "tok.session", memory_session.take_dirty_rows()
+    )
+    memory_flush = time.perf_counter() - t0
+
+    print(
+        f"\nentity-heavy workload ({len(pages) * rounds} responses): "
+        f"sqlite on-loop={sqlite_loop * 1000:.1f}ms, "
+        f"memory on-loop={memory_loop * 1000:.1f}ms "
+        f"+ one off-loop flush of {flushed} rows={memory_flush * 1000:.1f}ms"
+    )
+    assert _stored_ids(memory_dir / "tok.session") == _stored_ids(
+        sqlite_dir / "tok.session"
+    )
+    assert memory_loop < sqlite_loop
@@ -0,0 +1,111 @@
+"""Idle/failed session cleanup runs off the locks, with parallel disconnects."""
+
+import asyncio
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+import pytest_asyncio
+
+from src.client import connection as conn
+from src.client.session_pool import SessionPool
+from src.client.warm_sessions import WarmSessionStore
+from src.config.server_config import get_config
+
+_get_client_by_token = conn._get_client_by_token
+
+DISCONNECT_SECONDS = 0.05
+
+
+@pytest.fixture
+def tracked_clients(fake_telegram_client):
+    """Tokens whose clients finished disconnecting, and a factory for such clients.
+
+    Clients have no auth key, so there is nothing to demote to the warm tier.
+    """
+    finished: list[str] = []
+
+    def make(token: str) -> MagicMock:
+        async def disconnect():
+            assert not conn._cache_lock.locked()
+            assert not conn._failure_lock.locked()
+            await asyncio.sleep(DISCONNECT_SECONDS)
+            finished.append(token)
+
+        client = fake_telegram_client()
+        client.disconnect.side_effect = disconnect
+        return client
+
+    return finished, make
+
+
+@pytest_asyncio.fixture
+async def pool(tmp_path):
+    pool = SessionPool(capacity=1000)
+    with (
+        patch.object(conn, "_session_cache", pool),
+        patch.object(conn, "_warm_sessions", WarmSessionStore(10, 3600)),
+        patch.object(conn, "_get_client_by_token", _get_client_by_token),
+        patch.object(conn, "SESSION_DIR", tmp_path),
+        patch.object(get_config(), "session_dir", str(tmp_path)),
+    ):
+        yield pool
+    conn._connection_failures.clear()
+
+
+@pytest.mark.asyncio
+async def test_mass_idle_expiry_does_not_block_tool_calls(
+    pool, tracked_clients, fake_telegram_client
+):
+    """200 expired sessions disconnect in parallel while a concurrent cache hit
+    never waits more than 50ms."""
+    disconnects, tracked_client = tracked_clients
+    expired_at = time.time() - conn.MAX_IDLE_TIME - 1
+    for i in range(200):
+        pool[f"idle-{i}"] = (tracked_client(f"idle-{i}"), expired_at)
+    active = fake_telegram_client()
+    pool["active"] = (active, time.time())
+
+    latencies: list[float] = []
+
+    async def tool_calls():
+        while len(disconnects) < 200:
+            started = time.perf_counter()
+            assert await _get_client_by_token("active") is active
+            latencies.append(time.perf_counter() - started)
+            await asyncio.sleep(0.005)
+
+    started = time.perf_counter()
+    await asyncio.gather(conn.cleanup_idle_sessions(), tool_calls())
+    cleanup_seconds = time.perf_counter() - started
+
+    serial_seconds = 200 * DISCONNECT_SECONDS
+    print(
+        f"\nmass expiry of 200 sessions: cleanup={cleanup_seconds * 1000:.0f}ms "
+        f"(serial ~{serial_seconds * 1000:.0f}ms), {len(latencies)} tool calls, "
+        f"max latency={max(latencies) * 1000:.1f}ms"
+    )
+    assert len(disconnects) == 200
+    assert list(pool) == ["active"]
+    assert cleanup_seconds < serial_seconds / 4
+    assert max(latencies) < 0.05
+
+
+@pytest.mark.asyncio
+async def test_failed_sessions_are_retired_outside_locks(
+    pool, tmp_path, tracked_clients
+):
+    disconnects, tracked_client = tracked_clients
+    stale = time.time() - 7200
+    for token in ("bad-1", "bad-2"):
+        pool[token] = (tracked_client(token), time.time())
+        (tmp_path / f"{token}.session").touch()
+        conn._connection_failures[token] = (10, stale)
+    conn._connection_failures["recent"] = (10, time.time())
+
+    await conn.cleanup_failed_sessions()
+
+    assert sorted(disconnects) == ["bad-1", "bad-2"]
+    assert len(pool) == 0
+    assert not list(tmp_path.glob("bad-*.session"))
+    assert list(conn._connection_failures) == ["recent"]
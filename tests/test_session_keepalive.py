@@ -0,0 +1,162 @@
+"""Keepalive supervisor: jittered pings, RTT tracking and proactive reconnects."""
+
+import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+import pytest_asyncio
+
+from src.client import connection as conn
+from src.client.keepalive import KeepaliveTracker
+from src.client.session_pool import SessionPool
+
+
+def test_due_after_jittered_interval_of_quiet():
+    tracker = KeepaliveTracker(interval_seconds=100, jitter=0.2, rng=lambda: 1.0)
+
+    # rng 1.0 -> factor 1.2: due 120s after the last request.
+    assert not tracker.is_due("a", last_used=1000, now=1119)
+    assert tracker.is_due("a", last_used=1000, now=1120)
+
+    tracker.record_ping("a", rtt_seconds=0.05, now=1120)
+    assert not tracker.is_due("a", last_used=1000, now=1200)
+    assert tracker.is_due("a", last_used=1000, now=1240)
+
+
+def test_jitter_spreads_clients_and_zero_interval_disables():
+    draws = iter([0.0, 0.5, 1.0])
+    tracker = KeepaliveTracker(interval_seconds=100, rng=lambda: next(draws))
+
+    due = [tracker.is_due(t, last_used=0, now=100) for t in ("a", "b", "c")]
+
+    assert due == [True, True, False]
+    assert not KeepaliveTracker(interval_seconds=0).is_due("a", 0, 10**9)
+
+
+def test_rtt_is_smoothed_and_reported():
+    tracker = KeepaliveTracker(interval_seconds=60)
+    tracker.record_ping("token-aaaa", 0.100, now=1)
+    tracker.record_ping("token-aaaa", 0.200, now=2)
+
+    described = tracker.describe()
+
+    client = described["clients"]["token-aa..."]
+    assert client["last_rtt_ms"] == 200.0
+    assert client["avg_rtt_ms"] == 130.0
+    assert client["pings"] == 2
+    assert described["max_rtt_ms"] == 130.0
+
+
+@pytest.fixture
+def pinged_client(fake_telegram_client):
+    """Client whose RPCs take ``ping`` seconds until it reconnects."""
+
+    def make(ping: float = 0.0, connected: bool = True) -> MagicMock:
+        state = {"connected": connected, "ping": ping}
+
+        async def answer(request):
+            await asyncio.sleep(state["ping"])
+            return MagicMock()
+
+        async def connect():
+            state["connected"] = True
+            state["ping"] = 0.0
+
+        async def disconnect():
+            state["connected"] = False
+
+        client = fake_telegram_client(answer)
+        client.is_connected.side_effect = lambda: state["connected"]
+        client.connect.side_effect = connect
+        client.disconnect.side_effect = disconnect
+        client.session.auth_key = b"key"
+        return client
+
+    return make
+
+
+@pytest_asyncio.fixture
+async def resident():
+    pool = SessionPool(capacity=10)
+    tracker = KeepaliveTracker(interval_seconds=60, jitter=0)
+    conn._connection_failures.clear()
+    with (
+        patch.object(conn, "_session_cache", pool),
+        patch.object(conn, "_keepalive", tracker),
+        patch.object(conn, "KEEPALIVE_TIMEOUT_SECONDS", 0.05),
+    ):
+        yield pool, tracker
+    for supervisor in list(conn._reconnect_supervisors.values()):
+        supervisor.task.cancel()
+    conn._reconnect_supervisors.clear()
+    conn._connection_failures.clear()
+
+
+@pytest.mark.asyncio
+async def test_pings_only_idle_clients_and_records_rtt(resident, pinged_client):
+    pool, tracker = resident
+    idle, busy = pinged_client(ping=0.01), pinged_client()
+    pool["idle"] = (idle, time.time() - 120)
+    pool["busy"] = (busy, time.time())
+
+    result = await conn.keepalive_sessions()
+
+    assert result == {"checked": 1, "ok": 1, "reconnected": 0, "failed": 0}
+    busy.assert_not_called()
+    assert tracker.describe()["clients"]["idle..."]["last_rtt_ms"] >= 10
+    # A ping is not use: the idle timestamp is unchanged for idle cleanup.
+    assert time.time() - pool["idle"][1] >= 120
+
+
+@pytest.mark.asyncio
+async def test_half_open_client_is_reconnected_before_next_request(
+    resident, pinged_client
+):
+    pool, tracker = resident
+    # Socket looks connected but nothing answers until it is reconnected.
+    client = pinged_client(ping=10)
+    pool["stale"] = (client, time.time() - 120)
+
+    result = await conn.keepalive_sessions()
+
+    assert result["reconnected"] == 1
+    client.disconnect.assert_awaited_once()
+    client.connect.assert_awaited_once()
+    assert tracker.half_open_detected == 1
+    assert tracker.proactive_reconnects == 1
+
+    # The next tool call takes the connected fast path.
+    client.connect.reset_mock()
+    assert await conn.ensure_connection(client, "stale") is True
+    client.connect.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_dropped_client_is_reconnected_and_reported(resident, pinged_client):
+    pool, _tracker = resident
+    client = pinged_client(connected=False)
+    pool["dropped"] = (client, time.time() - 120)
+
+    with patch.object(conn, "verify_authorized_connection", AsyncMock()):
+        result = await conn.keepalive_sessions()
+        stats = await conn.get_session_health_stats()
+
+    assert result["reconnected"] == 1
+    assert client.is_connected()
+    assert stats["keepalive"]["proactive_reconnects"] == 1
+    health = stats["keepalive"]["clients"]["dropped..."]
+    assert health["last_error"] == "disconnected"
+
+
+@pytest.mark.asyncio
+async def test_tokens_already_reconnecting_are_skipped(resident, pinged_client):
+    pool, _tracker = resident
+    client = pinged_client(connected=False)
+    pool["backoff"] = (client, time.time() - 120)
+    conn._reconnect_supervisors["backoff"] = MagicMock()
+
+    result = await conn.keepalive_sessions()
+
+    assert result["checked"] == 0
+    client.connect.assert_not_awaited()
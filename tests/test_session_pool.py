@@ -0,0 +1,151 @@
+"""Session pool eviction policies, pinning, statistics and background disconnects."""
+
+import asyncio
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+import pytest_asyncio
+
+from src.client import connection as conn
+from src.client.session_pool import SessionPool, make_eviction_policy
+
+_get_client_by_token = conn._get_client_by_token
+
+
+def _fill(pool: SessionPool, tokens: list[str], make_client) -> None:
+    for token in tokens:
+        pool[token] = (make_client(), time.time())
+
+
+def test_lru_evicts_least_recently_used(fake_telegram_client):
+    pool = SessionPool(capacity=3, policy="lru")
+    _fill(pool, ["a", "b", "c"], fake_telegram_client)
+    pool.touch("a")
+
+    evicted = pool.evict_for_insert()
+
+    assert [t for t, _, _ in evicted] == ["b"]
+    assert set(pool.keys()) == {"a", "c"}
+    assert pool.stats.evictions == 1
+
+
+def test_lfu_evicts_least_frequently_used_with_lru_tiebreak(fake_telegram_client):
+    pool = SessionPool(capacity=3, policy="lfu")
+    _fill(pool, ["a", "b", "c"], fake_telegram_client)
+    for _ in range(3):
+        pool.touch("a")
+    pool.touch("c")
+
+    assert [t for t, _, _ in pool.evict_for_insert()] == ["b"]
+    pool["d"] = (fake_telegram_client(), time.time())
+    # "d" is new (freq 1) and now the least frequently used entry.
+    assert [t for t, _, _ in pool.evict_for_insert()] == ["d"]
+
+
+def test_cost_policy_skips_sessions_with_live_rpcs(fake_telegram_client):
+    pool = SessionPool(capacity=3, policy="cost")
+    busy = fake_telegram_client()
+    busy._sender = SimpleNamespace(_pending_state=dict.fromkeys(range(2)))
+    pool["busy"] = (busy, time.time())
+    pool["idle"] = (fake_telegram_client(), time.time())
+    pool["newest"] = (fake_telegram_client(), time.time())
+
+    assert [t for t, _, _ in pool.evict_for_insert()] == ["idle"]
+
+
+def test_pinned_sessions_are_never_evicted(fake_telegram_client):
+    pool = SessionPool(capacity=2, policy="lru", pinned=["default"])
+    _fill(pool, ["default", "tenant"], fake_telegram_client)
+
+    assert [t for t, _, _ in pool.evict_for_insert()] == ["tenant"]
+    pool.pin("hot")
+    pool["hot"] = (fake_telegram_client(), time.time())
+    # Only pinned entries remain: the pool exceeds capacity instead of evicting.
+    assert pool.evict_for_insert() == []
+    assert set(pool.keys()) == {"default", "hot"}
+
+    pool.unpin("hot")
+    assert [t for t, _, _ in pool.evict_for_insert()] == ["hot"]
+
+
+def test_evicts_until_below_capacity_after_shrink(fake_telegram_client):
+    pool = SessionPool(capacity=5, policy="lru")
+    _fill(pool, ["a", "b", "c", "d", "e"], fake_telegram_client)
+    pool.capacity = 2
+
+    assert [t for t, _, _ in pool.evict_for_insert()] == ["a", "b", "c", "d"]
+
+
+def test_hit_miss_and_connect_stats(fake_telegram_client):
+    pool = SessionPool(capacity=2)
+    _fill(pool, ["a"], fake_telegram_client)
+    pool.touch("a")
+    pool.touch("missing")
+    pool.stats.record_connect(0.5)
+    pool.stats.record_connect(1.5)
+
+    described = pool.describe()
+    assert described["hits"] == 1
+    assert described["misses"] == 1
+    assert described["hit_rate"] == 0.5
+    assert described["connects"] == 2
+    assert described["avg_connect_seconds"] == 1.0
+    assert described["max_connect_seconds"] == 1.5
+
+
+def test_unknown_policy_rejected():
+    with pytest.raises(ValueError, match="Unknown session eviction policy"):
+        make_eviction_policy("random")
+
+
+@pytest_asyncio.fixture
+async def small_pool():
+    pool = SessionPool(capacity=2, policy="lru", pinned=["default"])
+    with patch.object(conn, "_session_cache", pool):
+        yield pool
+    conn._pending_connects.clear()
+
+
+@pytest.mark.asyncio
+async def test_eviction_disconnects_in_background_without_holding_lock(
+    small_pool, fake_telegram_client
+):
+    disconnect_started = asyncio.Event()
+    release_disconnect = asyncio.Event()
+
+    async def slow_disconnect():
+        disconnect_started.set()
+        await release_disconnect.wait()
+
+    victim = fake_telegram_client()
+    victim.disconnect = slow_disconnect
+    small_pool["default"] = (fake_telegram_client(), time.time())
+    small_pool["old"] = (victim, time.time())
+
+    async def build(session_path, token):
+        return fake_telegram_client()
+
+    with patch.object(conn, "_build_telegram_client_for_token", build):
+        await asyncio.wait_for(_get_client_by_token("new"), timeout=1)
+        await asyncio.wait_for(disconnect_started.wait(), timeout=1)
+        # The lock is free while the evicted client is still disconnecting.
+        assert not conn._cache_lock.locked()
+        assert conn._background_disconnects
+        release_disconnect.set()
+        await asyncio.gather(*conn._background_disconnects)
+
+    assert set(small_pool.keys()) == {"default", "new"}
+
+
+@pytest.mark.asyncio
+async def test_health_stats_expose_pool_counters(small_pool, fake_telegram_client):
+    small_pool["default"] = (fake_telegram_client(), time.time())
+    await _get_client_by_token("default")
+
+    stats = await conn.get_session_health_stats()
+
+    assert stats["pool"]["policy"] == "lru"
+    assert stats["pool"]["hits"] == 1
+    assert stats["pool"]["pinned"] == 1
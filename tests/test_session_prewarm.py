@@ -0,0 +1,108 @@
+"""Startup pre-warming of recently used sessions."""
+
+import asyncio
+import os
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+import pytest_asyncio
+
+from src import server
+from src.client import connection as conn
+from src.client.session_pool import SessionPool
+
+# conftest's test_server fixture swaps the module attribute for an AsyncMock;
+# prewarm_sessions looks it up at call time, so restore the real one in tests.
+_get_client_by_token = conn._get_client_by_token
+
+
+def test_recent_session_tokens_newest_first_skipping_setup_files(tmp_path):
+    now = time.time()
+    for age, name in enumerate(["newest", "setup-abc", "middle", "reauth-x", "old"]):
+        path = tmp_path / f"{name}.session"
+        path.touch()
+        os.utime(path, (now - age, now - age))
+    (tmp_path / "notes.txt").touch()
+
+    with patch.object(conn, "SESSION_DIR", tmp_path):
+        assert conn.recent_session_tokens(2) == ["newest", "middle"]
+        assert conn.recent_session_tokens(10) == ["newest", "middle", "old"]
+
+
+@pytest_asyncio.fixture
+async def pool():
+    pool = SessionPool(capacity=20)
+    with (
+        patch.object(conn, "_session_cache", pool),
+        patch.object(conn, "_get_client_by_token", _get_client_by_token),
+    ):
+        yield pool
+    conn._pending_connects.clear()
+
+
+@pytest.mark.asyncio
+async def test_prewarm_bounds_parallelism_and_caches_clients(pool):
+    in_flight = 0
+    peak = 0
+
+    async def build(session_path, token):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return MagicMock()
+
+    tokens = [f"tok-{i}" for i in range(10)]
+    with patch.object(conn, "_build_telegram_client_for_token", build):
+        result = await conn.prewarm_sessions(tokens, concurrency=3)
+
+    assert peak == 3
+    assert result == {"requested": 10, "connected": 10, "failed": 0}
+    assert set(pool.keys()) == set(tokens)
+
+
+@pytest.mark.asyncio
+async def test_prewarm_failures_are_counted_not_raised(pool):
+    async def build(session_path, token):
+        if token == "bad":
+            raise ConnectionError("proxy down")
+        return MagicMock()
+
+    with patch.object(conn, "_build_telegram_client_for_token", build):
+        result = await conn.prewarm_sessions(["good", "bad"], concurrency=2)
+
+    assert result == {"requested": 2, "connected": 1, "failed": 1}
+    assert "good" in pool and "bad" not in pool
+
+
+@pytest.mark.asyncio
+async def test_startup_deadline_leaves_queued_sessions_connecting(pool):
+    async def build(session_path, token):
+        await asyncio.sleep(0.03)
+        return MagicMock()
+
+    config = MagicMock(
+        prewarm_sessions=4,
+        transport="http",
+        require_auth=True,
+        max_active_sessions=10,
+        worker_name=None,
+        prewarm_concurrency=1,
+        prewarm_timeout_seconds=0.01,
+    )
+    tokens = ["a", "b", "c", "d"]
+    with (
+        patch.object(server, "config", config),
+        patch.object(server, "_prewarm_task", None),
+        patch.object(server, "recent_session_tokens", lambda limit, owns: tokens),
+        patch.object(conn, "_build_telegram_client_for_token", build),
+    ):
+        await server.prewarm_on_startup()
+        assert len(pool) < 4  # Most are still queued behind the semaphore
+
+        result = await server._prewarm_task
+
+    assert result == {"requested": 4, "connected": 4, "failed": 0}
+    assert set(pool.keys()) == set(tokens)
@@ -0,0 +1,128 @@
+"""Per-token single-flight session creation in src.client.connection."""
+
+import asyncio
+import time
+from unittest.mock import patch
+
+import pytest
+import pytest_asyncio
+
+from src.client import connection as conn
+
+# Bind the real function at import time; conftest's test_server fixture replaces
+# the module attribute with an AsyncMock for MCP-level tests.
+_get_client_by_token = conn._get_client_by_token
+
+COLD_CONNECT_SECONDS = 0.3
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def _isolated_session_cache():
+    conn._session_cache.clear()
+    conn._pending_connects.clear()
+    yield
+    conn._session_cache.clear()
+    conn._pending_connects.clear()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_one_connect(fake_telegram_client):
+    calls = 0
+
+    async def slow_build(session_path, token):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return fake_telegram_client()
+
+    with patch.object(conn, "_build_telegram_client_for_token", slow_build):
+        clients = await asyncio.gather(
+            *(_get_client_by_token("tok-shared") for _ in range(10))
+        )
+
+    assert calls == 1
+    assert all(c is clients[0] for c in clients)
+    assert "tok-shared" in conn._session_cache
+    assert not conn._pending_connects
+
+
+@pytest.mark.asyncio
+async def test_connect_failure_reaches_all_waiters_and_allows_retry():
+    calls = 0
+
+    async def failing_build(session_path, token):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        raise ConnectionError("proxy timeout")
+
+    with patch.object(conn, "_build_telegram_client_for_token", failing_build):
+        results = await asyncio.gather(
+            *(_get_client_by_token("tok-fail") for _ in range(3)),
+            return_exceptions=True,
+        )
+        assert calls == 1
+        assert all(isinstance(r, ConnectionError) for r in results)
+        assert "tok-fail" not in conn._pending_connects
+
+        with pytest.raises(ConnectionError):
+            await _get_client_by_token("tok-fail")
+        assert calls == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_abort_shared_connect(fake_telegram_client):
+    async def slow_build(session_path, token):
+        await asyncio.sleep(0.05)
+        return fake_telegram_client()
+
+    with patch.object(conn, "_build_telegram_client_for_token", slow_build):
+        first = asyncio.create_task(_get_client_by_token("tok-cancel"))
+        second = asyncio.create_task(_get_client_by_token("tok-cancel"))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        client = await second
+
+    assert conn._session_cache["tok-cancel"][0] is client
+
+
+@pytest.mark.asyncio
+async def test_cache_hits_do_not_queue_behind_cold_connects(fake_telegram_client):
+    """With four cold connects in flight, the p99 cache-hit latency stays under a
+    tenth of one cold connect."""
+    hot_tokens = [f"hot-{i}" for i in range(5)]
+    for token in hot_tokens:
+        conn._session_cache[token] = (fake_telegram_client(), time.time())
+
+    async def slow_build(session_path, token):
+        await asyncio.sleep(COLD_CONNECT_SECONDS)
+        return fake_telegram_client()
+
+    latencies: list[float] = []
+
+    async def hit(token: str) -> None:
+        t0 = time.perf_counter()
+        await _get_client_by_token(token)
+        latencies.append(time.perf_counter() - t0)
+
+    with (
+        patch.object(conn, "_build_telegram_client_for_token", slow_build),
+        patch.object(conn._session_cache, "capacity", 100),
+    ):
+        cold = [
+            asyncio.create_task(_get_client_by_token(f"cold-{i}")) for i in range(4)
+        ]
+        await asyncio.sleep(0)
+        for _ in range(40):
+            await asyncio.gather(*(hit(t) for t in hot_tokens))
+            await asyncio.sleep(0.001)
+        await asyncio.gather(*cold)
+
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(
+        f"\ncache-hit latency with 4 cold connects in flight: "
+        f"n={len(latencies)} p50={latencies[len(latencies) // 2] * 1000:.2f}ms "
+        f"p99={p99 * 1000:.2f}ms (cold connect={COLD_CONNECT_SECONDS * 1000:.0f}ms)"
+    )
+    assert p99 < COLD_CONNECT_SECONDS / 10
@@ -0,0 +1,99 @@
+"""Cached authorization verification on connect and reconnect."""
+
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from telethon import errors as tg_errors
+from telethon.crypto import AuthKey
+from telethon.tl import functions
+
+from src.client import connection as conn
+from src.utils.error_handling import ErrorAction, log_connection_error_response
+
+TOKEN = "tok-verify"
+
+
+@pytest.fixture
+def authorized_client(fake_telegram_client):
+    async def answer(request):
+        return MagicMock()
+
+    def make(key: bytes = b"\x01" * 256) -> MagicMock:
+        client = fake_telegram_client(answer)
+        client.session.auth_key = AuthKey(key)
+        return client
+
+    return make
+
+
+def _get_state_calls(client) -> int:
+    return sum(
+        isinstance(request, functions.updates.GetStateRequest)
+        for request in client.requests
+    )
+
+
+@pytest.fixture(autouse=True)
+def verification_cache():
+    conn._verified_sessions.clear()
+    with patch.dict(conn._verification_stats, {"performed": 0, "skipped": 0}):
+        yield
+    conn._verified_sessions.clear()
+
+
+@pytest.mark.asyncio
+async def test_reconnects_within_ttl_skip_get_state(authorized_client):
+    client = authorized_client()
+
+    # One connect plus four reconnects during a network flap.
+    for _ in range(5):
+        await conn._connect_client_and_verify_or_cleanup(client, TOKEN)
+
+    assert _get_state_calls(client) == 1
+    assert conn._verification_stats == {"performed": 1, "skipped": 4}
+    assert client._authorized is True
+
+
+@pytest.mark.asyncio
+async def test_expired_or_different_auth_key_verifies_again(authorized_client):
+    await conn._connect_client_and_verify_or_cleanup(authorized_client(), TOKEN)
+
+    # Session re-authenticated via web setup
+    replaced = authorized_client(key=b"\x02" * 256)
+    await conn._connect_client_and_verify_or_cleanup(replaced, TOKEN)
+    assert _get_state_calls(replaced) == 1
+
+    conn._verified_sessions[TOKEN] = (
+        time.time() - conn.VERIFICATION_TTL_SECONDS - 1,
+        conn._auth_key_id(replaced),
+    )
+    await conn._connect_client_and_verify_or_cleanup(replaced, TOKEN)
+    assert _get_state_calls(replaced) == 2
+    assert conn._verification_stats["skipped"] == 0
+
+
+@pytest.mark.asyncio
+async def test_missing_auth_key_is_never_skipped(authorized_client):
+    client = authorized_client()
+    await conn._connect_client_and_verify_or_cleanup(client, TOKEN)
+    client.session.auth_key = None
+
+    with pytest.raises(conn.SessionNotAuthorizedError):
+        await conn._connect_client_and_verify_or_cleanup(client, TOKEN)
+
+
+def test_auth_error_on_first_rpc_maps_to_session_not_authorized():
+    conn._verified_sessions[TOKEN] = (time.time(), 1)
+    conn.set_request_token(TOKEN)
+    try:
+        error = RuntimeError("get_messages failed")
+        error.__cause__ = tg_errors.AuthKeyUnregisteredError(request=None)
+
+        response = log_connection_error_response("get_messages", None, error)
+    finally:
+        conn.set_request_token(None)
+
+    assert response["action"] == ErrorAction.AUTHENTICATE_SESSION.name
+    # The next connect verifies again instead of trusting the cache.
+    assert TOKEN not in conn._verified_sessions
@@ -0,0 +1,229 @@
+"""Hot/warm/cold session residency: snapshots, warm store and rehydration."""
+
+import asyncio
+import sqlite3
+import time
+from unittest.mock import AsyncMock, patch
+
+import pytest
+import pytest_asyncio
+from telethon.crypto import AuthKey
+from telethon.sessions import MemorySession, SQLiteSession, StringSession
+
+from src.client import connection as conn
+from src.client.session_pool import SessionPool
+from src.client.warm_sessions import (
+    WarmSessionStore,
+    WarmSnapshot,
+    session_from_snapshot,
+    snapshot_session,
+    spill_snapshot_to_file,
+)
+
+_get_client_by_token = conn._get_client_by_token
+
+ROWS = [(101, 5, "alice", None, "Alice"), (-1002, 7, None, None, "Chat")]
+
+
+def _memory_session() -> MemorySession:
+    session = MemorySession()
+    session.set_dc(2, "149.154.167.51", 443)
+    session.auth_key = AuthKey(b"\x01" * 256)
+    session._entities = set(ROWS)
+    return session
+
+
+def _snapshot(created_at: float | None = None) -> WarmSnapshot:
+    snapshot = snapshot_session(_memory_session())
+    if created_at is not None:
+        snapshot.created_at = created_at
+    return snapshot
+
+
+def test_snapshot_round_trip_keeps_auth_and_entities():
+    original = _memory_session()
+    restored = session_from_snapshot(snapshot_session(original))
+
+    assert isinstance(restored, StringSession)
+    assert restored.auth_key.key == original.auth_key.key
+    assert restored.dc_id == 2
+    assert restored._entities == set(ROWS)
+
+
+def test_snapshot_skips_sessions_without_auth_key():
+    assert snapshot_session(MemorySession()) is None
+
+
+def test_snapshot_reads_sqlite_entities(tmp_path):
+    session = SQLiteSession(str(tmp_path / "tok"))
+    session.set_dc(2, "149.154.167.51", 443)
+    session.auth_key = AuthKey(b"\x02" * 256)
+    session._cursor().executemany(
+        "insert into entities values (?,?,?,?,?,?)", [(*r, 0) for r in ROWS]
+    )
+    session.save()
+
+    snapshot = snapshot_session(session)
+    session.close()
+
+    assert not snapshot.from_memory_session
+    assert set(snapshot.entity_rows) == set(ROWS)
+
+
+def test_spill_writes_in_memory_rows_to_session_file(tmp_path):
+    path = tmp_path / "tok.session"
+    SQLiteSession(str(tmp_path / "tok")).close()
+
+    assert spill_snapshot_to_file(_snapshot(), path) == len(ROWS)
+    db = sqlite3.connect(path)
+    stored = db.execute("select id, hash, username, phone, name from entities")
+    assert set(stored.fetchall()) == set(ROWS)
+    db.close()
+
+
+def test_store_overflow_and_ttl_expiry():
+    store = WarmSessionStore(capacity=2, ttl_seconds=60)
+    now = time.time()
+    assert store.put("a", _snapshot(now - 120)) == []
+    assert store.put("b", _snapshot(now)) == []
+    overflow = store.put("c", _snapshot(now))
+
+    assert [t for t, _ in overflow] == ["a"]
+    assert store.expire(now + 61) and len(store) == 0
+    described = store.describe()
+    assert described["demotions"] == 3
+    assert described["spills_to_cold"] == 3
+    assert described["approx_bytes"] == 0
+
+
+def test_store_with_zero_capacity_spills_immediately():
+    store = WarmSessionStore(capacity=0, ttl_seconds=60)
+    assert [t for t, _ in store.put("a", _snapshot())] == ["a"]
+    assert "a" not in store
+
+
+@pytest.fixture
+def hot_client(fake_telegram_client):
+    def make():
+        client = fake_telegram_client()
+        client.session = _memory_session()
+        return client
+
+    return make
+
+
+@pytest_asyncio.fixture
+async def tiers():
+    pool = SessionPool(capacity=1, policy="lru")
+    store = WarmSessionStore(capacity=10, ttl_seconds=3600)
+    with (
+        patch.object(conn, "_session_cache", pool),
+        patch.object(conn, "_warm_sessions", store),
+    ):
+        yield pool, store
+    conn._pending_connects.clear()
+
+
+@pytest.mark.asyncio
+async def test_evicted_session_is_rehydrated_from_warm_tier(tiers, hot_client):
+    pool, store = tiers
+    pool["evicted"] = (hot_client(), time.time())
+    cold_builds: list[str] = []
+
+    async def cold_build(session_path, token):
+        cold_builds.append(token)
+        return hot_client()
+
+    rehydrated = hot_client()
+    rehydrate = AsyncMock(return_value=rehydrated)
+
+    with (
+        patch.object(conn, "_build_telegram_client_for_token", cold_build),
+        patch.object(conn, "_rehydrate_warm_client", rehydrate),
+    ):
+        await _get_client_by_token("other")
+        await asyncio.gather(*conn._background_disconnects)
+        assert "evicted" in store
+
+        client = await _get_client_by_token("evicted")
+
+    assert cold_builds == ["other"]
+    assert client is rehydrated
+    assert rehydrate.await_args.args[0].entity_rows
+    assert "evicted" not in store
+    assert store.rehydrations == 1
+
+
+@pytest.mark.asyncio
+async def test_rehydration_is_verified_once_the_verification_ttl_lapsed(hot_client):
+    client = hot_client()
+    client.session = session_from_snapshot(_snapshot())
+    verify = AsyncMock(
+        side_effect=conn.SessionNotAuthorizedError("Session not authorized")
+    )
+    conn._verified_sessions["tok"] = (
+        time.time() - conn.VERIFICATION_TTL_SECONDS - 1,
+        conn._auth_key_id(client),
+    )
+
+    with (
+        patch.object(conn, "_new_telegram_client", return_value=client),
+        patch.object(conn, "verify_authorized_connection", verify),
+        pytest.raises(conn.SessionNotAuthorizedError),
+    ):
+        await conn._rehydrate_warm_client(_snapshot(), "tok")
+
+    verify.assert_awaited_once()
+    client.disconnect.assert_awaited()
+    assert "tok" not in conn._verified_sessions
+
+
+@pytest.mark.asyncio
+async def test_rehydration_skips_verification_within_its_ttl(hot_client):
+    client = hot_client()
+    client.session = session_from_snapshot(_snapshot())
+    verify = AsyncMock()
+    conn._verified_sessions["tok"] = (time.time(), conn._auth_key_id(client))
+
+    with (
+        patch.object(conn, "_new_telegram_client", return_value=client),
+        patch.object(conn, "verify_authorized_connection", verify),
+    ):
+        assert await conn._rehydrate_warm_client(_snapshot(), "tok") is client
+
+    verify.assert_not_awaited()
+    assert client._authorized is True
+    conn._verified_sessions.pop("tok", None)
+
+
+@pytest.mark.asyncio
+async def test_discarded_warm_session_connects_cold(tiers, hot_client):
+    _pool, store = tiers
+    store.put("tok", _snapshot())
+    conn.discard_warm_session("tok")
+    build = AsyncMock(return_value=hot_client())
+
+    with patch.object(conn, "_build_telegram_client_for_token", build):
+        await _get_client_by_token("tok")
+
+    build.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_health_stats_report_tiers(tiers, hot_client):
+    pool, store = tiers
+    client = hot_client()
+    client.session = session_from_snapshot(_snapshot())
+    pool["hot"] = (client, time.time())
+    store.put("warm", _snapshot())
+
+    tier_stats = (await conn.get_session_health_stats())["tiers"]
+
+    assert tier_stats["hot"] == {
+        "sessions": 1,
+        "in_memory_entity_rows": len(ROWS),
+        # Rows from a memory-only snapshot are queued for the next flush.
+        "unflushed_entity_rows": len(ROWS),
+    }
+    assert tier_stats["warm"]["sessions"] == 1
+    assert tier_stats["warm"]["entity_rows"] == len(ROWS)
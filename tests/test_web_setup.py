@@ -1,13 +1,23 @@
 import os
 import re
+import time
 from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 from jinja2 import Environment, FileSystemLoader
 from telethon.errors.rpcerrorlist import PhoneNumberFloodError
 
+from src.client import connection
+from src.client.session_pool import SessionPool
 from src.config.server_config import ServerConfig, set_config
 from src.server_components import web_setup
+from src.server_components.attachment_tickets import (
+    clear_attachment_tickets_for_tests,
+    get_attachment_ticket,
+    mint_attachment_ticket,
+)
+from src.utils.hash_ring import token_routing_key
 
 
 class _FakeMcpApp:
@@ -160,6 +170,62 @@ async def test_setup_delete_session_not_found_returns_delete_form(
     assert "not found" in response.context["error"].lower()
 
 
+@pytest.mark.asyncio
+async def test_setup_delete_session_refuses_its_attachment_tickets(
+    monkeypatch, setup_routes, tmp_path
+):
+    web_setup._setup_sessions.clear()
+    cfg = ServerConfig()
+    cfg.session_dir = str(tmp_path)
+    set_config(cfg)
+    monkeypatch.setattr(connection, "SESSION_DIR", tmp_path)
+    (tmp_path / "logging-out.session").touch()
+    ticket_id = await mint_attachment_ticket("logging-out", -1001, 5)
+    assert await get_attachment_ticket(ticket_id) is not None
+
+    _patch_template_response(monkeypatch)
+
+    handler = setup_routes[("/setup/delete", ("POST",))]
+    response = await handler(_FakeRequest({"token": "logging-out"}))
+
+    assert response.template == "fragments/success.html"
+    assert not (tmp_path / "logging-out.session").exists()
+    assert await get_attachment_ticket(ticket_id) is None
+    await clear_attachment_tickets_for_tests()
+
+
+@pytest.mark.asyncio
+async def test_setup_complete_reauth_drops_the_resident_client(monkeypatch, tmp_path):
+    web_setup._setup_sessions.clear()
+    monkeypatch.setattr(connection, "SESSION_DIR", tmp_path)
+    pool = SessionPool(capacity=5)
+    monkeypatch.setattr(connection, "_session_cache", pool)
+    monkeypatch.setattr(web_setup, "_session_cache", pool)
+    (tmp_path / "reauthed.session").write_text("old")
+    (tmp_path / "reauth-1.session").write_text("new")
+    resident = MagicMock(disconnect=AsyncMock())
+    pool["reauthed"] = (resident, time.time())
+    setup_id = f"{token_routing_key('reauthed')}-1"
+    web_setup._setup_sessions[setup_id] = {
+        "authorized": True,
+        "client": MagicMock(disconnect=AsyncMock(), send_read_acknowledge=AsyncMock()),
+        "existing_token": "reauthed",
+        "original_session_path": str(tmp_path / "reauthed.session"),
+        "temp_session_path": str(tmp_path / "reauth-1.session"),
+    }
+    _patch_template_response(monkeypatch)
+
+    response = await web_setup.setup_complete_reauth(
+        _FakeRequest({"setup_id": setup_id})
+    )
+
+    assert response.template == "fragments/success.html"
+    assert (tmp_path / "reauthed.session").read_text() == "new"
+    resident.disconnect.assert_awaited_once()
+    assert "reauthed" not in pool
+    web_setup._setup_sessions.clear()
+
+
 @pytest.mark.asyncio
 async def test_setup_reauthorize_missing_session_returns_token_form(
     monkeypatch, setup_routes, tmp_path
@@ -0,0 +1,257 @@
+"""Multi-worker mode: consistent hashing and the token-affine front router.
+
+Workers are fake HTTP backends behind httpx.MockTransport; each answers with its
+own name so tests can see where the router sent a request.
+"""
+
+import json
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+import pytest
+
+from src.client import connection as conn
+from src.client.session_pool import SessionPool
+from src.server_components.attachment_tickets import mint_attachment_ticket
+from src.server_components.worker_router import (
+    CONTROL_ROUTING_KEY,
+    HEALTH_CHECK_FAILURES,
+    RELEASE_SESSIONS_PATH,
+    WorkerRouter,
+    worker_names,
+)
+from src.utils.hash_ring import HashRing, token_routing_key
+
+TOKENS = [f"token-{i}" for i in range(2000)]
+
+
+def test_ring_spreads_tokens_evenly():
+    ring = HashRing(worker_names(4))
+    counts: dict[str, int] = {}
+    for token in TOKENS:
+        owner = ring.node_for_token(token)
+        counts[owner] = counts.get(owner, 0) + 1
+
+    assert set(counts) == set(worker_names(4))
+    assert all(300 < c < 700 for c in counts.values()), counts
+
+
+def test_ring_moves_only_departed_workers_tokens():
+    ring = HashRing(worker_names(4))
+    before = {t: ring.node_for_token(t) for t in TOKENS}
+
+    ring.remove("worker-2")
+    after = {t: ring.node_for_token(t) for t in TOKENS}
+    moved = {t for t in TOKENS if before[t] != after[t]}
+    assert moved == {t for t in TOKENS if before[t] == "worker-2"}
+
+    ring.add("worker-2")
+    assert {t: ring.node_for_token(t) for t in TOKENS} == before
+
+
+def _fake_workers(
+    down: set[str], seen: list[tuple[str, str]] | None = None
+) -> httpx.MockTransport:
+    def handler(request: httpx.Request) -> httpx.Response:
+        name = request.url.host
+        if seen is not None:
+            seen.append((name, request.url.path))
+        if name in down:
+            raise httpx.ConnectError("connection refused", request=request)
+        if request.url.path == "/health":
+            return httpx.Response(200, json={"status": "healthy"})
+        body = {
+            "worker": name,
+            "path": request.url.path,
+            "query": request.url.query.decode(),
+            "auth": request.headers.get("authorization"),
+            "body": request.content.decode(),
+        }
+        # A streamed body, like a real upstream (json= would be pre-read).
+        return httpx.Response(
+            200,
+            headers={"content-type": "application/json"},
+            stream=httpx.ByteStream(json.dumps(body).encode()),
+        )
+
+    return httpx.MockTransport(handler)
+
+
+def _router(down: set[str] | None = None) -> WorkerRouter:
+    workers = {name: f"http://{name}" for name in worker_names(3)}
+    return WorkerRouter(workers, transport=_fake_workers(down or set()))
+
+
+def _client(router: WorkerRouter) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=router), base_url="http://router"
+    )
+
+
+@pytest.mark.asyncio
+async def test_token_requests_stick_to_owning_worker():
+    router = _router()
+    token = TOKENS[7]
+    owner = router.ring.node_for_token(token)
+
+    async with _client(router) as client:
+        header = await client.post(
+            "/v1/mcp?x=1",
+            headers={"Authorization": f"Bearer {token}"},
+            content=b'{"jsonrpc": "2.0"}',
+        )
+        url_auth = await client.post(f"/v1/url_auth/{token}/mcp")
+        ticket = await mint_attachment_ticket(token, chat_id=1, message_id=2)
+        download = await client.get(f"/v1/attachments/{ticket}/file.bin")
+        setup = await client.get("/setup")
+
+    assert header.json() == {
+        "worker": owner,
+        "path": "/v1/mcp",
+        "query": "x=1",
+        "auth": f"Bearer {token}",
+        "body": '{"jsonrpc": "2.0"}',
+    }
+    assert url_auth.json()["worker"] == owner
+    assert download.json()["worker"] == owner
+    assert setup.json()["worker"] == router.ring.node_for(CONTROL_ROUTING_KEY)
+    assert sum(router.routed.values()) == 4
+
+
+@pytest.mark.asyncio
+async def test_unreachable_worker_is_dropped_and_request_rerouted():
+    token = next(t for t in TOKENS if _router().ring.node_for_token(t) == "worker-1")
+    router = _router(down={"worker-1"})
+
+    async with _client(router) as client:
+        response = await client.get(
+            "/v1/mcp", headers={"Authorization": f"Bearer {token}"}
+        )
+
+    assert response.status_code == 200
+    assert response.json()["worker"] != "worker-1"
+    assert "worker-1" not in router.ring
+
+
+@pytest.mark.asyncio
+async def test_no_healthy_workers_returns_503():
+    router = _router(down=set(worker_names(3)))
+
+    async with _client(router) as client:
+        response = await client.get("/v1/mcp", headers={"Authorization": "Bearer t"})
+
+    assert response.status_code == 503
+
+
+@pytest.mark.asyncio
+async def test_health_checks_rebalance_ring():
+    down = {"worker-0"}
+    router = WorkerRouter(
+        {name: f"http://{name}" for name in worker_names(3)},
+        transport=_fake_workers(down),
+    )
+
+    for _ in range(HEALTH_CHECK_FAILURES):
+        await router.check_workers()
+    assert router.ring.nodes == {"worker-1", "worker-2"}
+
+    down.clear()
+    await router.check_workers()
+    assert router.ring.nodes == set(worker_names(3))
+
+
+@pytest.mark.asyncio
+async def test_single_failed_probe_keeps_worker_in_ring():
+    down = {"worker-0"}
+    router = WorkerRouter(
+        {name: f"http://{name}" for name in worker_names(3)},
+        transport=_fake_workers(down),
+    )
+
+    for _ in range(HEALTH_CHECK_FAILURES - 1):
+        await router.check_workers()
+    down.clear()
+    await router.check_workers()
+    down.add("worker-0")
+    await router.check_workers()
+
+    assert router.ring.nodes == set(worker_names(3))
+
+
+@pytest.mark.asyncio
+async def test_rejoin_releases_moved_sessions_before_ring_changes():
+    seen: list[tuple[str, str]] = []
+    router = WorkerRouter(
+        {name: f"http://{name}" for name in worker_names(3)},
+        transport=_fake_workers(set(), seen),
+    )
+    router.remove_worker("worker-0")
+    ring_at_release: list[frozenset[str]] = []
+    release_moved = router._release_moved
+
+    async def record(name, members):
+        ring_at_release.append(router.ring.nodes)
+        await release_moved(name, members)
+
+    router._release_moved = record
+    await router.check_workers()
+
+    released = {name for name, path in seen if path == RELEASE_SESSIONS_PATH}
+    assert released == {"worker-1", "worker-2"}
+    assert ring_at_release == [frozenset({"worker-1", "worker-2"})] * 2
+    assert router.ring.nodes == set(worker_names(3))
+
+
+@pytest.mark.asyncio
+async def test_internal_worker_paths_are_not_forwarded():
+    router = _router()
+
+    async with _client(router) as client:
+        response = await client.post(RELEASE_SESSIONS_PATH, json={"workers": []})
+
+    assert response.status_code == 404
+    assert sum(router.routed.values()) == 0
+
+
+@pytest.mark.asyncio
+async def test_worker_disconnects_only_the_tokens_it_no_longer_owns():
+    ring = HashRing(worker_names(2))
+    tokens = TOKENS[:10]
+    pool = SessionPool(capacity=20)
+    clients = {token: MagicMock(disconnect=AsyncMock()) for token in tokens}
+    for token, client in clients.items():
+        pool[token] = (client, time.time())
+
+    with patch.object(conn, "_session_cache", pool):
+        released = await conn.release_sessions(
+            lambda token: ring.node_for_token(token) == "worker-0"
+        )
+
+    moved = {t for t in tokens if ring.node_for_token(t) == "worker-1"}
+    assert moved and set(released) == moved
+    assert set(pool) == set(tokens) - moved
+    for token, client in clients.items():
+        assert client.disconnect.await_count == (token in moved)
+
+
+@pytest.mark.asyncio
+async def test_session_setup_forms_reach_the_sessions_owner():
+    workers = {name: f"http://{name}" for name in worker_names(2)}
+    router = WorkerRouter(workers, transport=_fake_workers(set()))
+    control = router.ring.node_for(CONTROL_ROUTING_KEY)
+    token = next(t for t in TOKENS if router.ring.node_for_token(t) != control)
+    setup_id = f"{token_routing_key(token)}-1700000000000"
+
+    async with _client(router) as client:
+        delete = await client.post("/setup/delete", data={"token": token})
+        reauth_step = await client.post(
+            "/setup/verify", data={"setup_id": setup_id, "code": "12345"}
+        )
+        new_setup_step = await client.post(
+            "/setup/verify", data={"setup_id": "1700000000000", "code": "12345"}
+        )
+
+    assert delete.json()["worker"] != control
+    assert reauth_step.json()["worker"] != control
+    assert new_setup_step.json()["worker"] == control